@@ -1,10 +1,17 @@
 # app.py
-import datetime as dt              # 날짜 계산용
+import json                       # 프로파일 덤프
+import time                       # 덤프 파일명 시각
 import pandas as pd               # 데이터프레임
 import streamlit as st            # 웹 UI
-import yfinance as yf             # 야후 폴백용 시세
-from dateutil.relativedelta import relativedelta  # 개월 단위 기간 계산
 import altair as alt              # 라인 차트 렌더
+from core.symbols import get_directory  # KRX 종목 디렉터리(검색/이름)
+from core.price_store import get_store  # 티커별 로컬 일봉 저장소
+from core.batch import BatchResult, load_names  # 워치리스트 결과/이름
+from core.refresher import Refresher, get_refresher  # 공용 백그라운드 시세 갱신
+from core.provider import get_provider  # 소스 상태/서킷
+from core.charting import POINTS, downsample, normalized_long  # 차트 점 축약(LTTB)
+from core.fx import BASES, SYMBOLS, get_fx  # 통화 환산(일별 환율)
+from core import instrument  # 핫패스 계측(호출/지연/캐시 적중)
 
 # 페이지 메타와 타이틀
 st.set_page_config(layout="wide", page_title="차트")
@@ -16,18 +23,31 @@ with st.sidebar:
     # 기간 선택. pykrx와 yfinance 모두 일봉 기준
     period = st.selectbox("조회 기간",
                           ["5d","1mo","3mo","6mo","1y","2y","5y","max"], index=2)
-    # 자동 새로고침 토글. 데이터 소스별 캐시는 유지됨
+    # 차트당 최대 점 수. 기간이 길어도 브라우저로 보내는 점 수 고정
+    points = st.select_slider("차트 해상도(점)", [200, 400, 600, 1000, 2000], value=POINTS)
+    # 전체 종목을 시작=100 기준 한 차트로 겹쳐 보기
+    combined = st.toggle("한 차트로 비교(정규화)", value=False)
+    # 분배금 재투자 수정 종가(저장된 총수익 지수). 끄면 원 종가
+    total_return = st.toggle("총수익(분배금 재투자)", value=False)
+    # 표시 통화. 원 통화면 티커별 거래 통화 그대로
+    show_ccy = st.selectbox("표시 통화", ["원 통화"] + BASES, index=0)
+    # 자동 새로고침 토글. 차트 영역만 30초마다 다시 그림(조회는 공용 갱신기가 담당)
     autorefresh = st.toggle("30초 자동 새로고침", value=False)
     # 워치리스트 초기화
     if st.button("기본 4개로 리셋"):
         st.session_state.watch = ["133690.KS","132030.KS","308620.KS","261240.KS"]
-    # streamlit의 데이터 캐시 무효화
+    # streamlit의 데이터 캐시 무효화 + 저장소 재확인 표시(저장본은 유지)
     if st.button("캐시 비우기"):
         st.cache_data.clear()
+        get_store().expire()
 
-# 자동 새로고침 트리거
-if autorefresh:
-    st.experimental_autorefresh(interval=30_000, key="auto")
+# 모든 세션이 공유하는 갱신기(워커 스레드 1개가 구독 티커 합집합을 장중에만 갱신)
+@st.cache_resource
+def shared_refresher() -> Refresher:
+    return get_refresher()
+
+if "sid" not in st.session_state:
+    st.session_state.sid = Refresher.session_id()
 
 # ---------------- 기본 워치리스트 ----------------
 # 최초 로드 시 기본값 주입. 이후에는 세션 상태 유지
@@ -57,20 +77,16 @@ if add_raw:
 def search_krx(query: str) -> pd.DataFrame:
     """
     KRX ETF 코드/이름 검색.
-    - pykrx의 전체 ETF 코드 리스트를 조회 후 부분일치 필터
+    - 하루 1회 빌드되는 종목 디렉터리의 n-gram 색인 사용(초성 검색 포함)
     - 반환: Ticker(.KS), Name
     """
     if not query.strip():
         return pd.DataFrame()
     try:
-        from pykrx import stock
-        etfs = stock.get_etf_ticker_list()
-        rows = [(f"{code}.KS", stock.get_etf_ticker_name(code)) for code in etfs]
-        df = pd.DataFrame(rows, columns=["Ticker","Name"])
-        m = df["Ticker"].str.contains(query, case=False) | df["Name"].str.contains(query, case=False)
-        return df[m].head(50)
-    except Exception:
-        # 네트워크/모듈 에러 시 빈 결과
+        return get_directory().search(query, market="ETF", limit=50)[["Ticker","Name"]]
+    except Exception as e:
+        # 디렉터리 로드 실패 시 빈 결과
+        instrument.swallow("search_krx", e)
         return pd.DataFrame()
 
 # 검색 결과 렌더 + 각 행의 추가 버튼
@@ -86,157 +102,174 @@ if q:
                 _append_tickers(r["Ticker"])
 
 # ---------------- 이름/데이터 로드 ----------------
-# 기간 프리셋 → 개월 수 매핑. pykrx 날짜 계산에 사용
-PERIOD_MONTHS = {"5d":0,"1mo":1,"3mo":3,"6mo":6,"1y":12,"2y":24,"5y":60}
-
-@st.cache_data(ttl=3600, show_spinner=False)
-def get_korean_name(ticker: str) -> str:
-    """
-    ETF 한글명 조회.
-    - 우선 pykrx의 종목명
-    - 실패 시 yfinance의 shortName
-    """
-    code = ticker.split(".")[0]
-    try:
-        from pykrx import stock
-        return stock.get_etf_ticker_name(code) or ticker
-    except Exception:
-        pass
-    try:
-        return yf.Ticker(ticker).info.get("shortName", ticker)
-    except Exception:
-        return ticker
-
-@st.cache_data(ttl=180, show_spinner=False)
-def load_series(ticker: str, period: str) -> pd.Series:
+def load_watchlist(tickers: list[str], period: str, total_return: bool = False) -> BatchResult:
     """
-    시계열 종가 Series 반환.
-    - 1순위: pykrx get_etf_ohlcv_by_date(일봉)
-      · 날짜 형식: YYYYMMDD
-      · 인덱스 → DatetimeIndex 변환
-    - 2순위: yfinance.download(period, 1d, auto_adjust)
-    - 반환: float64 Series, 이름은 ticker
+    워치리스트 종가(공용 갱신기의 메모리 저장본).
+    - 이 세션의 워치리스트를 구독으로 등록 → 워커가 장중 주기마다 합집합을 일괄 갱신
+      · 1순위 pykrx(스레드 풀 병렬), 2순위 yfinance.download(남은 티커를 한 번에)
+    - 처음 보는 티커만 이번 실행에서 바로 조회, 나머지는 네트워크 없이 저장본 슬라이스
+    - total_return: 분배금/분할 반영 수정 종가(마지막 값 = 실제 종가)
+    - 반환: series(티커별 float64 Series), errors(티커별 실패 사유)
     """
-    # pykrx 시도
-    try:
-        from pykrx import stock
-        code = ticker.split(".")[0]
-        if period == "max":
-            start = "19900101"
-        elif period == "5d":
-            # 주말 포함 여유 10일
-            start = (dt.date.today() - dt.timedelta(days=10)).strftime("%Y%m%d")
-        else:
-            start = (dt.date.today() - relativedelta(months=PERIOD_MONTHS.get(period,3))).strftime("%Y%m%d")
-        end = dt.date.today().strftime("%Y%m%d")
-        df = stock.get_etf_ohlcv_by_date(start, end, code)
-        if df is not None and not df.empty and "종가" in df.columns:
-            s = pd.to_numeric(df["종가"], errors="coerce").dropna()
-            s.index = pd.to_datetime(s.index)  # Altair에 필요한 datetime 인덱스
-            s.name = ticker
-            return s.astype("float64")
-    except Exception:
-        # pykrx 실패는 조용히 폴백
-        pass
-
-    # yfinance 폴백
-    df = yf.download(ticker, period=period, interval="1d",
-                     progress=False, auto_adjust=True, threads=False)
-    if df.empty or "Close" not in df:
-        return pd.Series(dtype="float64")
-    s = df["Close"].dropna()
-    s.name = ticker
-    return s.astype("float64")
+    return shared_refresher().snapshot(st.session_state.sid, tickers, period, total_return)
 
 def render_series(s: pd.Series):
     """
     Altair 라인 차트 렌더.
+    - LTTB로 points개까지 축약(최고/최저점 유지)
     - 0 기준선 고정 해제(zero=False)
     - 툴팁: 날짜, 종가(콤마, 소수2)
     """
-    df = s.rename("Close").to_frame().reset_index()
+    df = downsample(s, points).rename("Close").to_frame().reset_index()
     df.columns = ["Date","Close"]
-    ch = (
-        alt.Chart(df)
-        .mark_line()
-        .encode(
-            x=alt.X("Date:T", title=""),
-            y=alt.Y("Close:Q", title="", scale=alt.Scale(zero=False)),
-            tooltip=[alt.Tooltip("Date:T"), alt.Tooltip("Close:Q", format=",.2f")],
-        ).properties(height=260)
-    )
-    st.altair_chart(ch, use_container_width=True)
+    with instrument.timed("render.altair"):
+        ch = (
+            alt.Chart(df)
+            .mark_line()
+            .encode(
+                x=alt.X("Date:T", title=""),
+                y=alt.Y("Close:Q", title="", scale=alt.Scale(zero=False)),
+                tooltip=[alt.Tooltip("Date:T"), alt.Tooltip("Close:Q", format=",.2f")],
+            ).properties(height=260)
+        )
+        st.altair_chart(ch, use_container_width=True)
 
 # ---------------- 렌더 ----------------
-valid, diag = [], []
-for idx, t in enumerate(st.session_state.watch):
-    # 개별 시계열 로드
-    s = load_series(t, period)
-    if s.empty:
-        st.warning(f"{t}: 데이터 없음")
-        continue
-    valid.append((idx, t, s))
-    # 진단용 요약(선택 표시)
-    diag.append({
-        "티커": t,
-        "데이터수": len(s),
-        "시작일": s.index.min(),
-        "최근일": s.index.max(),
-        "최근종가": float(s.iloc[-1])
-    })
-
-st.subheader("📈 차트")
-
-# 워치리스트 관리 버튼
-tools = st.columns([1,1,6])
-with tools[0]:
-    if st.button("전체 제거"):
-        st.session_state.watch = []
-with tools[1]:
-    if st.button("중복 제거"):
-        # 순서 유지하며 중복 제거
-        st.session_state.watch = list(dict.fromkeys(st.session_state.watch))
-
-# 유효 시리즈가 없으면 안내
-if not valid:
-    st.info("표시할 ETF가 없습니다. 기본 4개로 리셋하거나 추가하세요.")
-else:
-    # 2열 그리드로 차트 배치
-    cols = st.columns(2)
-    for i, (idx, t, s) in enumerate(valid):
-        with cols[i % 2]:
-            # --- 제목: 한글명 + 코드(회색 작은 글씨) ---
-            name = get_korean_name(t)
-            st.markdown(
-                f"### {name} "
-                f"<span style='color:#7f8c8d;font-size:0.9rem'>`{t}`</span>",
-                unsafe_allow_html=True
+# 차트 영역만 조각(fragment)으로 재실행. 자동 새로고침이면 30초마다 이 부분만 다시 그림
+@st.fragment(run_every=30 if autorefresh else None)
+def render_watchlist():
+    valid, diag = [], []
+    with instrument.timed("chart.load_watchlist"):
+        batch = load_watchlist(st.session_state.watch, period, total_return)
+    if show_ccy != "원 통화":
+        # 통화별 환율 이력 1회 조회 후 날짜 맞춰 곱함. 환율 없는 티커는 오류로
+        converted = get_fx().convert_series(batch.series, show_ccy)
+        batch = BatchResult(converted, {**batch.errors, **{t: f"{show_ccy} 환율 없음" for t in batch.series if t not in converted}})
+    for idx, t in enumerate(st.session_state.watch):
+        s = batch.series.get(t)
+        if s is None:
+            st.warning(f"{t}: {batch.errors.get(t, '데이터 없음')}")
+            continue
+        valid.append((idx, t, s))
+        # 진단용 요약(선택 표시)
+        diag.append({
+            "티커": t,
+            "데이터수": len(s),
+            "시작일": s.index.min(),
+            "최근일": s.index.max(),
+            "최근종가": float(s.iloc[-1])
+        })
+
+    st.subheader("📈 차트")
+
+    # 워치리스트 관리 버튼
+    tools = st.columns([1,1,6])
+    with tools[0]:
+        if st.button("전체 제거"):
+            st.session_state.watch = []
+    with tools[1]:
+        if st.button("중복 제거"):
+            # 순서 유지하며 중복 제거
+            st.session_state.watch = list(dict.fromkeys(st.session_state.watch))
+
+    # 유효 시리즈가 없으면 안내
+    if not valid:
+        st.info("표시할 ETF가 없습니다. 기본 4개로 리셋하거나 추가하세요.")
+    else:
+        # 표시 이름 일괄 조회(KRX는 디렉터리, 나머지는 yfinance 병렬)
+        names = load_names([t for _, t, _ in valid])
+        if combined:
+            # 긴 형식 표 하나로 전체 종목 렌더(공통 시작일 = 100)
+            long = normalized_long({t: s for _, t, s in valid}, names, points)
+            ch = (
+                alt.Chart(long)
+                .mark_line()
+                .encode(
+                    x=alt.X("Date:T", title=""),
+                    y=alt.Y("지수:Q", title="시작=100", scale=alt.Scale(zero=False)),
+                    color=alt.Color("종목:N", title=""),
+                    tooltip=[alt.Tooltip("Date:T"), "종목", alt.Tooltip("지수:Q", format=",.2f")],
+                ).properties(height=360)
+            )
+            st.altair_chart(ch, use_container_width=True)
+        # 2열 그리드로 차트 배치
+        cols = st.columns(2)
+        for i, (idx, t, s) in enumerate(valid):
+            with cols[i % 2]:
+                # --- 제목: 한글명 + 코드(회색 작은 글씨) ---
+                name = names.get(t, t)
+                st.markdown(
+                    f"### {name} "
+                    f"<span style='color:#7f8c8d;font-size:0.9rem'>`{t}`</span>",
+                    unsafe_allow_html=True
+                )
+
+                # --- 가격 요약: 종가, 전일대비, 변화율 ---
+                last = float(s.iloc[-1])
+                prev = float(s.iloc[-2]) if len(s) > 1 else None
+                delta = (last - prev) if prev else 0.0
+                delta_pct = (delta / prev * 100) if prev else 0.0
+                c1, c2, c3 = st.columns(3)
+                ccy = show_ccy if show_ccy != "원 통화" else get_fx().currency(t)
+                c1.metric("종가", f"{SYMBOLS.get(ccy, ccy + ' ')}{last:,.2f}" if ccy != "KRW" else f"{last:,.0f}원")
+                c2.metric("전일대비", f"{delta:+,.0f}", f"{delta_pct:+.2f}%")
+                c3.metric("데이터수", len(s))
+
+                # --- 라인 차트 ---
+                render_series(s)
+
+                # --- 개별 제거 버튼 ---
+                # 키는 인덱스+티커 조합으로 고유화
+                if st.button("× 제거", key=f"rm_{idx}_{t}"):
+                    st.session_state.watch.remove(t)
+                    st.rerun()
+
+    # ---------------- 진단 ----------------
+    # 내부 상태 점검용 테이블. 기본 비표시
+    show_diag = st.checkbox("진단 보기", value=False)
+    if show_diag and diag:
+        st.dataframe(pd.DataFrame(diag), use_container_width=True, hide_index=True)
+    if show_diag:
+        # 소스별 호출/실패/지연과 서킷 상태
+        st.dataframe(get_provider().status(), use_container_width=True, hide_index=True)
+        # 공용 갱신기: 티커별 마지막 갱신/경과, 구독 세션 수
+        st.dataframe(shared_refresher().status(st.session_state.watch), use_container_width=True, hide_index=True)
+        st.caption(f"구독 세션 {shared_refresher().sessions()}개 · 갱신 주기 {shared_refresher().cycles:,}회")
+
+        # 핫패스 계측(프로세스 공용, 모든 세션/페이지 합산). 끄면 기록 비용 없음
+        # 켜짐 여부는 버튼을 누를 때만 바꿈(렌더마다 위젯 값으로 덮어쓰면 세션끼리 서로 되돌림)
+        on = instrument.enabled()
+        i1, i2 = st.columns([4, 1])
+        i1.caption(f"계측 기록: {'켜짐' if on else '꺼짐'} · 프로세스 공용(모든 세션에 적용) · "
+                   "소스 호출/로더/계산 단계별 호출 수, 지연 분포, 캐시 적중률, 삼킨 예외")
+        if i2.button("끄기" if on else "켜기", key="instrument_switch"):
+            instrument.enable(not on)
+            st.rerun()
+        reg = instrument.get_registry()
+        summary = reg.summary()
+        if summary.empty:
+            st.caption("계측 기록 없음. 켠 뒤 화면을 다시 불러오면 쌓입니다.")
+        else:
+            st.dataframe(summary, use_container_width=True, hide_index=True)
+            pick = st.selectbox("지연 분포", summary["항목"])
+            hist = (
+                alt.Chart(reg.histogram(pick))
+                .mark_bar()
+                .encode(x=alt.X("구간(ms):N", sort=None, title="ms"), y=alt.Y("호출:Q", title=""))
+                .properties(height=180)
             )
+            st.altair_chart(hist, use_container_width=True)
+        swallowed = reg.swallowed()
+        if not swallowed.empty:
+            st.markdown("##### 넘어간 예외(최근)")
+            st.dataframe(swallowed, use_container_width=True, hide_index=True)
+        d1, d2 = st.columns(2)
+        d1.download_button("프로파일 내려받기(JSON)", json.dumps(reg.dump(), ensure_ascii=False),
+                           file_name=f"profile_{time.strftime('%Y%m%d_%H%M%S')}.json", mime="application/json")
+        if d2.button("계측 초기화"):
+            reg.reset()
 
-            # --- 가격 요약: 종가, 전일대비, 변화율 ---
-            last = float(s.iloc[-1])
-            prev = float(s.iloc[-2]) if len(s) > 1 else None
-            delta = (last - prev) if prev else 0.0
-            delta_pct = (delta / prev * 100) if prev else 0.0
-            c1, c2, c3 = st.columns(3)
-            c1.metric("종가", f"{last:,.0f}원")
-            c2.metric("전일대비", f"{delta:+,.0f}", f"{delta_pct:+.2f}%")
-            c3.metric("데이터수", len(s))
-
-            # --- 라인 차트 ---
-            render_series(s)
-
-            # --- 개별 제거 버튼 ---
-            # 키는 인덱스+티커 조합으로 고유화
-            if st.button("× 제거", key=f"rm_{idx}_{t}"):
-                st.session_state.watch.remove(t)
-                st.experimental_rerun()
-
-# ---------------- 진단 ----------------
-# 내부 상태 점검용 테이블. 기본 비표시
-show_diag = st.checkbox("진단 보기", value=False)
-if show_diag and diag:
-    st.dataframe(pd.DataFrame(diag), use_container_width=True, hide_index=True)
+render_watchlist()
 
 # 법적 고지
 st.caption("KRX 및 야후 데이터. 지연 가능. 투자 판단 참고용.")
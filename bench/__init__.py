@@ -0,0 +1,2 @@
+# bench/__init__.py
+"""오프라인 벤치마크(pykrx/yfinance 대역 + 기준선 비교)"""
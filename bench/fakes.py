@@ -0,0 +1,204 @@
+# bench/fakes.py
+"""
+오프라인 벤치마크용 pykrx / yfinance 대역.
+- 실제 API와 같은 함수 이름·응답 모양(컬럼명, 인덱스)을 흉내 냄
+- 시세는 티커별 고정 시드 랜덤워크로 만든 합성 데이터(실제 시세 기록 아님). 같은 티커면 언제나 같은 값
+- 시장 전체 일별 응답은 (날짜, 종목 목록)별로 한 번만 생성 → 콜드 측정에 대역 생성 비용이 섞이지 않음
+- latency: 호출마다 지연(초) 주입. 네트워크 왕복 비용이 있는 경로 비교용
+- install()이 sys.modules에 끼워 넣으므로 core 모듈의 지연 import가 그대로 대역을 사용
+"""
+import sys
+import time
+import types
+import zlib
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+FIRST = "2000-01-03"
+
+
+class Fixture:
+    """대역 데이터 설정(시장별 종목 수, 호출 지연)"""
+
+    def __init__(self, n_etf: int = 900, n_kospi: int = 950, n_kosdaq: int = 1700, latency: float = 0.0):
+        self.latency = latency
+        self.codes = {
+            "ETF": [f"{400000 + i:06d}" for i in range(n_etf)],
+            "KOSPI": [f"{i * 5:06d}" for i in range(1, n_kospi + 1)],
+            "KOSDAQ": [f"{100000 + i * 7:06d}" for i in range(n_kosdaq)],
+        }
+        self.names = {c: f"{m} 종목{i} {'코스피' if m == 'KOSPI' else '성장'}"
+                      for m, cs in self.codes.items() for i, c in enumerate(cs)}
+        self.calls = 0
+
+    def wait(self):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+
+@lru_cache(maxsize=1)
+def _calendar(today: pd.Timestamp) -> pd.DatetimeIndex:
+    return pd.bdate_range(FIRST, today).rename("Date")
+
+
+@lru_cache(maxsize=4096)
+def _history(ticker: str) -> pd.DataFrame:
+    """티커별 전체 일봉(2000년~오늘, 영업일)"""
+    rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+    idx = _calendar(pd.Timestamp.today().normalize())
+    close = 10_000 * np.exp(np.cumsum(rng.normal(0.0002, 0.012, len(idx))))
+    spread = np.abs(rng.normal(0, 0.006, len(idx)))
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.004, len(idx))),
+        "High": close * (1 + spread),
+        "Low": close * (1 - spread),
+        "Close": close,
+        "Volume": rng.integers(1_000, 1_000_000, len(idx)).astype("float64"),
+    }, index=idx)
+
+
+def _slice(ticker: str, start, end) -> pd.DataFrame:
+    h = _history(ticker)
+    return h.loc[pd.Timestamp(start):pd.Timestamp(end)]
+
+
+def _day(d) -> pd.Timestamp:
+    return pd.Timestamp(str(d))
+
+
+@lru_cache(maxsize=16)
+def _by_ticker(d: pd.Timestamp, codes: tuple) -> pd.DataFrame:
+    """날짜 d의 종목별 일봉(pykrx 시장 전체 응답 모양). 호출 측에서 복사해 사용"""
+    rows = []
+    for c in codes:
+        h = _history(c)
+        i = min(h.index.searchsorted(d, side="right") - 1, len(h) - 1)
+        rows.append(h.iloc[max(i, 0)].to_numpy())
+    df = pd.DataFrame(rows, index=pd.Index(codes, name="티커"),
+                      columns=["시가", "고가", "저가", "종가", "거래량"]).round()
+    df["거래대금"] = df["종가"] * df["거래량"]
+    # pykrx 응답처럼 가격·수량은 정수
+    return df.astype("int64")
+
+
+# ---------- pykrx.stock ----------
+def _pykrx(fx: Fixture) -> types.ModuleType:
+    stock = types.ModuleType("pykrx.stock")
+    krx_cols = {"Open": "시가", "High": "고가", "Low": "저가", "Close": "종가", "Volume": "거래량"}
+
+    def get_etf_ticker_list(date=None):
+        fx.wait()
+        return list(fx.codes["ETF"])
+
+    def get_market_ticker_list(date=None, market="KOSPI"):
+        fx.wait()
+        return list(fx.codes.get(market, []))
+
+    def get_etf_ticker_name(code):
+        return fx.names.get(code, code)
+
+    def get_market_ticker_name(code):
+        return fx.names.get(code, code)
+
+    def get_etf_ohlcv_by_date(fromdate, todate, ticker):
+        fx.wait()
+        df = _slice(ticker, _day(fromdate), _day(todate)).rename(columns=krx_cols)
+        df["거래대금"] = df["종가"] * df["거래량"]
+        return df.rename_axis("날짜")
+
+    def get_market_ohlcv_by_ticker(date, market="KOSPI"):
+        fx.wait()
+        df = _by_ticker(_day(date), tuple(fx.codes.get(market, []))).copy()
+        df["등락률"] = (df["종가"] / df["시가"] - 1) * 100
+        return df
+
+    def get_etf_ohlcv_by_ticker(date):
+        fx.wait()
+        df = _by_ticker(_day(date), tuple(fx.codes["ETF"])).copy()
+        df.insert(0, "NAV", df["종가"])
+        df["기초지수"] = df["종가"] / 10
+        return df
+
+    def get_nearest_business_day_in_a_week(date=None, prev=True):
+        d = _day(date or pd.Timestamp.today().strftime("%Y%m%d"))
+        while d.weekday() >= 5:
+            d -= pd.Timedelta(days=1)
+        return d.strftime("%Y%m%d")
+
+    def get_previous_business_days(fromdate, todate):
+        fx.wait()
+        return list(pd.bdate_range(_day(fromdate), _day(todate)))
+
+    def get_etf_portfolio_deposit_file(ticker, date=None):
+        fx.wait()
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        pool = fx.codes["KOSPI"] + fx.codes["KOSDAQ"]
+        pick = rng.choice(len(pool), size=min(200, len(pool)), replace=False)
+        amt = rng.pareto(1.5, len(pick)) + 1
+        return pd.DataFrame({"계약수": amt.round(), "금액": amt * 1e6, "비중": amt / amt.sum() * 100},
+                            index=pd.Index([pool[i] for i in pick], name="티커"))
+
+    def get_market_sector_classifications(date=None, market="KOSPI"):
+        fx.wait()
+        codes = fx.codes.get(market, [])
+        return pd.DataFrame({"종목명": [fx.names[c] for c in codes],
+                             "업종명": [f"업종{zlib.crc32(c.encode()) % 24}" for c in codes]},
+                            index=pd.Index(codes, name="종목코드"))
+
+    for f in (get_etf_ticker_list, get_market_ticker_list, get_etf_ticker_name, get_market_ticker_name,
+              get_etf_ohlcv_by_date, get_market_ohlcv_by_ticker, get_etf_ohlcv_by_ticker,
+              get_nearest_business_day_in_a_week, get_previous_business_days,
+              get_etf_portfolio_deposit_file, get_market_sector_classifications):
+        setattr(stock, f.__name__, f)
+    return stock
+
+
+# ---------- yfinance ----------
+def _yfinance(fx: Fixture) -> types.ModuleType:
+    yf = types.ModuleType("yfinance")
+
+    def download(tickers, start=None, end=None, interval="1d", progress=False, auto_adjust=False,
+                 threads=True, group_by="column", **_):
+        fx.wait()
+        names = [tickers] if isinstance(tickers, str) else list(tickers)
+        end = pd.Timestamp(end) - pd.Timedelta(days=1) if end else pd.Timestamp.today()
+        parts = {t: _slice(t, start or FIRST, end) for t in names}
+        if isinstance(tickers, str):
+            return parts[tickers]
+        return pd.concat(parts, axis=1) if group_by == "ticker" else \
+            pd.concat(parts, axis=1).swaplevel(0, 1, axis=1)
+
+    class Ticker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        @property
+        def info(self):
+            fx.wait()
+            return {"shortName": f"{self.ticker} Fund", "currency": "USD"}
+
+        @property
+        def actions(self):
+            fx.wait()
+            h = _history(self.ticker)
+            ex = h.index[::63]  # 분기 분배
+            return pd.DataFrame({"Dividends": h["Close"].reindex(ex).to_numpy() * 0.004,
+                                 "Stock Splits": 0.0}, index=ex)
+
+    yf.download = download
+    yf.Ticker = Ticker
+    return yf
+
+
+def install(fixture: Fixture | None = None) -> Fixture:
+    """sys.modules에 대역 등록. 반환한 Fixture로 호출 수/지연 조정"""
+    fx = fixture or Fixture()
+    pykrx = types.ModuleType("pykrx")
+    pykrx.stock = _pykrx(fx)
+    sys.modules["pykrx"] = pykrx
+    sys.modules["pykrx.stock"] = pykrx.stock
+    sys.modules["yfinance"] = _yfinance(fx)
+    return fx
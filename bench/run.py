@@ -0,0 +1,265 @@
+# bench/run.py
+"""
+오프라인 벤치마크.
+- pykrx / yfinance 대역(bench.fakes) 위에서 핫패스를 데이터 크기별로 측정
+- 대역 데이터는 녹화본이 아니라 티커별 고정 시드로 만든 합성 데이터(응답 모양만 실제 API와 같음)
+- 결과는 JSON으로 저장하고 기준선(bench/baseline.json)과 비교 → 느려진 항목이 있으면 종료 코드 1
+- 비교는 최솟값 기준(중앙값은 부하 잡음에 흔들림). 허용 차이 하한은 크기별(MIN_DELTA)
+
+실행:
+    python -m bench.run                         # small, medium 측정 + 기준선 비교
+    python -m bench.run --sizes small,medium,large --latency 0.05
+    python -m bench.run --update-baseline --sizes small,medium,large   # 현재 결과를 기준선으로 저장
+    python -m bench.run --repeat-scale 4        # 반복 횟수 4배(더 안정, 더 느림)
+    python -m bench.run --profile profile.json  # 계측을 켜고 항목별 프로파일도 저장
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# core import 전에 캐시 루트를 임시 폴더로(사용자 .data 보호)
+os.environ["PORTFOLIO_DATA_DIR"] = tempfile.mkdtemp(prefix="portfolio_bench_")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from bench import fakes  # noqa: E402
+
+HERE = Path(__file__).resolve().parent
+BASELINE = HERE / "baseline.json"
+TOLERANCE = 1.5       # 기준선 대비 이 배율을 넘으면 회귀
+MIN_DELTA = {"small": 0.002, "medium": 0.005, "large": 0.02}   # 초. 크기별로 이보다 작은 차이는 잡음으로 봄
+REPEAT_SCALE = 2      # 항목별 반복 횟수 배율(--repeat-scale)
+
+# 크기별 파라미터: 시장 종목 수, 워치리스트/보유 수, 자산 수, 피벗 원본 행 수
+SIZES = {
+    "small": {"market": (300, 300, 600), "tickers": 4, "holdings": 10, "assets": 3, "rows": 1_000},
+    "medium": {"market": (900, 950, 1700), "tickers": 20, "holdings": 100, "assets": 10, "rows": 100_000},
+    "large": {"market": (3000, 3000, 6000), "tickers": 80, "holdings": 1_000, "assets": 30, "rows": 1_000_000},
+}
+
+
+def measure(fn, repeat: int = 5, setup=None) -> dict:
+    """setup()(측정 제외) 후 fn() 시간. 중앙값/최소값(초). 반복 횟수는 REPEAT_SCALE배"""
+    repeat *= REPEAT_SCALE
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return {"median": statistics.median(times), "min": min(times), "repeat": repeat}
+
+
+def _reset():
+    """프로세스 캐시 + 임시 데이터 폴더 비우기(콜드 측정용)"""
+    from core import DATA_DIR, fx, market, price_store, provider, quotes, symbols, total_return
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    symbols._current, symbols._checked = None, ("", 0.0)
+    price_store._store = None
+    provider._provider = None
+    total_return._tr = None
+    fx._fx = None
+    quotes.get_quotes().clear()
+    market.clear()
+
+
+# ---------- 측정 항목 ----------
+def bench_search(cfg: dict) -> dict:
+    from core.symbols import get_directory
+    queries = ["코스피", "ㅋㅅㅍ", "종목1", "성장", "40001", "ETF 종목12"]
+    out = {"build": measure(get_directory, repeat=3, setup=_reset)}
+    d = get_directory()
+    out["search"] = measure(lambda: [d.search(q, market="ETF", limit=50) for q in queries], repeat=20)
+    return out
+
+
+def _watchlist(fx: fakes.Fixture, n: int) -> list[str]:
+    krx = [f"{c}.KS" for c in fx.codes["ETF"][: n - n // 4]]
+    return krx + [f"US{i:03d}" for i in range(n // 4)]
+
+
+def bench_load_series(cfg: dict, fx: fakes.Fixture) -> dict:
+    from core.batch import load_many
+    tickers = _watchlist(fx, cfg["tickers"])
+    out = {"cold": measure(lambda: load_many(tickers, "1y"), repeat=3, setup=_reset)}
+    out["warm"] = measure(lambda: load_many(tickers, "1y"), repeat=10)
+    out["total_return"] = measure(lambda: load_many(tickers, "1y", total_return=True), repeat=5)
+    return out
+
+
+def bench_holdings(cfg: dict, fx: fakes.Fixture) -> dict:
+    """포트폴리오 페이지 evaluate_holdings와 같은 경로: 통화 → 환율 → 시세 → 일괄 평가"""
+    from core.fx import get_fx
+    from core.quotes import get_quotes, value_holdings
+    n = cfg["holdings"]
+    tk = _watchlist(fx, n)
+    df = pd.DataFrame({"티커": tk, "수량": np.arange(1, n + 1, dtype=float), "평단가": 100.0})
+
+    def evaluate():
+        ccy = get_fx().currencies(df["티커"])
+        rates = get_fx().spot(ccy.unique(), "KRW")
+        out = value_holdings(df, get_quotes().quotes(df["티커"]), ccy.map(rates), ccy)
+        return out["평가액"].sum()
+
+    return {"cold": measure(evaluate, repeat=3, setup=get_quotes().clear),
+            "warm": measure(evaluate, repeat=10)}
+
+
+def bench_projection(cfg: dict) -> dict:
+    from core.sim import MODE_CONTRIB, MODE_FULL, project
+    a = cfg["assets"]
+    rng = np.random.default_rng(0)
+    init, w = rng.uniform(1e6, 1e7, a), np.full(a, 1.0 / a)
+    mu = rng.normal(0.005, 0.002, a)
+    paths = rng.normal(0.005, 0.04, (200, a, 360))
+    return {
+        "contrib": measure(lambda: project(init, mu, w, 500_000, 360, MODE_CONTRIB), repeat=20),
+        "full": measure(lambda: project(init, mu, w, 500_000, 360, MODE_FULL), repeat=20),
+        "paths200": measure(lambda: project(init, paths, w, 500_000, 360, MODE_FULL), repeat=5),
+    }
+
+
+def bench_ranking(cfg: dict) -> dict:
+    from core import market
+    day = market.bizday()
+
+    def rank():
+        df = market.snapshot(day, "KOSPI+KOSDAQ")
+        return market.top_n(df, "거래대금", 50)
+
+    return {"cold": measure(rank, repeat=3, setup=market.clear), "warm": measure(rank, repeat=20)}
+
+
+def bench_pivot(cfg: dict) -> dict:
+    from core.pivot import collapse_repeats, mark_group_first, subtotal_pivot
+    n = cfg["rows"]
+    rng = np.random.default_rng(0)
+    raw = pd.DataFrame({
+        "프로젝트": rng.choice([f"P{i:03d}" for i in range(max(n // 2000, 5))], n),
+        "공정": rng.choice(["절단", "용접", "도장", "조립", "검사"], n),
+        "월": rng.choice([f"2025-{m:02d}" for m in range(1, 13)], n),
+        "금액": rng.integers(1, 1000, n),
+    })
+    idx = ["프로젝트", "공정"]
+    res = subtotal_pivot(raw, idx, "금액", "sum", column="월")
+    marked = mark_group_first(res.frame, idx[0])
+    return {
+        "subtotal": measure(lambda: subtotal_pivot(raw, idx, "금액", "sum", column="월"), repeat=5),
+        "subtotal_mean": measure(lambda: subtotal_pivot(raw, idx, "금액", "mean", column="월"), repeat=5),
+        "group_first": measure(lambda: mark_group_first(res.frame, idx[0]), repeat=10),
+        "collapse_page": measure(lambda: collapse_repeats(marked.iloc[:500].reset_index(drop=True), idx), repeat=10),
+    }
+
+
+def run(sizes: list[str], latency: float) -> dict:
+    results = {}
+    for size in sizes:
+        cfg = SIZES[size]
+        fx = fakes.install(fakes.Fixture(*cfg["market"], latency=latency))
+        _reset()
+        groups = {
+            "search_krx": lambda: bench_search(cfg),
+            "load_series": lambda: bench_load_series(cfg, fx),
+            "evaluate_holdings": lambda: bench_holdings(cfg, fx),
+            "projection": lambda: bench_projection(cfg),
+            "ranking": lambda: bench_ranking(cfg),
+            "aggrid_subtotal": lambda: bench_pivot(cfg),
+        }
+        for group, fn in groups.items():
+            for case, r in fn().items():
+                key = f"{group}.{case}[{size}]"
+                results[key] = r
+                print(f"{key:<45} {r['median'] * 1000:10.2f} ms", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float = TOLERANCE) -> list[dict]:
+    """
+    기준선 대비 회귀 목록(최솟값 기준).
+    - 배율이 tolerance를 넘고, 차이가 크기별 MIN_DELTA보다 클 때만 회귀
+    """
+    out = []
+    for key, r in results.items():
+        base = baseline.get("results", {}).get(key)
+        if base is None:
+            continue
+        size = key.rsplit("[", 1)[-1].rstrip("]")
+        ratio = r["min"] / base["min"] if base["min"] > 0 else float("inf")
+        if ratio > tolerance and r["min"] - base["min"] > MIN_DELTA.get(size, MIN_DELTA["small"]):
+            out.append({"항목": key, "기준(ms)": base["min"] * 1000, "현재(ms)": r["min"] * 1000, "배율": ratio})
+    return out
+
+
+def main(argv=None) -> int:
+    global REPEAT_SCALE
+    ap = argparse.ArgumentParser(description="오프라인 벤치마크")
+    ap.add_argument("--sizes", default="small,medium", help="쉼표 구분: " + ",".join(SIZES))
+    ap.add_argument("--latency", type=float, default=0.0, help="대역 호출당 지연(초)")
+    ap.add_argument("--out", type=Path, default=HERE / "results.json")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE)
+    ap.add_argument("--update-baseline", action="store_true")
+    ap.add_argument("--repeat-scale", type=int, default=REPEAT_SCALE, help="항목별 반복 횟수 배율")
+    ap.add_argument("--profile", type=Path, help="계측(core.instrument) 덤프 경로. 켜면 측정값에 계측 비용 포함")
+    args = ap.parse_args(argv)
+    REPEAT_SCALE = max(1, args.repeat_scale)
+    if args.profile:
+        from core import instrument
+        instrument.enable()
+
+    sizes = [s.strip() for s in args.sizes.split(",") if s.strip()]
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "latency": args.latency,
+            "repeat_scale": REPEAT_SCALE,
+            "sizes": sizes,
+        },
+        "results": run(sizes, args.latency),
+    }
+    args.out.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+    print(f"결과 저장: {args.out}")
+    if args.profile:
+        from core import instrument
+        args.profile.write_text(json.dumps(instrument.get_registry().dump(), ensure_ascii=False, indent=1),
+                                encoding="utf-8")
+        print(f"프로파일 저장: {args.profile}")
+    shutil.rmtree(os.environ["PORTFOLIO_DATA_DIR"], ignore_errors=True)
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(report, ensure_ascii=False, indent=1), encoding="utf-8")
+        print(f"기준선 갱신: {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print("기준선 없음(--update-baseline으로 생성)")
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if baseline["meta"].get("latency") != args.latency:
+        print("주의: 기준선과 주입 지연이 다름")
+    missing = [s for s in sizes if s not in baseline["meta"].get("sizes", [])]
+    if missing:
+        print(f"주의: 기준선에 없는 크기(비교 안 함): {', '.join(missing)}")
+    slow = compare(report["results"], baseline, args.tolerance)
+    for s in slow:
+        print(f"회귀 {s['항목']}: {s['기준(ms)']:.2f} → {s['현재(ms)']:.2f} ms (×{s['배율']:.2f})")
+    if not slow:
+        print(f"회귀 없음(허용 ×{args.tolerance})")
+    return 1 if slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,8 @@
+# core/__init__.py
+"""페이지 공용 데이터 소스·캐시·계산 모듈"""
+import os
+from pathlib import Path
+
+# 로컬 캐시 루트. PORTFOLIO_DATA_DIR 환경변수로 위치 변경 가능
+DATA_DIR = Path(os.environ.get("PORTFOLIO_DATA_DIR",
+                               Path(__file__).resolve().parent.parent / ".data"))
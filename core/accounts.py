@@ -0,0 +1,183 @@
+# core/accounts.py
+"""
+다중 계좌 보유 저장소 + 통합 평가.
+- 전 계좌 보유를 한 Parquet(계좌/티커 category + 수량/평단가 float64)에 보관, 계좌 목록은 JSON
+- 평가: 전 계좌 행을 한 번에 value_holdings → 계좌별/티커별 요약은 groupby 한 번씩
+- 시세/환율은 전 계좌 티커 합집합으로 한 번 조회(호출 측에서 evaluate 한 번)
+- 리밸런싱 제안/현재 비중은 배열 연산(행 루프 없음)
+"""
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core import DATA_DIR
+
+ACCOUNT_DIR = DATA_DIR / "accounts"
+KINDS = ["일반", "ISA", "연금저축", "IRP", "DC", "기타"]
+COLUMNS = ["계좌", "티커", "수량", "평단가"]
+
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame({"계좌": pd.Categorical([]), "티커": pd.Categorical([]),
+                         "수량": pd.Series(dtype="float64"), "평단가": pd.Series(dtype="float64")})
+
+
+def clean(df: pd.DataFrame, account: str) -> pd.DataFrame:
+    """편집기 입력 → 저장 형식. 빈 티커/수량 0 행 제외, 같은 티커는 합쳐 평단가 가중 평균"""
+    tk = df.get("티커", pd.Series(dtype=str)).astype("string").str.strip().str.upper()
+    q = pd.to_numeric(df.get("수량"), errors="coerce").fillna(0.0).astype("float64")
+    avg = pd.to_numeric(df.get("평단가"), errors="coerce").fillna(0.0).astype("float64")
+    keep = tk.notna() & (tk != "") & (q != 0)
+    rows = pd.DataFrame({"티커": tk[keep].astype(str), "수량": q[keep], "원가": (q * avg)[keep]})
+    g = rows.groupby("티커", sort=False, as_index=False)[["수량", "원가"]].sum()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g["평단가"] = np.where(g["수량"] != 0, g["원가"] / g["수량"], 0.0)
+    g.insert(0, "계좌", account)
+    return g[COLUMNS]
+
+
+class AccountStore:
+    """
+    계좌 목록 + 전 계좌 보유.
+    - 계좌 하나 저장 시에도 전체 Parquet을 다시 씀(수천 행 수준이라 수 ms)
+    """
+
+    def __init__(self, root=ACCOUNT_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        try:
+            self._accounts: list[dict] = json.loads((root / "accounts.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._accounts = []
+        path = root / "holdings.parquet"
+        self._frame = pd.read_parquet(path) if path.exists() else _empty()
+
+    # ---------- 계좌 ----------
+    def accounts(self) -> pd.DataFrame:
+        """계좌, 종류, 보유 종목 수"""
+        df = pd.DataFrame(self._accounts, columns=["계좌", "종류"])
+        n = self._frame.groupby("계좌", observed=True).size()
+        df["종목수"] = df["계좌"].map(n).fillna(0).astype(int)
+        return df
+
+    def names(self) -> list[str]:
+        return [a["계좌"] for a in self._accounts]
+
+    def add_account(self, name: str, kind: str = KINDS[0]):
+        name = name.strip()
+        if not name:
+            raise ValueError("계좌 이름 없음")
+        with self._lock:
+            if name in self.names():
+                raise ValueError(f"이미 있는 계좌: {name}")
+            self._accounts.append({"계좌": name, "종류": kind})
+            self._save_accounts()
+
+    def remove_account(self, name: str):
+        """계좌와 그 보유 삭제"""
+        with self._lock:
+            self._accounts = [a for a in self._accounts if a["계좌"] != name]
+            self._save_accounts()
+            self._write(self._frame[self._frame["계좌"] != name])
+
+    def _save_accounts(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / "accounts.json").write_text(json.dumps(self._accounts, ensure_ascii=False), encoding="utf-8")
+
+    # ---------- 보유 ----------
+    def holdings(self, accounts=None) -> pd.DataFrame:
+        """계좌/티커/수량/평단가(계좌 목록 순서). accounts가 있으면 그 계좌만"""
+        df = self._frame
+        if accounts is not None:
+            df = df[df["계좌"].isin(list(accounts))]
+        return df.astype({"계좌": str, "티커": str}).reset_index(drop=True)
+
+    def set_holdings(self, account: str, df: pd.DataFrame):
+        """계좌 하나의 보유를 통째로 교체"""
+        with self._lock:
+            if account not in self.names():
+                raise ValueError(f"없는 계좌: {account}")
+            rest = self._frame[self._frame["계좌"] != account].astype({"계좌": str, "티커": str})
+            new = clean(df, account)
+            self._write(pd.concat([rest, new], ignore_index=True) if len(rest) else new)
+
+    def tickers(self, accounts=None) -> list[str]:
+        """보유 티커 합집합(처음 나온 순서)"""
+        return list(dict.fromkeys(self.holdings(accounts)["티커"]))
+
+    def _write(self, df: pd.DataFrame):
+        order = {a: i for i, a in enumerate(self.names())}
+        df = df.astype({"계좌": str, "티커": str})
+        df = df.iloc[np.argsort(df["계좌"].map(order).fillna(len(order)).to_numpy(), kind="stable")]
+        df = df.astype({"계좌": "category", "티커": "category"}).reset_index(drop=True)
+        self.root.mkdir(parents=True, exist_ok=True)
+        path = self.root / "holdings.parquet"
+        tmp = path.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False)
+        tmp.replace(path)
+        self._frame = df
+
+
+# ---------- 통합 평가 ----------
+def by_account(valued: pd.DataFrame) -> pd.DataFrame:
+    """계좌별 평가액/원가/손익/비중(기준 통화). valued: 계좌 컬럼이 붙은 value_holdings 결과"""
+    g = valued.groupby("계좌", sort=False)[["평가액", "원가"]].sum()
+    g["손익"] = g["평가액"] - g["원가"]
+    total = g["평가액"].sum()
+    g["비중"] = g["평가액"] / total if total > 0 else 0.0
+    return g.reset_index()
+
+
+def consolidate(valued: pd.DataFrame) -> pd.DataFrame:
+    """
+    티커별 전 계좌 합산. 평단가는 거래 통화 기준 수량 가중 평균.
+    - 평가액/원가는 기준 통화
+    """
+    v = valued.assign(_원가거래=valued["수량"] * valued["평단가"])
+    g = v.groupby("티커", sort=False).agg(
+        통화=("통화", "first"), 수량=("수량", "sum"), 가격=("가격", "first"), 원가거래=("_원가거래", "sum"),
+        환율=("환율", "first"), 평가액=("평가액", "sum"), 원가=("원가", "sum"), 계좌수=("계좌", "nunique"))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g["평단가"] = np.where(g["수량"] != 0, g["원가거래"] / g["수량"], 0.0)
+    total = g["평가액"].sum()
+    g["비중"] = g["평가액"] / total if total > 0 else 0.0
+    return g.drop(columns="원가거래").reset_index()[
+        ["티커", "통화", "수량", "가격", "평단가", "환율", "평가액", "원가", "비중", "계좌수"]]
+
+
+def current_weights(valued: pd.DataFrame) -> pd.Series:
+    """티커 → 현재 비중(전 계좌 합산 평가액 기준)"""
+    v = valued.groupby("티커", sort=False)["평가액"].sum()
+    total = v.sum()
+    return v / total if total > 0 else v * 0.0
+
+
+def rebalance_plan(tickers, weights, current: pd.Series, total: float, currency: str) -> pd.DataFrame:
+    """
+    목표 행별 제안 금액 = (목표 비중 - 현재 비중) × 총평가액. 배열 연산.
+    - tickers/weights: 목표 표 행 순서 그대로(같은 티커가 여러 줄이면 줄마다)
+    """
+    tk = pd.Index(pd.Series(tickers, dtype=str))
+    tw = np.asarray(weights, dtype="float64")
+    cw = current.reindex(tk).fillna(0.0).to_numpy(dtype="float64")
+    return pd.DataFrame({
+        "티커": tk,
+        "현재비중": np.round(cw * 100, 2),
+        "목표비중": np.round(tw * 100, 2),
+        f"제안금액({currency})": ((tw - cw) * total).astype(np.int64),
+    })
+
+
+_store: AccountStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_accounts() -> AccountStore:
+    """프로세스 공용 계좌 저장소"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = AccountStore()
+        return _store
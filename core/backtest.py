@@ -0,0 +1,106 @@
+# core/backtest.py
+"""
+목표 비중 과거 백테스트.
+- 정렬된 일봉 종가 행렬(날짜 × 자산) 위에서 월 적립/리밸런싱 규칙 재현
+- 비중 벡터 K개를 한 번에 계산. 일자 루프 없이 행렬곱/누적합만 사용
+- 적립 시점: 첫 거래일(초기금 + 첫 적립), 이후 매월 첫 거래일
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core import instrument
+from core.sim import MODE_CONTRIB, MODE_FULL, accumulate
+
+TRADING_DAYS = 252
+
+
+class BacktestResult(NamedTuple):
+    """nav: (K, 일수) 평가액, metrics: K행 지표표, flows: (일수,) 투입액"""
+    dates: pd.DatetimeIndex
+    nav: np.ndarray
+    metrics: pd.DataFrame
+    flows: np.ndarray
+
+
+def price_matrix(series: dict[str, pd.Series], tickers: list[str] | None = None) -> pd.DataFrame:
+    """
+    티커별 종가 → 날짜 정렬 행렬.
+    - 휴장일 차이는 직전 값으로 채움
+    - 모든 자산 가격이 생긴 날부터 사용
+    """
+    df = pd.DataFrame(series)
+    if tickers is not None:
+        df = df.reindex(columns=tickers)
+    df = df.sort_index().ffill().dropna()
+    return df.astype("float64")
+
+
+def _events(dates: pd.DatetimeIndex) -> np.ndarray:
+    """적립 시점 행 번호: 0행 + 매월 첫 거래일"""
+    month = dates.year * 12 + dates.month
+    first = np.flatnonzero(np.diff(month) != 0) + 1
+    return np.concatenate([[0], first])
+
+
+@instrument.traced("backtest.backtest")
+def backtest(prices: pd.DataFrame, weights, monthly_contrib: float, initial: float = 0.0,
+             mode: str = MODE_CONTRIB) -> BacktestResult:
+    """
+    과거 종가로 적립식 포트폴리오 재현.
+    - weights: (자산,) 또는 (K, 자산). 행마다 합 1로 정규화
+    - MODE_CONTRIB: 투입금만 비중대로 매수, 보유분은 그대로
+    - MODE_FULL: 매월 적립 시점에 총액을 목표 비중으로 재분배
+    - 지표: 시간가중 수익률 기준 CAGR/변동성/MDD, 연 회전율(리밸런싱 매매 비중, 적립 제외)
+    """
+    P = prices.to_numpy(dtype="float64")              # (T, A)
+    W = np.atleast_2d(np.asarray(weights, dtype="float64"))
+    W = W / W.sum(axis=1, keepdims=True)               # (K, A)
+    T = P.shape[0]
+    ev = _events(prices.index)
+    c = np.full(len(ev), float(monthly_contrib))
+    c[0] += initial
+    e_of_t = np.searchsorted(ev, np.arange(T), side="right") - 1   # 각 날짜가 속한 적립 구간
+    flows = np.zeros(T)
+    flows[ev] = c
+
+    if mode == MODE_FULL:
+        # 적립 시점 i의 재분배 후 총액 V_i = V_{i-1} · (W·R_i) + c_i
+        R = P[ev[1:]] / P[ev[:-1]]                     # (E-1, A)
+        G = W @ R.T                                    # (K, E-1)
+        V = accumulate(np.full(W.shape[0], c[0]), G, c[1:])   # (K, E)
+        Q = P / P[ev[e_of_t]]                          # (T, A) 구간 시작 대비 가격
+        nav = V[:, e_of_t] * (W @ Q.T)
+        drift = W[:, None, :] * R[None, :, :] / G[:, :, None]  # 리밸런싱 직전 비중 (K, E-1, A)
+        turnover = 0.5 * np.abs(drift - W[:, None, :]).sum(axis=2).sum(axis=1)
+    else:
+        # 단위 비중당 누적 매수 수량 U는 비중과 무관 → NAV = W @ (P ⊙ U)ᵀ
+        U = np.cumsum(c[:, None] / P[ev], axis=0)      # (E, A)
+        nav = W @ (P * U[e_of_t]).T
+        turnover = np.zeros(W.shape[0])
+
+    metrics = _metrics(prices.index, nav, flows, turnover)
+    return BacktestResult(prices.index, nav, metrics, flows)
+
+
+def _metrics(dates: pd.DatetimeIndex, nav: np.ndarray, flows: np.ndarray, turnover: np.ndarray) -> pd.DataFrame:
+    """시간가중 일수익률 r_t = (NAV_t - 투입_t) / NAV_{t-1} - 1 기반 지표"""
+    prev = nav[:, :-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r = np.where(prev > 0, (nav[:, 1:] - flows[1:]) / prev - 1.0, 0.0)
+    years = max((dates[-1] - dates[0]).days / 365.25, 1e-9) if len(dates) > 1 else 1e-9
+    log_growth = np.log1p(r).sum(axis=1)
+    cagr = np.expm1(log_growth / years)
+    vol = r.std(axis=1) * np.sqrt(TRADING_DAYS) if r.shape[1] > 1 else np.zeros(nav.shape[0])
+    idx = np.exp(np.cumsum(np.log1p(r), axis=1))
+    peak = np.maximum.accumulate(np.maximum(idx, 1.0), axis=1)
+    mdd = (idx / peak - 1.0).min(axis=1) if r.shape[1] else np.zeros(nav.shape[0])
+    return pd.DataFrame({
+        "CAGR": cagr,
+        "변동성": vol,
+        "MDD": mdd,
+        "회전율(연)": turnover / years,
+        "기말평가액": nav[:, -1],
+        "총납입": flows.sum(),
+    })
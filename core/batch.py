@@ -0,0 +1,217 @@
+# core/batch.py
+"""
+워치리스트 일괄 로더.
+- 1단계: pykrx 대상 티커를 제한된 스레드 풀로 동시 조회
+- 2단계: 남은 티커(야후 대상, pykrx 실패분)를 필요 시작일이 가까운 것끼리 묶어 묶음마다 yf.download 한 번
+  (새 티커 하나나 max 기간 하나 때문에 전 티커가 전체 이력을 받지 않게)
+- 소스 선택/타임아웃/서킷은 공용 Provider가 담당(pykrx 중단 시 바로 2단계)
+- 같은 티커를 다른 세션이 조회 중이면 새로 요청하지 않고 그 결과를 기다림
+"""
+import datetime as dt
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import NamedTuple
+
+import pandas as pd
+
+from core import instrument
+from core.price_store import PriceStore, get_store, period_start
+from core.provider import get_provider
+from core.sources import yf_ohlcv_many
+from core.symbols import get_directory
+from core.total_return import get_total_return
+
+MAX_WORKERS = 8
+NAME_RETRY = 300.0                   # 이름 조회 실패 후 재시도까지(초)
+GROUP_SPAN = dt.timedelta(days=31)   # 시작일이 이 안에 드는 티커는 같은 yf.download로
+
+_inflight: dict[str, Future] = {}
+_inflight_lock = threading.Lock()
+
+
+class BatchResult(NamedTuple):
+    """series: 입력 순서(중복 제거)의 성공 티커별 종가, errors: 티커별 실패 사유"""
+    series: dict[str, pd.Series]
+    errors: dict[str, str]
+
+
+def _claim(tickers: list[str]):
+    """조회 권한 획득. (직접 조회할 티커, 다른 세션 조회를 기다릴 (티커, Future))"""
+    owned, waiting = [], []
+    with _inflight_lock:
+        for t in tickers:
+            f = _inflight.get(t)
+            if f is None:
+                _inflight[t] = Future()
+                owned.append(t)
+            else:
+                waiting.append((t, f))
+    return owned, waiting
+
+
+def _release(tickers: list[str]):
+    with _inflight_lock:
+        futures = [_inflight.pop(t, None) for t in tickers]
+    for f in futures:
+        if f is not None:
+            f.set_result(None)
+
+
+def _group_windows(need: dict, span: dt.timedelta = GROUP_SPAN) -> list[list[str]]:
+    """
+    {티커: (시작일, 교체 여부)} → 시작일 순 묶음. 묶음 첫 티커의 시작일 + span 안이면 같은 묶음
+    - 묶음 안에서 더 받는 구간은 티커당 span 이하
+    """
+    groups: list[list[str]] = []
+    first = None
+    for t in sorted(need, key=lambda k: need[k][0]):
+        a = need[t][0]
+        if groups and a - first <= span:
+            groups[-1].append(t)
+        else:
+            groups.append([t])
+            first = a
+    return groups
+
+
+def _refresh(store: PriceStore, tickers: list[str], start: dt.date, max_workers: int) -> dict[str, str]:
+    """저장소 갱신. 반환: 예외가 난 티커별 메시지"""
+    errors: dict[str, str] = {}
+    prov = get_provider()
+    krx, rest = [], []
+    for t in tickers:
+        src = store.meta(t).get("source")
+        if src and not store.read(t).empty and not prov.health[src].available():
+            continue  # 저장 소스 일시 중단 → 저장본 유지
+        (krx if prov.order(t, prefer=src)[0] == "pykrx" else rest).append(t)
+
+    # 1) pykrx: 티커별 요청이라 스레드 풀로 병렬화
+    if krx:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(krx))) as ex:
+            futures = {t: ex.submit(store.update, t, start, "pykrx") for t in krx}
+        for t, f in futures.items():
+            try:
+                f.result()
+            except Exception as e:
+                errors[t] = f"pykrx: {e}"
+            if not store.is_fresh(t, start):
+                rest.append(t)
+
+    # 2) yfinance: 필요 시작일이 가까운 티커끼리 묶어 묶음마다 한 번, 묶음의 가장 이른 시작일부터
+    windows = {t: store.window(t, start, "yfinance") for t in rest}
+    need = {t: w for t, w in windows.items() if w[0] is not None}
+    for group in _group_windows(need):
+        try:
+            frames = prov.call("yfinance", yf_ohlcv_many, group, need[group[0]][0], dt.date.today(), timeout=60)
+            for t in frames:
+                prov.remember(t, "yfinance")
+        except Exception as e:
+            frames = {}
+            for t in group:
+                errors[t] = f"yfinance: {e}"
+        for t in group:
+            a, replace = need[t]
+            df = frames.get(t)
+            if df is not None:
+                df = df[df.index >= pd.Timestamp(a)]
+            store.absorb(t, a, df, "yfinance", replace=replace)
+    return errors
+
+
+@instrument.traced("batch.load_many")
+def load_many(tickers: list[str], period: str, max_workers: int = MAX_WORKERS,
+              store: PriceStore | None = None, total_return: bool = False) -> BatchResult:
+    """
+    여러 티커의 기간 종가를 한 번에 로드.
+    - 신선한 저장본은 네트워크 없이 바로 사용
+    - total_return: 분배금 재투자 수정 종가(저장된 총수익 지수 사용, 이벤트는 하루 1회 재확인)
+    - 반환: BatchResult(series, errors). 데이터 없는 티커는 errors에만 기록
+    """
+    store = store or get_store()
+    start = period_start(period)
+    uniq = list(dict.fromkeys(tickers))
+    stale = [t for t in uniq if not store.is_fresh(t, start)]
+    instrument.cache("batch.load_many", hits=len(uniq) - len(stale), misses=len(stale))
+
+    errors: dict[str, str] = {}
+    owned, waiting = _claim(stale)
+    try:
+        errors.update(_refresh(store, owned, start, max_workers))
+    finally:
+        _release(owned)
+    for t, f in waiting:
+        f.result()
+        if not store.is_fresh(t, start):
+            # 다른 세션이 더 짧은 기간으로 받아 간 경우 등
+            errors.update(_refresh(store, [t], start, max_workers))
+
+    series: dict[str, pd.Series] = {}
+    for t in uniq:
+        df = store.read(t)
+        s = df.loc[df.index >= pd.Timestamp(start), "Close"].dropna().astype("float64")
+        if s.empty:
+            errors.setdefault(t, "데이터 없음")
+            continue
+        s.name = t
+        series[t] = s
+        errors.pop(t, None)  # 한 소스 실패 후 다른 소스로 받은 경우
+    if total_return and series:
+        # 공용 저장소 기준. 이벤트 조회 실패 시 저장된 이벤트(없으면 가격만)로 계산
+        tr = get_total_return()
+        tr.refresh_events(list(series), max_workers)
+        series = {t: tr.adjusted(t, start) for t in series}
+    return BatchResult(series, errors)
+
+
+# ---------- 이름 ----------
+_names: dict[str, str] = {}
+_name_retry: dict[str, float] = {}   # 이름 조회 실패 티커 → 재조회 가능 시각(그 전엔 티커를 이름으로)
+
+
+def _yf_info_name(ticker: str) -> str | None:
+    # 없는 티커 오류는 소스 장애가 아니므로 여기서 흡수(타임아웃만 실패로 기록). 이때는 None → 캐시 안 함
+    import yfinance as yf
+    try:
+        return yf.Ticker(ticker).info.get("shortName") or ticker
+    except Exception as e:
+        instrument.swallow("yf.info", e)
+        return None
+
+
+def _yf_name(ticker: str) -> str | None:
+    """yfinance shortName. 응답을 못 받았으면 None"""
+    try:
+        return get_provider().call("yfinance", _yf_info_name, ticker)
+    except Exception as e:
+        instrument.swallow("load_names", e)
+        return None
+
+
+def load_names(tickers: list[str], max_workers: int = MAX_WORKERS) -> dict[str, str]:
+    """
+    티커 → 표시 이름.
+    - KRX 종목은 디렉터리에서 즉시
+    - 나머지는 yfinance shortName을 병렬 조회 후 프로세스 내 캐시
+    - 조회 실패(서킷/타임아웃 등)는 캐시하지 않고 NAME_RETRY 동안만 티커를 이름으로 사용
+    """
+    directory = get_directory()
+    now = time.time()
+    out, missing = {}, []
+    for t in dict.fromkeys(tickers):
+        name = directory.name(t) or _names.get(t) or (t if _name_retry.get(t, 0.0) > now else None)
+        if name:
+            out[t] = name
+        else:
+            missing.append(t)
+    instrument.cache("load_names", hits=len(out), misses=len(missing))
+    if missing:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(missing))) as ex:
+            for t, name in zip(missing, ex.map(_yf_name, missing)):
+                if name is None:
+                    _name_retry[t] = now + NAME_RETRY
+                    out[t] = t
+                else:
+                    _names[t] = out[t] = name
+                    _name_retry.pop(t, None)
+    return out
@@ -0,0 +1,97 @@
+# core/charting.py
+"""
+차트용 시계열 축약.
+- LTTB(Largest-Triangle-Three-Buckets)로 목표 점 수까지 줄이고 전체 최고/최저점은 항상 유지
+- 축약 결과는 (티커, 구간, 점 수) 단위로 프로세스 내 캐시
+- 여러 시리즈를 같은 축(시작=100)의 긴 형식 표 하나로 합쳐 단일 차트로 렌더
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core import instrument
+
+POINTS = 600       # 차트 한 개당 기본 점 수(대략 가로 픽셀)
+CACHE_SIZE = 256
+
+_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    LTTB 선택 인덱스(오름차순). 첫/마지막 점 포함 n개.
+    - 가운데 점들을 n-2개 구간으로 나누고, 구간마다 (직전 선택점, 다음 구간 평균)과
+      만드는 삼각형 넓이가 가장 큰 점 선택
+    """
+    m = len(y)
+    if n >= m or n < 3:
+        return np.arange(m)
+    edges = (np.arange(n - 1) * (m - 2) / (n - 2)).astype(np.int64) + 1   # 구간 i = [edges[i], edges[i+1])
+    # 다음 구간(마지막 구간 다음은 끝점) 평균은 선택과 무관 → 누적합으로 미리 계산
+    cx, cy = np.concatenate([[0.0], np.cumsum(x)]), np.concatenate([[0.0], np.cumsum(y)])
+    nxt_lo = edges[1:]
+    nxt_hi = np.append(edges[2:], m)
+    cnt = nxt_hi - nxt_lo
+    avg_x = (cx[nxt_hi] - cx[nxt_lo]) / cnt
+    avg_y = (cy[nxt_hi] - cy[nxt_lo]) / cnt
+    out = np.empty(n, dtype=np.int64)
+    out[0], out[-1] = 0, m - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        bx, by = x[lo:hi], y[lo:hi]
+        area = np.abs((x[a] - avg_x[i]) * (by - y[a]) - (x[a] - bx) * (avg_y[i] - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
+
+
+def downsample(s: pd.Series, n: int = POINTS) -> pd.Series:
+    """LTTB 축약 + 최고/최저점 보존. 결측 제외, 점 수가 n 이하면 그대로"""
+    s = s.dropna()
+    if len(s) <= n:
+        return s
+    key = (s.name, len(s), s.index[0], s.index[-1], float(s.iloc[-1]), n)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None:
+            _cache.move_to_end(key)
+            instrument.cache("downsample", hits=1)
+            return hit
+    instrument.cache("downsample", misses=1)
+    y = s.to_numpy(dtype="float64")
+    if isinstance(s.index, pd.DatetimeIndex):
+        x = (s.index.asi8 - s.index.asi8[0]).astype("float64")
+    else:
+        x = np.arange(len(s), dtype="float64")
+    idx = np.union1d(lttb(x, y, n - 2), [int(np.argmax(y)), int(np.argmin(y))])
+    out = s.iloc[idx]
+    with _cache_lock:
+        _cache[key] = out
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return out
+
+
+def normalized_long(series: dict[str, pd.Series], labels: dict[str, str] | None = None,
+                    n: int = POINTS) -> pd.DataFrame:
+    """
+    여러 종가 시리즈 → 공통 시작일 기준 100으로 맞춘 긴 형식(Date, 종목, 지수).
+    - 공통 시작일: 모든 시리즈에 데이터가 있는 첫날
+    - 시리즈마다 n점으로 축약 → 전체 크기는 시리즈 수 × n 이하
+    """
+    if not series:
+        return pd.DataFrame(columns=["Date", "종목", "지수"])
+    labels = labels or {}
+    start = max(s.index[0] for s in series.values())
+    parts = []
+    for t, s in series.items():
+        s = s[s.index >= start]
+        if s.empty:
+            continue
+        d = downsample((s / s.iloc[0] * 100.0).rename(t), n)
+        parts.append(pd.DataFrame({"Date": d.index, "종목": labels.get(t, t), "지수": d.to_numpy()}))
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,165 @@
+# core/fx.py
+"""
+통화 환산.
+- 티커 → 통화: 거래소 접미사 규칙 + 수동 지정(.data/fx/currency.json), 프로세스 내 캐시
+- 환율 일봉은 가격 저장소에 'USDKRW=X' 같은 티커로 보관(증분 갱신 그대로 사용)
+- 가격 행렬은 통화별 열 묶음 × 날짜 맞춘 환율(직전 값 채움)로 한 번에 환산
+- 현재 환율은 시세 서비스(짧은 TTL 캐시) 한 번 조회
+"""
+import datetime as dt
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core import DATA_DIR
+from core.price_store import get_store, period_start
+from core.provider import looks_krx
+from core.quotes import get_quotes
+
+FX_DIR = DATA_DIR / "fx"
+BASES = ["KRW", "USD"]
+SYMBOLS = {"KRW": "₩", "USD": "$"}
+DEFAULT = "USD"   # 접미사 없는 티커(미국 상장 가정)
+
+# 야후 거래소 접미사 → 통화
+SUFFIX = {
+    "KS": "KRW", "KQ": "KRW", "T": "JPY", "HK": "HKD", "SS": "CNY", "SZ": "CNY",
+    "L": "GBP", "TO": "CAD", "AX": "AUD", "DE": "EUR", "PA": "EUR", "AS": "EUR", "MI": "EUR",
+}
+
+
+def pair(ccy: str, base: str) -> str:
+    """야후 환율 티커. pair('USD', 'KRW') → 'USDKRW=X'(1 USD당 KRW)"""
+    return f"{ccy}{base}=X"
+
+
+class FxService:
+    def __init__(self, path=FX_DIR / "currency.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        try:
+            self._manual: dict[str, str] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._manual = {}
+        self._cache: dict[str, str] = {}
+
+    # ---------- 티커 통화 ----------
+    def currency(self, ticker: str) -> str:
+        t = str(ticker).strip().upper()
+        hit = self._manual.get(t) or self._cache.get(t)
+        if hit:
+            return hit
+        if t.endswith("=X"):
+            ccy = t[3:6] if len(t) >= 8 else t[:3]   # 환율 티커 값의 통화('KRW=X' → KRW)
+        elif looks_krx(t):
+            ccy = "KRW"
+        elif "." in t:
+            ccy = SUFFIX.get(t.rsplit(".", 1)[1], DEFAULT)
+        else:
+            ccy = DEFAULT
+        self._cache[t] = ccy
+        return ccy
+
+    def currencies(self, tickers) -> pd.Series:
+        """티커 → 통화 Series(입력 순서 그대로, 인덱스 = 입력 인덱스)"""
+        s = tickers if isinstance(tickers, pd.Series) else pd.Series(list(tickers))
+        return s.astype(str).map(self.currency)
+
+    def set_currency(self, ticker: str, ccy: str):
+        """수동 지정(규칙보다 우선, 디스크 저장)"""
+        with self._lock:
+            self._manual[str(ticker).strip().upper()] = ccy.upper()
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps(self._manual, ensure_ascii=False), encoding="utf-8")
+
+    # ---------- 환율 ----------
+    def history(self, ccy: str, base: str, start: dt.date) -> pd.Series:
+        """
+        일별 환율(1 ccy당 base). 저장소 증분 갱신. 직접 쌍이 없으면 역쌍의 역수.
+        - 같은 통화면 빈 Series
+        """
+        if ccy == base:
+            return pd.Series(dtype="float64")
+        store = get_store()
+        for tk, inv in ((pair(ccy, base), False), (pair(base, ccy), True)):
+            s = store.update(tk, start)["Close"].dropna().astype("float64")
+            s = s[s > 0]
+            if not s.empty:
+                return 1.0 / s if inv else s
+        return pd.Series(dtype="float64")
+
+    def _aligned(self, ccy: str, base: str, index: pd.DatetimeIndex) -> np.ndarray:
+        """index 날짜별 환율. 직전 거래일 값으로 채우고, 첫 환율 이전은 첫 값"""
+        rate = self.history(ccy, base, index[0].date())
+        if rate.empty:
+            return np.full(len(index), np.nan)
+        pos = rate.index.searchsorted(index, side="right") - 1
+        return rate.to_numpy()[np.clip(pos, 0, None)]
+
+    def convert(self, prices: pd.DataFrame, base: str) -> pd.DataFrame:
+        """
+        가격 행렬(날짜 × 티커) 기준 통화 환산. 통화별 열 묶음마다 환율 벡터 곱 1회.
+        - 환율을 못 구한 통화의 열은 NaN
+        """
+        if prices.empty:
+            return prices
+        ccy = self.currencies(prices.columns)
+        out = prices.astype("float64").copy()
+        for c in ccy.unique():
+            if c == base:
+                continue
+            cols = np.flatnonzero(ccy.to_numpy() == c)
+            out.iloc[:, cols] = prices.iloc[:, cols].to_numpy() * self._aligned(c, base, prices.index)[:, None]
+        return out
+
+    def convert_series(self, series: dict[str, pd.Series], base: str) -> dict[str, pd.Series]:
+        """티커별 시계열 환산(날짜가 서로 달라도 각자 맞춤). 환율 이력은 통화별 1회 조회"""
+        ccy = {t: self.currency(t) for t in series}
+        need = {c for c in ccy.values() if c != base}
+        if not need:
+            return dict(series)
+        start = min(s.index[0] for s in series.values() if len(s)).date()
+        rates = {c: self.history(c, base, start) for c in need}
+        out = {}
+        for t, s in series.items():
+            c = ccy[t]
+            if c == base:
+                out[t] = s
+                continue
+            r = rates[c]
+            if r.empty or s.empty:
+                continue
+            pos = np.clip(r.index.searchsorted(s.index, side="right") - 1, 0, None)
+            out[t] = (s * r.to_numpy()[pos]).rename(t)
+        return out
+
+    def spot(self, currencies, base: str, ttl: float | None = None) -> pd.Series:
+        """
+        통화 → 현재 환율(1 통화당 base). 필요한 환율 티커를 시세 서비스 한 번으로 조회.
+        - 조회 실패 시 저장된 마지막 환율, 그것도 없으면 NaN
+        """
+        need = [c for c in dict.fromkeys(currencies) if c != base]
+        out = pd.Series({base: 1.0}, dtype="float64")
+        if not need:
+            return out
+        px = get_quotes().quotes([pair(c, base) for c in need], ttl=ttl)
+        rates = pd.Series(px.to_numpy(), index=need, dtype="float64")
+        for c in rates.index[rates.isna() | (rates <= 0)]:
+            hist = self.history(c, base, period_start("1mo"))
+            rates[c] = hist.iloc[-1] if not hist.empty else np.nan
+        return pd.concat([out, rates])
+
+
+_fx: FxService | None = None
+_fx_lock = threading.Lock()
+
+
+def get_fx() -> FxService:
+    """프로세스 공용 환산 서비스"""
+    global _fx
+    with _fx_lock:
+        if _fx is None:
+            _fx = FxService()
+        return _fx
@@ -0,0 +1,317 @@
+# core/goals.py
+"""
+재무 목표 역산 + 달성률 추적.
+- 월 적립: 기말 자산이 적립금에 선형(NAV = A + c·B) → 추정 2회(0, 1)로 바로 해
+- 기간: 최대 기간 한 번 추정 후 목표를 처음 넘는 달. 단일 수익률이면 연금 공식으로 바로
+- 수익률: 자산별 기대수익률에 같은 폭을 더해 구간 격자 탐색(격자 전체를 한 번의 배열 추정으로)
+- 확률 목표: 경로별 (A, B)를 한 번 만들어 두고, 경로별 필요 적립금의 분위수 = 성공 확률 X%인 적립금
+- 저장 목표와 날짜별 평가액 기록은 .data/goals. 목표와 기록 모두 기준 통화별(다른 통화끼리 비교 안 함)
+"""
+import datetime as dt
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core import DATA_DIR, instrument
+from core.fx import BASES
+from core.montecarlo import _chunks, lognormal_params
+from core.sim import MODE_CONTRIB, project
+
+GOAL_DIR = DATA_DIR / "goals"
+SOLVE_CONTRIB = "월 적립"
+SOLVE_MONTHS = "기간"
+SOLVE_RETURN = "기대수익률"
+SOLVES = [SOLVE_CONTRIB, SOLVE_MONTHS, SOLVE_RETURN]
+MAX_MONTHS = 50 * 12
+GOAL_COLS = ["이름", "통화", "목표금액", "목표일", "시작일", "시작자산"]
+HISTORY_SAVE_EVERY = 600.0   # 초. 같은 날 평가액 변동은 이 간격으로만 디스크에 씀
+CACHE_SIZE = 8
+
+_finals: OrderedDict = OrderedDict()
+_finals_lock = threading.Lock()
+
+
+class GoalResult(NamedTuple):
+    """value: 구한 값(월 적립 금액 / 개월 / 연수익률 가산폭), final: 그 값일 때 기말 자산"""
+    value: float
+    feasible: bool
+    final: float
+    method: str
+
+
+# ---------- 결정론 ----------
+def _single_rate(returns) -> float | None:
+    """모든 자산 월수익률이 같으면 그 값(비중·리밸런싱 방식과 무관하게 연금 공식 적용 가능)"""
+    r = np.asarray(returns, dtype="float64")
+    return float(r[0]) if r.ndim == 1 and len(r) and np.ptp(r) < 1e-12 else None
+
+
+def annuity_nav(pv: float, other: float, monthly: float, r: float, months: int) -> float:
+    """
+    단일 월수익률 r 기말 자산(project와 같은 순서: 수익 반영 → 적립).
+    - other는 첫 달 적립과 함께 들어가므로 한 달 덜 불어남
+    """
+    if months <= 0:
+        return pv + other
+    g = (1.0 + r) ** months
+    annuity = months if r == 0 else (g - 1.0) / r
+    return pv * g + other * g / (1.0 + r) + monthly * annuity
+
+
+def contribution_needed(target: float, init_alloc, returns, weights, months: int,
+                        mode: str = MODE_CONTRIB, other: float = 0.0) -> GoalResult:
+    """목표 기말 자산에 필요한 월 적립금(0 미만이면 0 = 이미 충분)"""
+    a0 = np.asarray(init_alloc, dtype="float64")
+    r1 = _single_rate(returns)
+    if r1 is not None and r1 > -1:
+        base = float(annuity_nav(a0.sum(), other, 0.0, r1, months))
+        slope = float(annuity_nav(0.0, 0.0, 1.0, r1, months))
+        method = "연금 공식"
+    else:
+        nav = project(a0, returns, weights, np.array([0.0, 1.0]), months, mode=mode, other=other).nav[:, -1]
+        base, slope = float(nav[0]), float(nav[1] - nav[0])
+        method = "선형 해"
+    if not (np.isfinite(base) and np.isfinite(slope)):
+        return GoalResult(np.nan, False, base, method)
+    if base >= target:
+        return GoalResult(0.0, True, base, method)
+    if slope <= 0:
+        return GoalResult(np.nan, False, base, method)
+    c = (target - base) / slope
+    return GoalResult(c, True, base + c * slope, method)
+
+
+def months_needed(target: float, init_alloc, returns, weights, monthly: float,
+                  mode: str = MODE_CONTRIB, other: float = 0.0, max_months: int = MAX_MONTHS) -> GoalResult:
+    """목표 자산에 처음 도달하는 개월 수(max_months 안에 못 넘으면 feasible=False)"""
+    a0 = np.asarray(init_alloc, dtype="float64")
+    nav0 = a0.sum() + other
+    if nav0 >= target:
+        return GoalResult(0, True, nav0, "현재 달성")
+    r1 = _single_rate(returns)
+    if r1 is not None and r1 >= 0 and (r1 > 0 or monthly > 0):
+        pv = a0.sum() + other / (1.0 + r1)
+        if pv * r1 + monthly <= 0:
+            return GoalResult(np.nan, False, float(nav0), "연금 공식")  # 자산·적립 모두 0 → 영영 못 닿음(로그 정의 안 됨)
+        n = (target - pv) / monthly if r1 == 0 else \
+            np.log((target * r1 + monthly) / (pv * r1 + monthly)) / np.log1p(r1)
+        n = max(int(np.ceil(n - 1e-9)), 1)
+        if n <= max_months:
+            return GoalResult(n, True, float(annuity_nav(a0.sum(), other, monthly, r1, n)), "연금 공식")
+        return GoalResult(np.nan, False, float(annuity_nav(a0.sum(), other, monthly, r1, max_months)), "연금 공식")
+    nav = project(a0, returns, weights, monthly, max_months, mode=mode, other=other).nav
+    hit = np.flatnonzero(nav >= target)
+    if not len(hit):
+        return GoalResult(np.nan, False, float(nav[-1]), "첫 도달")
+    return GoalResult(int(hit[0]), True, float(nav[hit[0]]), "첫 도달")
+
+
+def _monthly(annual_mu: np.ndarray, shifts: np.ndarray) -> np.ndarray:
+    """연수익률 + 가산폭 → 월수익률 (K, 자산)"""
+    return np.clip(1.0 + annual_mu[None, :] + shifts[:, None], 1e-6, None) ** (1 / 12.0) - 1.0
+
+
+def return_needed(target: float, init_alloc, annual_mu, weights, monthly: float, months: int,
+                  mode: str = MODE_CONTRIB, other: float = 0.0, lo: float = -0.5, hi: float = 1.0,
+                  grid: int = 64, tol: float = 1e-6) -> GoalResult:
+    """
+    자산별 연 기대수익률에 공통으로 더할 폭(value).
+    - [lo, hi]를 grid개로 나눠 한 번에 추정 → 부호가 바뀌는 칸으로 좁혀 반복(칸 폭 tol 이하까지)
+    - 가중 연수익률은 Σ w·(μ + value)
+    """
+    a0 = np.asarray(init_alloc, dtype="float64")
+    mu = np.asarray(annual_mu, dtype="float64")
+    w = np.asarray(weights, dtype="float64")
+
+    def finals(shifts):
+        r = _monthly(mu, shifts)
+        paths = np.broadcast_to(r[:, :, None], r.shape + (months,))
+        return project(a0, paths, w, monthly, months, mode=mode, other=other).nav[:, -1]
+
+    ends = finals(np.array([lo, hi]))
+    if not np.isfinite(ends).all():
+        return GoalResult(np.nan, False, np.nan, "입력 수익률 없음")
+    if ends[0] >= target:
+        return GoalResult(float(lo), True, float(ends[0]), "구간 하한에서 달성")
+    if ends[1] < target:
+        return GoalResult(np.nan, False, float(ends[1]), "구간 상한에서도 미달")
+    final = float(ends[1])
+    while hi - lo > tol:
+        d = np.linspace(lo, hi, grid)
+        nav = finals(d)
+        i = int(np.argmax(nav >= target))   # 단조 증가 → 처음 넘는 칸
+        lo, hi, final = d[i - 1], d[i], float(nav[i])
+    return GoalResult(float(hi), True, final, "구간 탐색")
+
+
+# ---------- 확률 목표 ----------
+def path_finals(init_alloc, annual_mu, annual_vol, corr, weights, months: int, mode: str = MODE_CONTRIB,
+                other: float = 0.0, paths: int = 10_000, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    경로별 기말 자산 = A + c·B의 (A, B). 입력이 같으면 캐시(목표/확률만 바꿔 다시 풀 때 즉시).
+    - 경로 생성은 몬테카를로와 같은 청크/시드 규칙 → 같은 시드·경로 수면 같은 경로
+    """
+    a0 = np.asarray(init_alloc, dtype="float64")
+    w = np.asarray(weights, dtype="float64")
+    mean, chol = lognormal_params(annual_mu, annual_vol, corr)
+    key = (a0.tobytes(), mean.tobytes(), chol.tobytes(), w.tobytes(), months, mode, other, paths, seed)
+    with _finals_lock:
+        hit = _finals.get(key)
+        if hit is not None:
+            _finals.move_to_end(key)
+            instrument.cache("goals.path_finals", hits=1)
+            return hit
+    instrument.cache("goals.path_finals", misses=1)
+    sizes = _chunks(paths, len(mean), months)
+    A, B = [], []
+    for n, ss in zip(sizes, np.random.SeedSequence(seed).spawn(len(sizes))):
+        z = np.random.default_rng(ss).standard_normal((n, len(mean), months))
+        r = np.expm1(mean[:, None] + chol @ z)
+        base = project(a0, r, w, 0.0, months, mode=mode, other=other).nav[:, -1]
+        A.append(base)
+        B.append(project(a0, r, w, 1.0, months, mode=mode, other=other).nav[:, -1] - base)
+    out = (np.concatenate(A), np.concatenate(B))
+    with _finals_lock:
+        _finals[key] = out
+        while len(_finals) > CACHE_SIZE:
+            _finals.popitem(last=False)
+    return out
+
+
+def success_probability(target: float, monthly: float, finals: tuple[np.ndarray, np.ndarray]) -> float:
+    A, B = finals
+    return float(np.mean(A + monthly * B >= target))
+
+
+def contribution_for_probability(target: float, prob: float,
+                                 finals: tuple[np.ndarray, np.ndarray]) -> GoalResult:
+    """
+    경로 비율 prob 이상이 목표를 넘는 최소 월 적립금.
+    - 경로별 필요 적립금 (목표 - A) / B의 prob 분위수
+    """
+    A, B = finals
+    with np.errstate(divide="ignore", invalid="ignore"):
+        need = np.where(A >= target, 0.0, np.where(B > 0, (target - A) / B, np.inf))
+    c = float(np.quantile(need, prob, method="higher"))
+    if not np.isfinite(c):
+        return GoalResult(np.nan, False, np.nan, "경로 분위")
+    return GoalResult(c, True, float(np.median(A + c * B)), "경로 분위")
+
+
+# ---------- 저장 목표 ----------
+class GoalBook:
+    """
+    저장 목표(JSON)와 날짜·통화별 평가액 기록(Parquet).
+    - 목표마다 통화 저장. 이전 형식(통화 없음)은 첫 기준 통화로 간주
+    - record(): 같은 날·통화는 덮어써 하루 한 행. 새 행이 생길 때만 바로 쓰고, 같은 행 변경은 간격을 두고 씀
+    """
+
+    def __init__(self, root=GOAL_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        try:
+            self._goals: list[dict] = json.loads((root / "goals.json").read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._goals = []
+        for g in self._goals:
+            g.setdefault("통화", BASES[0])
+        path = root / "history.parquet"
+        h = pd.read_parquet(path) if path.exists() else \
+            pd.DataFrame({"날짜": pd.Series(dtype="datetime64[ns]"), "평가액": pd.Series(dtype="float64")})
+        if "통화" not in h.columns:
+            h.insert(1, "통화", BASES[0])
+        self._history = h[["날짜", "통화", "평가액"]]
+        self._saved = time.time()
+
+    def goals(self, currency: str | None = None) -> pd.DataFrame:
+        g = pd.DataFrame(self._goals, columns=GOAL_COLS)
+        return g if currency is None else g[g["통화"] == currency].reset_index(drop=True)
+
+    def _save_goals(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / "goals.json").write_text(json.dumps(self._goals, ensure_ascii=False), encoding="utf-8")
+
+    def save(self, name: str, target: float, deadline: dt.date, start_nav: float, currency: str,
+             today: dt.date | None = None):
+        """같은 이름이면 교체"""
+        today = today or dt.date.today()
+        row = {"이름": name, "통화": currency, "목표금액": float(target), "목표일": deadline.isoformat(),
+               "시작일": today.isoformat(), "시작자산": float(start_nav)}
+        with self._lock:
+            self._goals = [g for g in self._goals if g["이름"] != name] + [row]
+            self._save_goals()
+
+    def remove(self, name: str):
+        with self._lock:
+            self._goals = [g for g in self._goals if g["이름"] != name]
+            self._save_goals()
+
+    def record(self, nav: float, currency: str, today: dt.date | None = None, force: bool = False):
+        """오늘 평가액 기록(그 통화 목표가 있을 때만)"""
+        if not any(g["통화"] == currency for g in self._goals):
+            return
+        day = pd.Timestamp(today or dt.date.today())
+        with self._lock:
+            h = self._history
+            same = (h["날짜"] == day) & (h["통화"] == currency)
+            if same.any():
+                if h.loc[same, "평가액"].iloc[0] == nav:
+                    return
+                h = h.copy()
+                h.loc[same, "평가액"] = float(nav)
+                new_row = False
+            else:
+                row = pd.DataFrame({"날짜": [day], "통화": [currency], "평가액": [float(nav)]})
+                h = (pd.concat([h, row], ignore_index=True) if len(h) else row).sort_values(
+                    ["날짜", "통화"], ignore_index=True)
+                new_row = True
+            self._history = h
+            now = time.time()
+            if new_row or force or now - self._saved >= HISTORY_SAVE_EVERY:
+                self.root.mkdir(parents=True, exist_ok=True)
+                tmp = self.root / "history.tmp"
+                h.to_parquet(tmp, index=False)
+                tmp.replace(self.root / "history.parquet")
+                self._saved = now
+
+    def history(self, currency: str) -> pd.DataFrame:
+        h = self._history
+        return h[h["통화"] == currency][["날짜", "평가액"]].reset_index(drop=True)
+
+    def progress(self, nav: float, currency: str, today: dt.date | None = None) -> pd.DataFrame:
+        """
+        그 통화 목표별 달성률(현재 평가액 / 목표금액)과 기간 경과율, 남은 개월.
+        - 경과율보다 달성률이 낮으면 계획보다 늦음(단순 비교)
+        """
+        g = self.goals(currency)
+        today = pd.Timestamp(today or dt.date.today())
+        start, end = pd.to_datetime(g["시작일"]), pd.to_datetime(g["목표일"])
+        span = (end - start).dt.days.clip(lower=1)
+        left = ((end.dt.year - today.year) * 12 + end.dt.month - today.month).clip(lower=0)
+        return pd.DataFrame({
+            "이름": g["이름"],
+            "목표금액": g["목표금액"].astype("float64"),
+            "목표일": g["목표일"],
+            "현재": float(nav),
+            "달성률": float(nav) / g["목표금액"].astype("float64"),
+            "기간 경과율": ((today - start).dt.days / span).clip(0, 1),
+            "남은 개월": left.astype(int),
+        })
+
+
+_book: GoalBook | None = None
+_book_lock = threading.Lock()
+
+
+def get_goalbook() -> GoalBook:
+    """프로세스 공용 목표 저장소"""
+    global _book
+    with _book_lock:
+        if _book is None:
+            _book = GoalBook()
+        return _book
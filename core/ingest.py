@@ -0,0 +1,148 @@
+# core/ingest.py
+"""
+엑셀 통합문서 → Parquet 변환 캐시.
+- 업로드 내용 해시(blake2b) 단위로 시트별 Parquet을 한 번만 생성: .data/ingest/<해시>/<시트>.parquet
+- 이후 메모리 맵으로 Arrow 테이블을 열고 프로세스 내에 보관(openpyxl 파싱 반복 없음)
+- 피벗의 가장 세밀한 집계는 Arrow group_by로 컬럼 데이터 위에서 바로 계산
+"""
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from core import DATA_DIR
+from core.pivot import _STATS, PivotResult, from_stats
+
+INGEST_DIR = DATA_DIR / "ingest"
+CACHE_SIZE = 8
+
+# pivot 통계명 → Arrow 집계 함수
+_ARROW_AGG = {"sum": "sum", "count": "count", "max": "max", "min": "min"}
+
+_tables: OrderedDict = OrderedDict()
+_pivots: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+
+
+class Workbook(NamedTuple):
+    """digest: 내용 해시, sheets: 시트 이름 → 행 수"""
+    digest: str
+    sheets: dict
+
+
+def digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _sheet_file(key: str, i: int):
+    return INGEST_DIR / key / f"sheet{i}.parquet"
+
+
+def _arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """섞인 타입의 object 컬럼은 문자열로(결측 유지). 컬럼명도 문자열로"""
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    for c in df.columns[df.dtypes == object]:
+        df[c] = df[c].where(df[c].isna(), df[c].astype(str))
+    return df
+
+
+def ingest(data: bytes) -> Workbook:
+    """
+    통합문서 바이트 → 시트별 Parquet(최초 1회). 같은 내용이면 변환 없이 메타만 반환.
+    """
+    key = digest(data)
+    meta_path = INGEST_DIR / key / "meta.json"
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        return Workbook(key, meta["sheets"])
+    frames = pd.read_excel(io.BytesIO(data), sheet_name=None)
+    (INGEST_DIR / key).mkdir(parents=True, exist_ok=True)
+    sheets = {}
+    for i, (name, df) in enumerate(frames.items()):
+        path = _sheet_file(key, i)
+        tmp = path.with_suffix(".tmp")
+        pq.write_table(pa.Table.from_pandas(_arrow_safe(df), preserve_index=False), tmp)
+        tmp.replace(path)
+        sheets[str(name)] = len(df)
+    meta_path.write_text(json.dumps({"sheets": sheets}, ensure_ascii=False), encoding="utf-8")
+    return Workbook(key, sheets)
+
+
+def open_sheet(wb: Workbook, sheet: str) -> pa.Table:
+    """시트 Arrow 테이블(메모리 맵). 프로세스 내 LRU 보관"""
+    ck = (wb.digest, sheet)
+    with _lock:
+        hit = _tables.get(ck)
+        if hit is not None:
+            _tables.move_to_end(ck)
+            return hit
+    table = pq.read_table(_sheet_file(wb.digest, list(wb.sheets).index(sheet)), memory_map=True)
+    with _lock:
+        _tables[ck] = table
+        while len(_tables) > CACHE_SIZE:
+            _tables.popitem(last=False)
+    return table
+
+
+def from_frame(df: pd.DataFrame) -> pa.Table:
+    """예시/메모리 데이터도 같은 경로로 처리"""
+    return pa.Table.from_pandas(_arrow_safe(df), preserve_index=False)
+
+
+def columns(table: pa.Table) -> tuple[list[str], list[str]]:
+    """(차원 후보: 숫자 아님, 값 후보: 숫자) 컬럼명"""
+    dims, vals = [], []
+    for f in table.schema:
+        (vals if pa.types.is_integer(f.type) or pa.types.is_floating(f.type) or pa.types.is_decimal(f.type)
+         else dims).append(f.name)
+    return dims, vals
+
+
+def arrow_stats(table: pa.Table, keys: list[str], value: str, agg: str) -> pd.DataFrame:
+    """Arrow group_by로 가장 세밀한 통계 계산 → pivot.from_stats 입력 모양"""
+    names = _STATS[agg]
+    if agg == "mean":
+        # 합은 정수 넘침 방지 위해 실수로
+        table = table.set_column(table.schema.get_field_index(value), value, pc.cast(table[value], pa.float64()))
+    out = table.group_by(keys, use_threads=True).aggregate([(value, _ARROW_AGG[n]) for n in names])
+    df = out.to_pandas()
+    df = df.rename(columns={f"{value}_{_ARROW_AGG[n]}": n for n in names})
+    return df.set_index(keys)[names]
+
+
+def pivot(table: pa.Table, index: list[str], value: str, agg: str = "sum", column: str | None = None,
+          cache_key: tuple | None = None) -> PivotResult:
+    """
+    Arrow 테이블 위 소계 피벗. cache_key(예: (해시, 시트))가 있으면 같은 설정 결과를 재사용
+    """
+    keys = list(index) + ([column] if column else [])
+    if not keys:
+        raise ValueError("행 인덱스나 열 피벗이 필요합니다.")
+    ck = None if cache_key is None else (*cache_key, tuple(index), column, value, agg)
+    if ck is not None:
+        with _lock:
+            hit = _pivots.get(ck)
+            if hit is not None:
+                _pivots.move_to_end(ck)
+                return hit
+    result = from_stats(arrow_stats(table, keys, value, agg), index, value, agg, column)
+    if ck is not None:
+        with _lock:
+            _pivots[ck] = result
+            while len(_pivots) > CACHE_SIZE * 4:
+                _pivots.popitem(last=False)
+    return result
+
+
+def page(df: pd.DataFrame, number: int, size: int) -> pd.DataFrame:
+    """1부터 시작하는 페이지 번호의 행 구간"""
+    start = max(number - 1, 0) * size
+    return df.iloc[start:start + size]
@@ -0,0 +1,237 @@
+# core/instrument.py
+"""
+핫패스 계측(페이지 공용).
+- 항목별 호출 수, 지연 히스토그램(고정 ms 구간), 응답 객체 메모리 크기(전송량 아님), 응답 소스, 캐시 적중/실패
+- 조용히 삼킨 예외는 최근 MAX_SWALLOWED건만 보관
+- 꺼져 있으면 timed()는 공용 빈 컨텍스트, traced()는 플래그 확인 1회 → 사실상 비용 없음
+- 켜기: PORTFOLIO_INSTRUMENT=1 환경변수 또는 진단 패널의 켜기/끄기 버튼(누를 때만 바뀜, 프로세스 공용)
+- dump()로 JSON 프로파일(오프라인 분석용)
+"""
+import bisect
+import contextlib
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# 지연 히스토그램 구간 상한(ms). 마지막 칸은 그 이상
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+MAX_SWALLOWED = 200
+SUMMARY_COLS = ["항목", "호출", "오류", "평균(ms)", "p50(ms)", "p95(ms)", "최대(ms)",
+                "캐시 적중", "캐시 실패", "적중률", "응답 메모리(KB)", "응답 소스"]
+
+_on = os.environ.get("PORTFOLIO_INSTRUMENT", "") not in ("", "0")
+_NULL = contextlib.nullcontext()
+
+
+class Stat:
+    """항목 하나의 누적값"""
+    __slots__ = ("calls", "errors", "total", "max", "hist", "bytes", "hits", "misses", "sources")
+
+    def __init__(self):
+        self.calls = self.errors = self.bytes = self.hits = self.misses = 0
+        self.total = self.max = 0.0
+        self.hist = [0] * (len(BUCKETS_MS) + 1)
+        self.sources: dict[str, int] = {}
+
+    def quantile(self, q: float) -> float:
+        """히스토그램 근사 분위(해당 구간 상한 ms, 마지막 칸은 최대값)"""
+        n = sum(self.hist)
+        if not n:
+            return 0.0
+        i = int(np.searchsorted(np.cumsum(self.hist), q * n))
+        return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else self.max * 1000
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, Stat] = {}
+        self._swallowed: deque = deque(maxlen=MAX_SWALLOWED)
+        self.started = time.time()
+
+    def _stat(self, name: str) -> Stat:
+        s = self._stats.get(name)
+        if s is None:
+            s = self._stats.setdefault(name, Stat())
+        return s
+
+    # ---------- 기록 ----------
+    def observe(self, name: str, elapsed: float, error: bool = False, nbytes: int = 0,
+                source: str | None = None):
+        with self._lock:
+            s = self._stat(name)
+            s.calls += 1
+            s.errors += error
+            s.total += elapsed
+            s.max = max(s.max, elapsed)
+            s.hist[bisect.bisect_left(BUCKETS_MS, elapsed * 1000)] += 1
+            s.bytes += nbytes
+            if source:
+                s.sources[source] = s.sources.get(source, 0) + 1
+
+    def count(self, name: str, hits: int = 0, misses: int = 0, source: str | None = None):
+        with self._lock:
+            s = self._stat(name)
+            s.hits += hits
+            s.misses += misses
+            if source:
+                s.sources[source] = s.sources.get(source, 0) + 1
+
+    def swallow(self, name: str, exc: BaseException):
+        with self._lock:
+            self._swallowed.append((time.time(), name, type(exc).__name__, str(exc)[:200]))
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._swallowed.clear()
+            self.started = time.time()
+
+    # ---------- 조회 ----------
+    def summary(self) -> pd.DataFrame:
+        """항목별 요약(총 소요 시간 큰 순)"""
+        with self._lock:
+            items = sorted(self._stats.items(), key=lambda kv: -kv[1].total)
+            rows = [{
+                "항목": name,
+                "호출": s.calls,
+                "오류": s.errors,
+                "평균(ms)": round(s.total / s.calls * 1000, 2) if s.calls else None,
+                "p50(ms)": s.quantile(0.5) if s.calls else None,
+                "p95(ms)": s.quantile(0.95) if s.calls else None,
+                "최대(ms)": round(s.max * 1000, 2) if s.calls else None,
+                "캐시 적중": s.hits,
+                "캐시 실패": s.misses,
+                "적중률": round(s.hits / (s.hits + s.misses), 3) if s.hits + s.misses else None,
+                "응답 메모리(KB)": round(s.bytes / 1024, 1),
+                "응답 소스": ", ".join(f"{k} {v}" for k, v in s.sources.items()),
+            } for name, s in items]
+        return pd.DataFrame(rows, columns=SUMMARY_COLS)
+
+    def histogram(self, name: str) -> pd.DataFrame:
+        """항목 하나의 지연 구간별 호출 수"""
+        labels = [f"≤{b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"]
+        with self._lock:
+            s = self._stats.get(name)
+            counts = list(s.hist) if s else [0] * len(labels)
+        return pd.DataFrame({"구간(ms)": labels, "호출": counts})
+
+    def swallowed(self) -> pd.DataFrame:
+        with self._lock:
+            rows = list(self._swallowed)
+        df = pd.DataFrame(rows, columns=["시각", "항목", "예외", "메시지"])
+        df["시각"] = pd.to_datetime(df["시각"], unit="s", utc=True).dt.tz_convert("Asia/Seoul").dt.strftime("%H:%M:%S")
+        return df.iloc[::-1].reset_index(drop=True)
+
+    def dump(self) -> dict:
+        """프로파일 덤프(JSON 직렬화 가능)"""
+        with self._lock:
+            return {
+                "started": self.started,
+                "dumped": time.time(),
+                "buckets_ms": list(BUCKETS_MS),
+                "stats": {k: s.to_dict() for k, s in self._stats.items()},
+                "swallowed": [dict(zip(("time", "name", "type", "message"), r)) for r in self._swallowed],
+            }
+
+
+_registry: Registry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> Registry:
+    """프로세스 공용 계측 저장소"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = Registry()
+        return _registry
+
+
+# ---------- 켜기/끄기 ----------
+def enabled() -> bool:
+    return _on
+
+
+def enable(flag: bool = True):
+    global _on
+    _on = bool(flag)
+
+
+# ---------- 기록 도우미(꺼져 있으면 즉시 반환) ----------
+def nbytes(obj) -> int:
+    """응답 객체의 메모리 크기 근사(프레임/시리즈 메모리, 프레임 dict는 합). 네트워크 수신량이 아님"""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=False))
+    if isinstance(obj, dict):
+        return sum(nbytes(v) for v in obj.values())
+    if isinstance(obj, (bytes, str)):
+        return len(obj)
+    return 0
+
+
+class _Timer:
+    __slots__ = ("name", "source", "nbytes", "t0")
+
+    def __init__(self, name: str, source: str | None):
+        self.name, self.source, self.nbytes = name, source, 0
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        get_registry().observe(self.name, time.perf_counter() - self.t0, exc_type is not None,
+                               self.nbytes, self.source)
+        return False
+
+
+def timed(name: str, source: str | None = None):
+    """with timed('render.altair'): ... 구간 시간 기록"""
+    return _Timer(name, source) if _on else _NULL
+
+
+def traced(name: str):
+    """함수 호출 시간 기록 데코레이터(호출 시점에 켜짐 여부 확인)"""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _on:
+                return fn(*args, **kwargs)
+            with _Timer(name, None):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def observe(name: str, elapsed: float, error: bool = False, out=None, source: str | None = None):
+    """이미 잰 시간 기록. out이 있으면 응답 메모리 크기도"""
+    if _on:
+        get_registry().observe(name, elapsed, error, nbytes(out) if out is not None else 0, source)
+
+
+def cache(name: str, hits: int = 0, misses: int = 0):
+    if _on and (hits or misses):
+        get_registry().count(name, hits, misses)
+
+
+def answered(name: str, source: str):
+    """폴백 경로에서 실제로 응답한 소스"""
+    if _on:
+        get_registry().count(name, source=source)
+
+
+def swallow(name: str, exc: BaseException):
+    """조용히 넘긴 예외 기록"""
+    if _on:
+        get_registry().swallow(name, exc)
@@ -0,0 +1,312 @@
+# core/ledger.py
+"""
+거래 원장(추가 전용) + FIFO 매수 묶음(lot) 상태.
+- 거래는 .data/ledger/trades.jsonl 끝에 한 줄씩 추가. 수정/삭제 없음
+- 상태(미청산 lot, 티커별 수량·원가, 실현손익)는 거래 1건마다 닿는 lot만 갱신
+- 상태 스냅샷(state.json)에 원장 바이트 위치를 함께 저장 → 재시작 시 이후 거래만 재적용
+- 매도별 실현 내역은 realized.jsonl에 추가 전용으로 보관. 스냅샷 때 그 사이 내역만 덧붙이고
+  state.json에는 바이트 위치만 기록(스냅샷 비용이 누적 내역에 비례하지 않음)
+- 티커별 날짜 순서 유지: 한 번에 넣는 거래는 날짜순(같은 날은 입력 순)으로 처리하고,
+  티커의 마지막 거래일보다 이른 거래는 거부 → lot이 언제나 날짜순, 현재 수량 = 그 날짜 기준 수량
+- 상태에 먼저 반영(닿는 티커만 되돌릴 수 있게 기록)한 뒤 파일에 추가. 실패하면 되돌리고 기록 안 함
+"""
+import datetime as dt
+import json
+import threading
+from collections import defaultdict, deque
+from copy import deepcopy
+
+import numpy as np
+import pandas as pd
+
+from core import DATA_DIR, instrument
+
+LEDGER_DIR = DATA_DIR / "ledger"
+BUY, SELL, FEE, SPLIT = "매수", "매도", "수수료", "분할"
+SIDES = [BUY, SELL, FEE, SPLIT]
+SNAPSHOT_EVERY = 1000   # 이 건수만큼 추가될 때마다 스냅샷
+EPS = 1e-9
+REALIZED_COLS = ["날짜", "티커", "수량", "매도금액", "매수원가", "실현손익"]
+TRADE_COLS = ["날짜", "티커", "구분", "수량", "가격", "수수료", "메모"]
+TAIL_BLOCK = 64 * 1024
+
+
+class LedgerError(ValueError):
+    pass
+
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _day(d) -> str:
+    """날짜 → 'YYYY-MM-DD'. 이미 그 형식이면 그대로(대량 입력 시 파싱 생략)"""
+    if not d:
+        return dt.date.today().isoformat()
+    if isinstance(d, str) and len(d) == 10 and d[4] == d[7] == "-":
+        return d
+    return pd.Timestamp(d).strftime("%Y-%m-%d")
+
+
+class Ledger:
+    def __init__(self, root=LEDGER_DIR):
+        self.root = root
+        self.trades_path = root / "trades.jsonl"
+        self.state_path = root / "state.json"
+        self.realized_path = root / "realized.jsonl"
+        self._lock = threading.Lock()
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self.lots: dict[str, deque] = defaultdict(deque)   # 티커 → [[수량, 단가(수수료 포함), 날짜], ...]
+        self.qty: dict[str, float] = defaultdict(float)
+        self.cost: dict[str, float] = defaultdict(float)   # 미청산 원가 합
+        self.realized: dict[str, float] = defaultdict(float)
+        self.last: dict[str, str] = {}                     # 티커 → 마지막 거래일
+        self.fees = 0.0
+        self.log: list[tuple] = []                        # 마지막 스냅샷 이후 매도별 실현 내역(REALIZED_COLS)
+        self.count = 0
+        self.offset = 0                                    # 상태에 반영된 원장 바이트 위치
+        self.log_offset = 0                                # 스냅샷에 반영된 realized.jsonl 바이트 위치
+        self._since_snapshot = 0
+
+    # ---------- 저장 ----------
+    def _load(self):
+        if self.state_path.exists():
+            try:
+                st = json.loads(self.state_path.read_text(encoding="utf-8"))
+                for t, lots in st["lots"].items():
+                    self.lots[t] = deque(lots)
+                self.qty.update(st["qty"])
+                self.cost.update(st["cost"])
+                self.realized.update(st["realized"])
+                self.last.update(st["last"])
+                self.fees, self.count, self.offset = st["fees"], st["count"], st["offset"]
+                self.log_offset = st["log_offset"]
+            except (OSError, ValueError, KeyError):
+                self._reset()
+        if self.realized_path.exists():
+            # 스냅샷 뒤에 덧붙은 실현 내역은 아래 원장 재적용으로 다시 생기므로 잘라냄
+            with open(self.realized_path, "r+b") as f:
+                f.truncate(self.log_offset)
+        if self.trades_path.exists():
+            with open(self.trades_path, "rb") as f:
+                f.seek(self.offset)
+                for line in f:
+                    self.offset += len(line)
+                    if not line.strip():
+                        continue
+                    try:
+                        self._apply(json.loads(line))
+                    except (ValueError, KeyError, IndexError, ZeroDivisionError) as e:
+                        instrument.swallow("ledger.replay", e)   # 깨진 줄은 건너뜀(시작은 계속)
+
+    def snapshot(self):
+        """현재 상태 원자적 저장"""
+        with self._lock:
+            self._snapshot()
+
+    def _snapshot(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        # 실현 내역은 스냅샷 이후분만 덧붙임. state.json 교체 전에 죽으면 다음 시작 때 잘려 재생성
+        log_offset = self.log_offset
+        if self.log:
+            with open(self.realized_path, "ab") as f:
+                f.truncate(self.log_offset)
+                f.seek(self.log_offset)
+                log_offset += f.write("".join(_encode(list(r)) + "\n" for r in self.log).encode("utf-8"))
+        st = {
+            "lots": {t: list(l) for t, l in self.lots.items() if l},
+            "qty": dict(self.qty), "cost": dict(self.cost), "realized": dict(self.realized), "last": self.last,
+            "fees": self.fees, "count": self.count, "offset": self.offset, "log_offset": log_offset,
+        }
+        tmp = self.state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(st, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.state_path)
+        self.log_offset = log_offset
+        self.log = []
+        self._since_snapshot = 0
+
+    # ---------- 적용 ----------
+    def _apply(self, tr: dict):
+        """거래 1건 반영. 닿는 lot 수만큼의 비용"""
+        side, t = tr["구분"], tr.get("티커", "")
+        q, px, fee = float(tr.get("수량", 0) or 0), float(tr.get("가격", 0) or 0), float(tr.get("수수료", 0) or 0)
+        if side == BUY:
+            self.lots[t].append([q, px + fee / q, tr["날짜"]])
+            self.qty[t] += q
+            self.cost[t] += q * px + fee
+        elif side == SELL:
+            lots, left, basis = self.lots[t], q, 0.0
+            while left > EPS:
+                lot = lots[0]
+                take = min(lot[0], left)
+                basis += take * lot[1]
+                lot[0] -= take
+                left -= take
+                if lot[0] <= EPS:
+                    lots.popleft()
+            proceeds = q * px - fee
+            self.qty[t] -= q
+            self.cost[t] -= basis
+            if self.qty[t] <= EPS:
+                self.qty[t], self.cost[t] = 0.0, 0.0
+            self.realized[t] += proceeds - basis
+            self.log.append((tr["날짜"], t, q, proceeds, basis, proceeds - basis))
+        elif side == FEE:
+            self.fees += fee or px
+            if t:
+                self.realized[t] -= fee or px
+        elif side == SPLIT:
+            # 수량 칸 = 분할 비율(2:1 분할이면 2). 원가 합은 그대로
+            for lot in self.lots[t]:
+                lot[0] *= q
+                lot[1] /= q
+            self.qty[t] *= q
+        if t:
+            self.last[t] = max(self.last.get(t, ""), tr["날짜"])
+        self.count += 1
+
+    def _validate(self, tr: dict) -> dict:
+        """입력 형식 검사 → 저장 행"""
+        side = tr.get("구분")
+        if side not in SIDES:
+            raise LedgerError(f"구분은 {', '.join(SIDES)} 중 하나여야 합니다: {side}")
+        t = str(tr.get("티커", "") or "").strip()
+        q = float(tr.get("수량", 0) or 0)
+        if side in (BUY, SELL, SPLIT) and (not t or q <= 0):
+            raise LedgerError("티커와 양수 수량이 필요합니다.")
+        return {
+            "날짜": _day(tr.get("날짜")),
+            "티커": t, "구분": side, "수량": q,
+            "가격": float(tr.get("가격", 0) or 0), "수수료": float(tr.get("수수료", 0) or 0),
+            "메모": str(tr.get("메모", "") or ""),
+        }
+
+    def _check(self, row: dict):
+        """
+        현재 상태 기준 검사. 티커별 날짜순이 유지되므로 현재 수량 = 그 날짜 기준 수량
+        """
+        t = row["티커"]
+        if t and row["날짜"] < self.last.get(t, ""):
+            raise LedgerError(f"{t}: 마지막 거래일({self.last[t]})보다 이른 거래는 추가할 수 없습니다.")
+        if row["구분"] == SELL and row["수량"] > self.qty.get(t, 0.0) + EPS:
+            raise LedgerError(f"{t}: {row['날짜']} 보유 {self.qty.get(t, 0.0):g}보다 많이 매도할 수 없습니다.")
+
+    def _journal(self, tickers) -> tuple:
+        """되돌리기용 기록(닿는 티커 상태만 복사)"""
+        per = {t: (deepcopy(self.lots.get(t)), self.qty.get(t), self.cost.get(t), self.realized.get(t),
+                   self.last.get(t)) for t in tickers}
+        return per, self.fees, self.count, len(self.log)
+
+    def _restore(self, journal: tuple):
+        per, self.fees, self.count, n = journal
+        del self.log[n:]
+        for t, values in per.items():
+            for d, v in zip((self.lots, self.qty, self.cost, self.realized, self.last), values):
+                if v is None:
+                    d.pop(t, None)
+                else:
+                    d[t] = v
+
+    def add(self, *trades: dict) -> int:
+        """
+        거래 추가. 날짜순(같은 날은 입력 순)으로 처리. 하나라도 잘못되면 아무것도 기록하지 않음.
+        - 티커의 마지막 거래일보다 이른 거래는 거부
+        - 반환: 추가한 건수
+        """
+        with self._lock:
+            rows = sorted((self._validate(tr) for tr in trades), key=lambda r: r["날짜"])
+            journal = self._journal({r["티커"] for r in rows if r["티커"]})
+            try:
+                for r in rows:
+                    self._check(r)
+                    self._apply(r)
+                lines = "".join(_encode(r) + "\n" for r in rows).encode("utf-8")
+                self.root.mkdir(parents=True, exist_ok=True)
+                with open(self.trades_path, "ab") as f:
+                    pos = f.tell()
+                    try:
+                        f.write(lines)
+                        f.flush()
+                    except OSError:
+                        f.truncate(pos)   # 반쯤 쓴 줄 제거
+                        raise
+            except BaseException:
+                self._restore(journal)
+                raise
+            self.offset += len(lines)
+            self._since_snapshot += len(rows)
+            if self._since_snapshot >= SNAPSHOT_EVERY:
+                self._snapshot()
+            return len(rows)
+
+    # ---------- 조회 ----------
+    def holdings(self) -> pd.DataFrame:
+        """티커/수량/평단가/원가(미청산 lot 기준). 평단가는 수수료 포함"""
+        with self._lock:
+            t = [k for k, v in self.qty.items() if v > EPS]
+            q = np.array([self.qty[k] for k in t], dtype="float64")
+            c = np.array([self.cost[k] for k in t], dtype="float64")
+        return pd.DataFrame({"티커": t, "수량": q, "평단가": c / np.where(q > 0, q, 1.0), "원가": c})
+
+    def pnl(self, prices: pd.Series | None = None) -> pd.DataFrame:
+        """
+        티커별 손익. prices(티커 → 현재가)가 있으면 평가액/미실현손익 포함
+        """
+        h = self.holdings().set_index("티커")
+        with self._lock:
+            realized = pd.Series(dict(self.realized), dtype="float64")
+        out = h.join(realized.rename("실현손익"), how="outer").fillna({"수량": 0.0, "원가": 0.0, "실현손익": 0.0})
+        if prices is not None:
+            out["현재가"] = out.index.map(prices).astype("float64")
+            out["평가액"] = out["수량"] * out["현재가"]
+            out["미실현손익"] = out["평가액"] - out["원가"]
+        return out.rename_axis("티커").reset_index()
+
+    def realized_log(self, tail: int | None = None) -> pd.DataFrame:
+        """매도별 실현 내역(보관분 + 스냅샷 이후분). tail이면 마지막 tail건만"""
+        with self._lock:
+            rows = []
+            if self.log_offset and (not tail or len(self.log) < tail):
+                if tail:
+                    rows = [json.loads(line) for line in _tail_lines(self.realized_path, tail - len(self.log))]
+                else:
+                    with open(self.realized_path, "rb") as f:
+                        rows = [json.loads(line) for line in f.read(self.log_offset).splitlines() if line.strip()]
+            rows += [list(r) for r in self.log]
+        return pd.DataFrame(rows[-tail:] if tail else rows, columns=REALIZED_COLS)
+
+    def trades(self, tail: int | None = None) -> pd.DataFrame:
+        """원장 거래 목록(추가 순). tail이면 파일 끝에서 거슬러 읽어 마지막 tail건만"""
+        if not self.trades_path.exists():
+            return pd.DataFrame(columns=TRADE_COLS)
+        if not tail:
+            return pd.read_json(self.trades_path, lines=True, dtype={"티커": str})
+        return pd.DataFrame([json.loads(line) for line in _tail_lines(self.trades_path, tail)], columns=TRADE_COLS)
+
+
+def _tail_lines(path, n: int) -> list[bytes]:
+    """파일 마지막 n줄(끝에서 블록 단위로 읽음 → 파일 크기와 무관)"""
+    with open(path, "rb") as f:
+        end = f.seek(0, 2)
+        buf = b""
+        while end > 0 and buf.count(b"\n") <= n:
+            step = min(TAIL_BLOCK, end)
+            end -= step
+            f.seek(end)
+            buf = f.read(step) + buf
+    return [line for line in buf.splitlines() if line.strip()][-n:]
+
+
+_ledger: Ledger | None = None
+_ledger_lock = threading.Lock()
+
+
+def get_ledger() -> Ledger:
+    """프로세스 공용 원장"""
+    global _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = Ledger()
+        return _ledger
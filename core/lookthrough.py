@@ -0,0 +1,322 @@
+# core/lookthrough.py
+"""
+ETF 구성종목 투시(look-through) 노출.
+- KRX ETF의 PDF(자산 구성 내역)를 pykrx로 받아 ETF별 Parquet에 보관(거래일당 최대 1회 확인)
+- 내용 해시가 같으면 기존 행렬 조각 그대로, 바뀐 ETF 조각만 교체
+- 전체는 COO 희소 행렬(행: ETF, 열: 구성 종목, 값: 비중). 노출 = 보유 금액 벡터 × 행렬
+  · np.bincount(열, 비중 × 금액[행])로 종목 노출을 한 번에 합산(scipy 없이)
+  · 섹터/자산군은 종목 → 범주 코드 배열로 같은 방식 한 번 더
+- 섹터: KRX 업종분류(KOSPI/KOSDAQ, 주 1회 갱신)
+- 자산군: 수동 매핑(ASSET_MAP + .data/lookthrough/asset_map.json) 우선, 없으면 규칙(asset_class)
+  · 투시 못 한 해외 보유는 매핑에 없으면 기타(채권·금 ETF를 주식으로 보지 않도록)
+"""
+import datetime as dt
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core import DATA_DIR, instrument
+from core.market import bizday
+from core.provider import get_provider, looks_krx
+from core.sources import krx_code
+from core.symbols import get_directory
+
+LOOK_DIR = DATA_DIR / "lookthrough"
+SECTOR_TTL = 7 * 24 * 3600
+MAX_WORKERS = 8
+UNCLASSIFIED = "미분류"
+ASSET_CLASSES = ["국내주식", "해외주식", "채권", "현금", "원자재", "파생", "펀드/ETF", "기타"]
+# 자주 쓰는 해외 ETF 자산군. 그 밖의 티커는 asset_map.json({"티커": "자산군"})으로 추가
+ASSET_MAP = {
+    **dict.fromkeys(["SPY", "VOO", "IVV", "VTI", "QQQ", "DIA", "IWM", "VEA", "VWO", "EFA", "EEM", "SCHD", "VT"],
+                    "해외주식"),
+    **dict.fromkeys(["TLT", "IEF", "SHY", "AGG", "BND", "LQD", "HYG", "TIP", "GOVT", "BIL", "SGOV", "EDV", "VGLT"],
+                    "채권"),
+    **dict.fromkeys(["GLD", "IAU", "GLDM", "SLV", "DBC", "PDBC", "USO"], "원자재"),
+}
+
+
+class Exposure(NamedTuple):
+    """security: 종목별(코드/종목명/섹터/자산군/금액/비중), sector·asset: 범주 → 금액, direct: 투시 못 한 보유"""
+    security: pd.DataFrame
+    sector: pd.Series
+    asset: pd.Series
+    direct: list
+
+
+def _pdf(code: str, date: str) -> pd.DataFrame:
+    from pykrx import stock
+    return stock.get_etf_portfolio_deposit_file(code, date)
+
+
+def _sectors(date: str) -> pd.DataFrame:
+    from pykrx import stock
+    frames = [stock.get_market_sector_classifications(date, market=m) for m in ("KOSPI", "KOSDAQ")]
+    return pd.concat([f for f in frames if f is not None and not f.empty])
+
+
+def normalize_pdf(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    PDF → 코드/비중(합 1). 금액이 있으면 금액 비율, 없으면 비중(%) 사용
+    """
+    if raw is None or raw.empty:
+        return pd.DataFrame({"코드": pd.Series(dtype=str), "비중": pd.Series(dtype="float64")})
+    amt = pd.to_numeric(raw.get("금액"), errors="coerce") if "금액" in raw else None
+    w = amt if amt is not None and amt.fillna(0).abs().sum() > 0 else pd.to_numeric(raw.get("비중"), errors="coerce")
+    w = w.fillna(0.0).clip(lower=0.0).astype("float64")
+    df = pd.DataFrame({"코드": raw.index.astype(str).str.strip(), "비중": w.to_numpy()})
+    df = df[df["비중"] > 0].groupby("코드", sort=False, as_index=False)["비중"].sum()
+    total = df["비중"].sum()
+    if total > 0:
+        df["비중"] = df["비중"] / total
+    return df
+
+
+def asset_class(code: str, name: str, etfs: set, mapping: dict | None = None) -> str:
+    """구성 종목 코드/이름 → 자산군. mapping(티커 → 자산군)에 있으면 그대로, 없으면 규칙 기반"""
+    hit = (mapping or {}).get(code.upper())
+    if hit:
+        return hit
+    n = name.upper()
+    if any(k in n for k in ("현금", "예금", "원화", "CASH", "DEPOSIT")):
+        return "현금"
+    if any(k in n for k in ("선물", "스왑", "FUTURE", "SWAP", " FUT")):
+        return "파생"
+    if code in etfs:
+        return "펀드/ETF"
+    if looks_krx(code) or (len(code) == 12 and code.startswith("KR7")):
+        return "국내주식"
+    if len(code) == 12 and code.startswith("KR"):
+        return "채권"
+    if code[:1].isalpha() and not code.startswith("KR"):
+        return "해외주식"
+    return "기타"
+
+
+class LookThrough:
+    def __init__(self, root=LOOK_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        # 구성 종목 열 번호(추가만, 기존 번호 불변)
+        self._col: dict[str, int] = {}
+        self._codes: list[str] = []
+        # ETF → (해시, 열 번호 배열, 비중 배열)
+        self._parts: dict[str, tuple[str, np.ndarray, np.ndarray]] = {}
+        self._meta: dict[str, dict] = {}
+        self._sector: pd.Series | None = None
+        self._asset_map: dict[str, str] | None = None
+
+    # ---------- 저장 ----------
+    def _paths(self, code: str):
+        base = self.root / "pdf" / code
+        return base.with_suffix(".parquet"), base.with_suffix(".json")
+
+    def meta(self, code: str) -> dict:
+        with self._lock:
+            return self._meta_locked(code)
+
+    def _meta_locked(self, code: str) -> dict:
+        """meta() 본체. 호출 측이 _lock 보유"""
+        m = self._meta.get(code)
+        if m is None:
+            try:
+                m = json.loads(self._paths(code)[1].read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                m = {}
+            self._meta[code] = m
+        return m
+
+    def constituents(self, code: str) -> pd.DataFrame:
+        """저장된 구성(코드/비중). 없으면 빈 프레임"""
+        try:
+            return pd.read_parquet(self._paths(code)[0])
+        except (OSError, ValueError):
+            return normalize_pdf(None)
+
+    # ---------- 갱신 ----------
+    def refresh(self, codes, date: str | None = None, max_workers: int = MAX_WORKERS) -> dict[str, str]:
+        """
+        오늘(영업일) 확인 안 한 ETF만 PDF 조회. 내용이 같으면 확인 날짜만 갱신.
+        - 반환: 코드별 실패 사유(저장본은 유지)
+        """
+        codes = [c for c in dict.fromkeys(codes)]
+        try:
+            date = date or bizday()
+        except Exception as e:
+            return {c: f"영업일 확인 실패: {e}" for c in codes if not self.meta(c)}
+        stale = [c for c in codes if self.meta(c).get("date") != date]
+        if not stale:
+            return {}
+        prov = get_provider()
+        errors: dict[str, str] = {}
+
+        def fetch(c):
+            try:
+                return c, normalize_pdf(prov.call("pykrx", _pdf, c, date, timeout=20))
+            except Exception as e:
+                errors[c] = str(e)
+                return c, None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(stale))) as ex:
+            results = list(ex.map(fetch, stale))
+        (self.root / "pdf").mkdir(parents=True, exist_ok=True)
+        for c, df in results:
+            if df is None:
+                continue
+            if df.empty:
+                errors[c] = "구성 정보 없음"
+                continue
+            digest = hashlib.blake2b(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes(),
+                                     digest_size=12).hexdigest()
+            ppath, mpath = self._paths(c)
+            if digest != self.meta(c).get("digest"):
+                tmp = ppath.with_suffix(".tmp")
+                df.to_parquet(tmp, index=False)
+                tmp.replace(ppath)
+            m = {"date": date, "digest": digest}
+            mpath.write_text(json.dumps(m), encoding="utf-8")
+            with self._lock:
+                self._meta[c] = m
+        return errors
+
+    def asset_map(self) -> dict[str, str]:
+        """티커 → 자산군 수동 매핑(ASSET_MAP + asset_map.json). 읽기 실패 시 기본 매핑만"""
+        if self._asset_map is None:
+            extra = {}
+            try:
+                extra = json.loads((self.root / "asset_map.json").read_text(encoding="utf-8"))
+            except OSError:
+                pass
+            except ValueError as e:
+                instrument.swallow("lookthrough.asset_map", e)
+            self._asset_map = {**ASSET_MAP, **{str(k).strip().upper(): str(v) for k, v in extra.items()}}
+        return self._asset_map
+
+    def sectors(self, date: str | None = None) -> pd.Series:
+        """종목코드 → 업종명. 디스크 보관, SECTOR_TTL마다 재조회(실패 시 저장본)"""
+        path = self.root / "sectors.parquet"
+        fresh = path.exists() and dt.datetime.now().timestamp() - path.stat().st_mtime < SECTOR_TTL
+        if fresh and self._sector is not None:
+            return self._sector
+        if not fresh:
+            try:
+                raw = get_provider().call("pykrx", _sectors, date or bizday(), timeout=30)
+                s = raw["업종명"].astype(str)
+                s.index = s.index.astype(str)
+                self.root.mkdir(parents=True, exist_ok=True)
+                s.rename("업종명").to_frame().to_parquet(path)
+            except Exception as e:
+                instrument.swallow("lookthrough.sectors", e)  # 저장본(없으면 전부 미분류)
+        self._sector = pd.read_parquet(path)["업종명"] if path.exists() else pd.Series(dtype=str)
+        return self._sector
+
+    # ---------- 행렬 ----------
+    def _columns(self, codes) -> np.ndarray:
+        """구성 종목 코드 → 열 번호(처음 보는 코드는 끝에 추가)"""
+        out = np.empty(len(codes), dtype=np.int64)
+        for i, c in enumerate(codes):
+            j = self._col.get(c)
+            if j is None:
+                j = self._col[c] = len(self._codes)
+                self._codes.append(c)
+            out[i] = j
+        return out
+
+    def _part(self, code: str):
+        """ETF 한 행의 (열, 비중). 해시가 같으면 캐시 재사용"""
+        digest = self._meta_locked(code).get("digest")
+        hit = self._parts.get(code)
+        if hit is not None and hit[0] == digest:
+            return hit[1], hit[2]
+        df = self.constituents(code)
+        cols, w = self._columns(df["코드"].tolist()), df["비중"].to_numpy(dtype="float64")
+        self._parts[code] = (digest, cols, w)
+        return cols, w
+
+    def matrix(self, etfs: list[str]):
+        """희소 행렬 COO (행, 열, 값). 행 순서 = etfs"""
+        rows, cols, vals = [], [], []
+        with self._lock:
+            for i, e in enumerate(etfs):
+                c, w = self._part(e)
+                rows.append(np.full(len(c), i, dtype=np.int64))
+                cols.append(c)
+                vals.append(w)
+            n_cols = len(self._codes)
+        if not rows:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0), n_cols
+        return np.concatenate(rows), np.concatenate(cols), np.concatenate(vals), n_cols
+
+    # ---------- 노출 ----------
+    @instrument.traced("lookthrough.exposure")
+    def exposure(self, values: pd.Series, refresh: bool = True) -> Exposure:
+        """
+        보유 금액(티커 → 금액, 기준 통화) → 종목/섹터/자산군 노출.
+        - KRX ETF는 PDF로 투시, 나머지(개별 종목, 해외 ETF 등)는 자기 자신 1종목으로
+        """
+        values = values.groupby(level=0).sum().astype("float64")
+        values = values[values > 0]
+        directory = get_directory()
+        etf_names = directory.names("ETF")
+        krx_etf = [t for t in values.index if looks_krx(t) and krx_code(t) in etf_names.index]
+        codes = [krx_code(t) for t in krx_etf]
+        if refresh and codes:
+            self.refresh(codes)
+        looked = [(t, c) for t, c in zip(krx_etf, codes) if self.meta(c).get("digest")]
+        direct = [t for t in values.index if t not in {t for t, _ in looked}]
+
+        rows, cols, w, n_cols = self.matrix([c for _, c in looked])
+        # 투시 못 한 보유는 자기 자신 열(비중 1)로 붙임
+        with self._lock:
+            d_cols = self._columns([krx_code(t) if looks_krx(t) else t for t in direct])
+            n_cols = len(self._codes)
+            all_codes = np.array(self._codes, dtype=object)
+        v = np.concatenate([values.reindex([t for t, _ in looked]).to_numpy(), values.reindex(direct).to_numpy()])
+        rows = np.concatenate([rows, len(looked) + np.arange(len(direct))])
+        cols = np.concatenate([cols, d_cols])
+        w = np.concatenate([w, np.ones(len(direct))])
+
+        amount = np.bincount(cols, weights=w * v[rows], minlength=n_cols)
+        used = np.flatnonzero(amount > 0)
+        sec_codes = all_codes[used]
+        names = pd.Series(sec_codes).map(directory.names()).fillna(pd.Series(sec_codes)).to_numpy()
+        etf_set = set(etf_names.index)
+        sector_map = self.sectors() if refresh else (self._sector if self._sector is not None else pd.Series(dtype=str))
+        sector = pd.Series(sec_codes).map(sector_map).fillna(UNCLASSIFIED).to_numpy()
+        direct_set = {krx_code(t) if looks_krx(t) else t for t in direct}
+        mapping = self.asset_map()
+        asset = np.array([
+            (mapping.get(c.upper(), "기타") if c in direct_set and not looks_krx(c)
+             else asset_class(c, n, etf_set, mapping))
+            for c, n in zip(sec_codes, names)
+        ], dtype=object)
+        amt = amount[used]
+        total = amt.sum()
+        security = pd.DataFrame({
+            "코드": sec_codes, "종목명": names, "섹터": sector, "자산군": asset,
+            "금액": amt, "비중": amt / total if total > 0 else amt,
+        }).sort_values("금액", ascending=False, ignore_index=True)
+
+        def rollup(labels: np.ndarray) -> pd.Series:
+            cats, inv = np.unique(labels.astype(str), return_inverse=True)
+            return pd.Series(np.bincount(inv, weights=amt), index=cats).sort_values(ascending=False)
+
+        return Exposure(security, rollup(sector), rollup(asset), direct)
+
+
+_lt: LookThrough | None = None
+_lt_lock = threading.Lock()
+
+
+def get_lookthrough() -> LookThrough:
+    """프로세스 공용 투시 엔진"""
+    global _lt
+    with _lt_lock:
+        if _lt is None:
+            _lt = LookThrough()
+        return _lt
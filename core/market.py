@@ -0,0 +1,112 @@
+# core/market.py
+"""
+시장 전체 일별 스냅샷(종목별 OHLCV) 로더.
+- 시장당 pykrx 요청 1회, 종목명은 일별 종목 디렉터리에서 일괄 매핑
+- 컬럼형 압축: 시장/종목명 category, 거래량/거래대금 정수 다운캐스트, 나머지 수치 float32
+- (날짜, 시장)별 프로세스 캐시(TTL 5분). 순위는 부분 선택(argpartition)으로 계산
+"""
+import datetime as dt
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import instrument
+from core.provider import get_provider
+from core.symbols import get_directory
+
+TTL = 300
+SCOPES = {
+    "KOSPI": ["KOSPI"],
+    "KOSDAQ": ["KOSDAQ"],
+    "KOSPI+KOSDAQ": ["KOSPI", "KOSDAQ"],
+    "ETF": ["ETF"],
+}
+COUNT_COLS = ["거래량", "거래대금"]
+
+_cache: dict[tuple[str, str], tuple[pd.DataFrame, float]] = {}
+_cache_lock = threading.Lock()
+
+
+def _nearest_bizday(d: str) -> str:
+    from pykrx import stock
+    return stock.get_nearest_business_day_in_a_week(d)
+
+
+def bizday(when: dt.date | None = None) -> str:
+    """오늘이 휴장일이면 가장 가까운 영업일(YYYYMMDD)"""
+    d = (when or dt.date.today()).strftime("%Y%m%d")
+    return get_provider().call("pykrx", _nearest_bizday, d)
+
+
+def fetch_snapshot(date: str, market: str) -> pd.DataFrame:
+    """pykrx 시장 전체 일별 OHLCV 원본(가공 전). Provider.call로 감싸 호출"""
+    from pykrx import stock
+    if market == "ETF":
+        return stock.get_etf_ohlcv_by_ticker(date)
+    return stock.get_market_ohlcv_by_ticker(date, market=market)
+
+
+def compact(raw: pd.DataFrame, market: str) -> pd.DataFrame:
+    """pykrx 응답 → 종목코드/종목명/시장 + 다운캐스트 수치 컬럼"""
+    df = raw.rename_axis("종목코드").reset_index()
+    df["종목코드"] = df["종목코드"].astype(str)
+    df["종목명"] = df["종목코드"].map(get_directory().names(market)).astype("category")
+    df["시장"] = pd.Categorical([market] * len(df))
+    # pykrx ETF에는 등락률 컬럼이 없을 수 있음 → 종가/시가로 근사
+    if "등락률" not in df.columns and {"시가", "종가"}.issubset(df.columns):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            df["등락률"] = (df["종가"] / df["시가"] - 1.0) * 100
+    for c in df.columns.drop(["종목코드", "종목명", "시장"]):
+        if c in COUNT_COLS:
+            df[c] = pd.to_numeric(df[c], errors="coerce", downcast="integer")
+        else:
+            df[c] = pd.to_numeric(df[c], errors="coerce").astype("float32")
+    return df
+
+
+def load_market(date: str, market: str, ttl: float = TTL) -> pd.DataFrame:
+    """한 시장 스냅샷. TTL 안이면 캐시, 아니면 요청 1회"""
+    key = (date, market)
+    with _cache_lock:
+        hit = _cache.get(key)
+    if hit is not None and time.time() - hit[1] < ttl:
+        instrument.cache("market.load_market", hits=1)
+        return hit[0]
+    instrument.cache("market.load_market", misses=1)
+    df = compact(get_provider().call("pykrx", fetch_snapshot, date, market, timeout=60), market)
+    with _cache_lock:
+        _cache[key] = (df, time.time())
+    return df
+
+
+@instrument.traced("market.snapshot")
+def snapshot(date: str, scope: str, ttl: float = TTL) -> pd.DataFrame:
+    """범위(SCOPES 키) 스냅샷. 여러 시장이면 이어 붙이고 category 유지"""
+    frames = [load_market(date, m, ttl) for m in SCOPES[scope]]
+    if len(frames) == 1:
+        return frames[0]
+    df = pd.concat(frames, ignore_index=True)
+    for c in ("종목명", "시장"):
+        df[c] = df[c].astype("category")
+    return df
+
+
+def top_n(df: pd.DataFrame, metric: str, n: int, ascending: bool = False) -> pd.DataFrame:
+    """
+    metric 상위 n행. 전체 정렬 대신 argpartition으로 n개만 고른 뒤 그 안에서 정렬.
+    - NaN은 제외
+    """
+    v = df[metric].to_numpy(dtype="float64")
+    idx = np.flatnonzero(~np.isnan(v))
+    key = v[idx] if ascending else -v[idx]
+    if n < len(idx):
+        part = np.argpartition(key, n - 1)[:n]
+        idx, key = idx[part], key[part]
+    return df.iloc[idx[np.argsort(key, kind="stable")]]
+
+
+def clear():
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,166 @@
+# core/montecarlo.py
+"""
+몬테카를로 적립 시뮬레이션.
+- 자산별 월수익률을 상관 있는 로그정규로 생성, 경로 묶음(chunk) 단위로 계산
+- 월별 NAV 분포는 로그 버킷 스케치(상대오차 alpha)에 누적 → 전체 텐서를 메모리에 두지 않음
+- 청크마다 고정 시드(SeedSequence.spawn) → 워커 수와 무관하게 같은 결과
+- 청크 묶음을 프로세스 풀에 나눠 멀티코어 실행
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from core import instrument
+from core.parallel import cpu_workers, pmap
+from core.sim import MODE_CONTRIB, project
+
+PERCENTILES = (5, 25, 50, 75, 95)
+CHUNK_BYTES = 32 * 2**20  # 청크당 수익률 텐서 목표 크기
+MIN_VALUE = 1.0           # 스케치에 넣을 최소 금액(0 이하 방지)
+
+
+class LogSketch:
+    """
+    행(월)별 로그 버킷 히스토그램. DDSketch와 같은 버킷 규칙.
+    - 키 k = ceil(log_γ x), γ = (1+α)/(1-α) → 분위수 상대오차 α 이내
+    - 청크 결과끼리 counts 합산으로 병합
+    """
+
+    def __init__(self, rows: int, alpha: float = 0.005):
+        self.rows = rows
+        self.alpha = alpha
+        self.log_gamma = np.log((1 + alpha) / (1 - alpha))
+        self.kmin = 0
+        self.counts = np.zeros((rows, 0), dtype=np.int64)
+        self.n = 0
+
+    def _grow(self, kmin: int, kmax: int):
+        if self.counts.shape[1] == 0:
+            self.kmin = kmin
+            self.counts = np.zeros((self.rows, kmax - kmin + 1), dtype=np.int64)
+            return
+        lo = min(kmin, self.kmin)
+        hi = max(kmax, self.kmin + self.counts.shape[1] - 1)
+        if lo == self.kmin and hi == self.kmin + self.counts.shape[1] - 1:
+            return
+        grown = np.zeros((self.rows, hi - lo + 1), dtype=np.int64)
+        off = self.kmin - lo
+        grown[:, off:off + self.counts.shape[1]] = self.counts
+        self.kmin, self.counts = lo, grown
+
+    def add(self, values: np.ndarray):
+        """values: (경로 수, rows)"""
+        keys = np.ceil(np.log(np.maximum(values, MIN_VALUE)) / self.log_gamma).astype(np.int64)
+        self._grow(int(keys.min()), int(keys.max()))
+        width = self.counts.shape[1]
+        flat = (np.arange(self.rows)[None, :] * width + (keys - self.kmin)).ravel()
+        self.counts += np.bincount(flat, minlength=self.rows * width).reshape(self.rows, width)
+        self.n += values.shape[0]
+
+    def merge(self, other: "LogSketch"):
+        if other.n == 0:
+            return
+        self._grow(other.kmin, other.kmin + other.counts.shape[1] - 1)
+        off = other.kmin - self.kmin
+        self.counts[:, off:off + other.counts.shape[1]] += other.counts
+        self.n += other.n
+
+    def quantiles(self, qs) -> np.ndarray:
+        """qs(0~1) → (len(qs), rows) 추정값"""
+        cum = np.cumsum(self.counts, axis=1)
+        gamma = np.exp(self.log_gamma)
+        out = np.empty((len(qs), self.rows))
+        for i, q in enumerate(qs):
+            rank = q * (self.n - 1) + 1
+            k = (cum >= rank).argmax(axis=1) + self.kmin
+            out[i] = 2 * gamma ** k / (gamma + 1)
+        return out
+
+
+class MonteCarloResult(NamedTuple):
+    """bands: (len(percentiles), 월+1) 분위 경로, prob_below: 기말 < 총 납입 확률"""
+    percentiles: tuple
+    bands: np.ndarray
+    prob_below: float
+    paths: int
+
+
+def lognormal_params(annual_mu, annual_vol, corr):
+    """
+    연 기대수익률/변동성/상관 → 월 로그수익률 평균과 콜레스키 인자.
+    - 월 산술평균 m = (1+μ)^(1/12)-1, 월 변동성 s = σ/√12 에 맞춘 로그정규
+    - 상관행렬이 양정치가 아니면 고유값을 잘라 보정
+    """
+    mu = np.asarray(annual_mu, dtype="float64")
+    vol = np.asarray(annual_vol, dtype="float64")
+    m = (1.0 + mu) ** (1 / 12.0) - 1.0
+    s = vol / np.sqrt(12.0)
+    var = np.log1p((s / (1.0 + m)) ** 2)
+    mean = np.log1p(m) - var / 2
+    sd = np.sqrt(var)
+    cov = np.asarray(corr, dtype="float64") * np.outer(sd, sd)
+    try:
+        chol = np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        w, v = np.linalg.eigh(cov)
+        chol = np.linalg.cholesky((v * np.maximum(w, 1e-12)) @ v.T)
+    return mean, chol
+
+
+def _chunks(paths: int, assets: int, months: int) -> list[int]:
+    size = max(256, CHUNK_BYTES // (8 * max(assets, 1) * max(months, 1) * 3))
+    sizes = [size] * (paths // size)
+    if paths % size:
+        sizes.append(paths % size)
+    return sizes
+
+
+def _run(task) -> tuple:
+    """청크 묶음 실행(워커 프로세스). 반환: (kmin, counts, n, 기말<기준 개수)"""
+    (specs, mean, chol, init_alloc, weights, monthly, months, mode, other, threshold, alpha) = task
+    sketch = LogSketch(months + 1, alpha)
+    below = 0
+    for n, seed in specs:
+        rng = np.random.default_rng(seed)
+        z = rng.standard_normal((n, len(mean), months))
+        r = np.expm1(mean[:, None] + chol @ z)          # (n, A, M) 월수익률
+        nav = project(init_alloc, r, weights, monthly, months, mode=mode, other=other).nav
+        sketch.add(nav)
+        below += int((nav[:, -1] < threshold).sum())
+    return sketch.kmin, sketch.counts, sketch.n, below
+
+
+@instrument.traced("montecarlo.simulate")
+def simulate(init_alloc, annual_mu, annual_vol, corr, weights, monthly_contrib, months: int,
+             paths: int = 100_000, mode: str = MODE_CONTRIB, other: float = 0.0,
+             invested: float | None = None, seed: int = 0, workers: int | None = None,
+             alpha: float = 0.005, percentiles=PERCENTILES) -> MonteCarloResult:
+    """
+    경로 paths개 시뮬레이션 후 월별 분위 경로 반환.
+    - init_alloc/weights/mode/other: core.sim.project와 동일
+    - invested: 손실 판정 기준(기본: 시작 자산 + 총 적립금)
+    - workers: 프로세스 수(기본 CPU 수, 1이면 현재 프로세스에서 실행)
+    """
+    init_alloc = np.asarray(init_alloc, dtype="float64")
+    mean, chol = lognormal_params(annual_mu, annual_vol, corr)
+    if invested is None:
+        invested = init_alloc.sum() + other + monthly_contrib * months
+    sizes = _chunks(paths, len(mean), months)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    specs = list(zip(sizes, seeds))
+    workers = min(cpu_workers(workers), len(specs))
+    common = (mean, chol, init_alloc, np.asarray(weights, dtype="float64"), monthly_contrib,
+              months, mode, other, invested, alpha)
+    tasks = [(specs[i::workers],) + common for i in range(workers)]
+
+    parts = pmap(_run, tasks, workers)
+
+    sketch = LogSketch(months + 1, alpha)
+    below = 0
+    for kmin, counts, n, b in parts:
+        part = LogSketch(months + 1, alpha)
+        part.kmin, part.counts, part.n = kmin, counts, n
+        sketch.merge(part)
+        below += b
+    bands = sketch.quantiles([p / 100 for p in percentiles])
+    return MonteCarloResult(tuple(percentiles), bands, below / max(sketch.n, 1), sketch.n)
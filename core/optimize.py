@@ -0,0 +1,227 @@
+# core/optimize.py
+"""
+평균-분산 최적화(롱온리 + 자산별 상·하한).
+- 추정치(기대수익률, 축소 공분산)는 (티커, 기간, 마지막 거래일) 단위로 프로세스 내 캐시
+- 제약 집합 {Σw=1, lo≤w≤hi} 위 사영 경사법(FISTA). scipy 없이 NumPy만 사용
+- 효율적 투자선: 위험회피 계수 λ 여러 개를 (점 개수, 자산) 행렬로 한 번에 풀기
+"""
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core import instrument
+from core.batch import load_many
+from core.stats import mean_cov
+
+CACHE_SIZE = 32
+MAX_ITER = 3000
+TOL = 1e-9
+
+
+class Estimate(NamedTuple):
+    """연 기대수익률/공분산. delta: Ledoit-Wolf 축소 강도, obs: 자산별 관측일 수"""
+    tickers: list
+    mu: np.ndarray
+    cov: np.ndarray
+    delta: float
+    obs: np.ndarray
+    errors: dict
+
+
+class Frontier(NamedTuple):
+    """weights: (점 개수, 자산), 변동성 오름차순"""
+    weights: np.ndarray
+    ret: np.ndarray
+    vol: np.ndarray
+
+
+_estimates: OrderedDict = OrderedDict()
+_estimates_lock = threading.Lock()
+
+
+@instrument.traced("optimize.estimate")
+def estimate(tickers: list[str], period: str = "5y") -> Estimate:
+    """
+    저장소 수정 종가(분배금 재투자)로 추정. 같은 (티커, 기간)이고 새 거래일이 없으면 캐시 반환.
+    - 데이터 없는 티커는 제외하고 errors에 기록
+    """
+    batch = load_many(tickers, period, total_return=True)
+    names = list(batch.series)
+    last = max((s.index[-1] for s in batch.series.values()), default=None)
+    key = (tuple(names), period, last)
+    with _estimates_lock:
+        hit = _estimates.get(key)
+        if hit is not None:
+            _estimates.move_to_end(key)
+            return hit._replace(errors=batch.errors)
+    closes = pd.DataFrame(batch.series).reindex(columns=names)
+    if names:
+        mu, cov, delta, n = mean_cov(closes)
+        obs = np.diag(n).astype(int)
+    else:
+        mu, cov, delta, obs = np.zeros(0), np.zeros((0, 0)), 0.0, np.zeros(0, dtype=int)
+    est = Estimate(names, mu, cov, delta, obs, batch.errors)
+    with _estimates_lock:
+        _estimates[key] = est
+        while len(_estimates) > CACHE_SIZE:
+            _estimates.popitem(last=False)
+    return est
+
+
+# ---------- 제약 집합 사영 ----------
+def bounds(n: int, lo=0.0, hi=1.0):
+    """스칼라/배열 상·하한 → (n,) 배열. 합 1이 불가능하면 ValueError"""
+    lo = np.broadcast_to(np.asarray(lo, dtype="float64"), (n,)).copy()
+    hi = np.broadcast_to(np.asarray(hi, dtype="float64"), (n,)).copy()
+    if np.any(lo > hi) or lo.sum() > 1 + 1e-9 or hi.sum() < 1 - 1e-9:
+        raise ValueError("비중 상·하한으로 합 100%를 만들 수 없습니다.")
+    return lo, hi
+
+
+def project_capped_simplex(v: np.ndarray, lo: np.ndarray, hi: np.ndarray, iters: int = 50) -> np.ndarray:
+    """
+    (..., 자산) 각 행을 {Σw=1, lo≤w≤hi}에 유클리드 사영.
+    - w = clip(v - τ, lo, hi), Σw(τ)는 τ에 단조 → 행별 이분법을 벡터로 동시에
+    """
+    a = (v - hi).min(axis=-1, keepdims=True)
+    b = (v - lo).max(axis=-1, keepdims=True)
+    for _ in range(iters):
+        tau = (a + b) / 2
+        over = np.clip(v - tau, lo, hi).sum(axis=-1, keepdims=True) > 1
+        a = np.where(over, tau, a)
+        b = np.where(over, b, tau)
+    w = np.clip(v - (a + b) / 2, lo, hi)
+    return w
+
+
+def _polish(cov: np.ndarray, lin: np.ndarray, w: np.ndarray, lo, hi, tol: float = 1e-10):
+    """
+    근사해의 활성 집합(상·하한에 붙은 자산)을 고정하고 KKT 선형계로 정확해 계산.
+    - 해가 범위 안이고 라그랑주 승수 부호가 맞으면 반환, 아니면 None
+    """
+    at_lo, at_hi = w <= lo + 1e-9, w >= hi - 1e-9
+    free = ~(at_lo | at_hi)
+    x = np.where(at_lo, lo, np.where(at_hi, hi, 0.0))
+    if not free.any():
+        # 꼭짓점: 합 1이고 승수 ν가 max(-g_lo) ≤ ν ≤ min(-g_hi)를 만족하면 최적
+        g = cov @ x - lin
+        ok = abs(x.sum() - 1.0) < 1e-9 and (-g[at_lo]).max(initial=-np.inf) <= (-g[at_hi]).min(initial=np.inf) + 1e-9
+        return x if ok else None
+    f = np.flatnonzero(free)
+    k = len(f)
+    kkt = np.zeros((k + 1, k + 1))
+    kkt[:k, :k] = cov[np.ix_(f, f)]
+    kkt[:k, k] = kkt[k, :k] = 1.0
+    rhs = np.concatenate([lin[f] - cov[f] @ x, [1.0 - x.sum()]])
+    try:
+        sol = np.linalg.solve(kkt, rhs)
+    except np.linalg.LinAlgError:
+        return None
+    x[f] = sol[:k]
+    if np.any(x[f] < lo[f] - tol) or np.any(x[f] > hi[f] + tol):
+        return None
+    g = cov @ x - lin + sol[k]           # 자유 자산에서 0
+    if np.any(g[at_lo] < -1e-9) or np.any(g[at_hi] > 1e-9):
+        return None
+    return np.clip(x, lo, hi)
+
+
+def _fista(cov: np.ndarray, lin: np.ndarray, lo, hi, w0: np.ndarray, check: int = 50) -> np.ndarray:
+    """
+    min ½wᵀΣw - linᵀw (행마다 lin 다름) 를 FISTA로 일괄 풀이.
+    - lin: (K, 자산), w0: (K, 자산) 시작점. 보폭 1/L, L = Σ 최대 고유값
+    - 행별 적응 재시작(모멘텀이 목적함수를 거스르면 가속 초기화)
+    - check회마다 활성 집합으로 정확해를 시도, 모든 행이 KKT를 만족하면 종료
+    """
+    L = max(float(np.linalg.eigvalsh(cov)[-1]), 1e-12)
+    w = project_capped_simplex(w0, lo, hi)
+    y, t = w, np.ones((w.shape[0], 1))
+    exact: list = [None] * w.shape[0]
+    for it in range(1, MAX_ITER + 1):
+        grad = y @ cov - lin
+        w_new = project_capped_simplex(y - grad / L, lo, hi)
+        step = w_new - w
+        restart = ((grad * (w_new - y)).sum(axis=1, keepdims=True) > 0)
+        t_new = np.where(restart, 1.0, (1 + np.sqrt(1 + 4 * t * t)) / 2)
+        y = w_new + np.where(restart, 0.0, (t - 1) / t_new) * step
+        w, t = w_new, t_new
+        if np.abs(step).max() < TOL:
+            break
+        if it % check == 0:
+            exact = [e if e is not None else _polish(cov, lin[i], w[i], lo, hi) for i, e in enumerate(exact)]
+            if all(e is not None for e in exact):
+                return np.vstack(exact)
+    return np.vstack([e if e is not None else w[i] for i, e in enumerate(exact)])
+
+
+# ---------- 포트폴리오 ----------
+def min_variance(cov, lo=0.0, hi=1.0) -> np.ndarray:
+    n = cov.shape[0]
+    lo, hi = bounds(n, lo, hi)
+    return _fista(cov, np.zeros((1, n)), lo, hi, np.full((1, n), 1.0 / n))[0]
+
+
+@instrument.traced("optimize.frontier")
+def frontier(mu, cov, lo=0.0, hi=1.0, points: int = 40) -> Frontier:
+    """
+    효율적 투자선: max λ·μᵀw - ½wᵀΣw 를 λ 격자 전체로 동시에 풀이.
+    - λ=0은 최소분산, λ 최대치는 최고 수익 꼭짓점 근처까지
+    - 중복 점 제거 후 변동성 오름차순
+    """
+    n = len(mu)
+    lo, hi = bounds(n, lo, hi)
+    spread = max(float(np.ptp(mu)), 1e-9)
+    scale = float(np.trace(cov)) / n / spread
+    lam = np.concatenate([[0.0], scale * np.logspace(-2, 2.5, points - 1)])
+    W = _fista(cov, lam[:, None] * mu[None, :], lo, hi, np.full((points, n), 1.0 / n))
+    ret = W @ mu
+    vol = np.sqrt(np.maximum(np.einsum("ki,ij,kj->k", W, cov, W), 0.0))
+    order = np.argsort(vol)
+    W, ret, vol = W[order], ret[order], vol[order]
+    keep = np.concatenate([[True], (np.abs(np.diff(vol)) > 1e-6) | (np.abs(np.diff(ret)) > 1e-6)])
+    # 같은 변동성에서 수익률이 더 낮은 점(비효율 구간) 제거
+    keep &= ret >= np.maximum.accumulate(ret) - 1e-9
+    return Frontier(W[keep], ret[keep], vol[keep])
+
+
+def max_sharpe(front: Frontier, rf: float = 0.0) -> int:
+    """투자선 위 샤프 비율 최대 점 번호(투자선 해상도 안에서 근사)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sharpe = np.where(front.vol > 0, (front.ret - rf) / front.vol, -np.inf)
+    return int(np.argmax(sharpe))
+
+
+@instrument.traced("optimize.risk_parity")
+def risk_parity(cov, lo=0.0, hi=1.0, budget=None, iters: int = 50) -> np.ndarray:
+    """
+    위험 기여도 균등(또는 budget 비율) 포트폴리오.
+    - min ½yᵀΣy - Σ b·log y 를 뉴턴법으로 풀고 w = y/Σy (Spinu 2013)
+    - 상·하한이 걸리면 그 해를 제약 집합에 사영(근사)
+    """
+    n = cov.shape[0]
+    lo, hi = bounds(n, lo, hi)
+    b = np.full(n, 1.0 / n) if budget is None else np.asarray(budget, dtype="float64") / np.sum(budget)
+    y = b / np.sqrt(np.maximum(np.diag(cov), 1e-12))
+    for _ in range(iters):
+        g = cov @ y - b / y
+        H = cov + np.diag(b / y**2)
+        step = np.linalg.solve(H, g)
+        s = 1.0
+        while np.any(y - s * step <= 0):
+            s /= 2
+        y = y - s * step
+        if np.abs(g).max() < 1e-12:
+            break
+    w = y / y.sum()
+    return project_capped_simplex(w, lo, hi)
+
+
+def risk_contrib(w, cov) -> np.ndarray:
+    """자산별 위험 기여 비율(합 1)"""
+    w = np.asarray(w, dtype="float64")
+    rc = w * (cov @ w)
+    total = rc.sum()
+    return rc / total if total > 0 else rc
@@ -0,0 +1,64 @@
+# core/parallel.py
+"""
+프로세스 풀 공용 유틸.
+- 풀은 프로세스 내 1개를 재사용(크기는 워커 수로 고정, 작업 수와 무관)
+- 풀을 못 쓰는 환경(권한, 임베디드 실행 등)이면 현재 프로세스에서 순차 실행
+- 워커가 죽어 풀이 깨지면 풀을 버리고(다음 호출에서 새로 만듦) 이번 호출은 순차 실행
+- 작업 자체의 예외는 그대로 전달(순차 재실행 안 함)
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from core import instrument
+
+_pool: ProcessPoolExecutor | None = None
+_pool_workers = 0
+_lock = threading.Lock()
+
+
+def cpu_workers(workers: int | None = None) -> int:
+    return max(1, workers or os.cpu_count() or 1)
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool, _pool_workers = ProcessPoolExecutor(max_workers=workers), workers
+        return _pool
+
+
+def _drop_pool(pool: ProcessPoolExecutor):
+    """깨진 풀 폐기(다른 스레드가 이미 바꿨으면 그대로)"""
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def pmap(fn, tasks: list, workers: int | None = None) -> list:
+    """fn(task) 결과 목록(입력 순서). fn은 모듈 최상위 함수여야 함"""
+    workers = cpu_workers(workers)
+    if workers <= 1 or len(tasks) <= 1:
+        return [fn(t) for t in tasks]
+    pool = None
+    try:
+        pool = _get_pool(workers)
+        futures = [pool.submit(fn, t) for t in tasks]
+    except (OSError, NotImplementedError, BrokenProcessPool) as e:
+        # 프로세스를 띄울 수 없는 환경이거나 이미 깨진 풀
+        instrument.swallow("pmap", e)
+        if pool is not None:
+            _drop_pool(pool)
+        return [fn(t) for t in tasks]
+    try:
+        return [f.result() for f in futures]
+    except BrokenProcessPool as e:
+        instrument.swallow("pmap", e)
+        _drop_pool(pool)
+        return [fn(t) for t in tasks]
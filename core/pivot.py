@@ -0,0 +1,155 @@
+# core/pivot.py
+"""
+다단계 소계 피벗 엔진.
+- 원본은 가장 세밀한 키(행 인덱스 전체 + 열 피벗)로 groupby 한 번만 수행
+- 상위 단계 소계/총계는 그 집계 결과(작은 표)를 다시 묶어서 계산
+  · sum/count/max/min은 같은 함수로, mean은 (합, 개수)를 굴려 마지막에 나눔
+- 소계 행 위치는 키 코드 lexsort로 정함(그룹별 concat 없음)
+- 그룹 첫 행/반복 값 숨김은 shift 비교로 계산
+"""
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from core import instrument
+
+AGGS = ["sum", "mean", "max", "min", "count"]
+SUB = "소계"
+TOTAL = "총계"
+
+# 집계 → 세밀 단계에서 구할 통계, 상위 단계로 굴릴 때 쓸 함수
+_STATS = {"sum": ["sum"], "mean": ["sum", "count"], "count": ["count"], "max": ["max"], "min": ["min"]}
+_ROLL = {"sum": "sum", "count": "sum", "max": "max", "min": "min"}
+
+
+class PivotResult(NamedTuple):
+    """frame: 상세 + 소계 행(_level, _sub 포함), total: 총계 1행 dict, value_cols: 값 컬럼"""
+    frame: pd.DataFrame
+    total: dict
+    value_cols: list
+
+
+def _finish(stats: pd.DataFrame, agg: str) -> pd.Series:
+    if agg == "mean":
+        return stats["sum"] / stats["count"]
+    return stats[_STATS[agg][0]]
+
+
+def _wide(s: pd.Series, keys: list[str], column: str | None) -> pd.DataFrame:
+    """열 피벗 펼치기 + 컬럼명 문자열화. 빈 칸은 0(pivot_table fill_value=0과 동일)"""
+    if column is None:
+        return s.to_frame(s.name or "값")
+    w = s.unstack(column, fill_value=0).sort_index(axis=1)
+    w.columns = [str(c) for c in w.columns]
+    return w
+
+
+def finest_stats(raw: pd.DataFrame, keys: list[str], value: str, agg: str) -> pd.DataFrame:
+    """가장 세밀한 키로 groupby 1회. 반환: keys 인덱스 × _STATS[agg] 컬럼"""
+    return raw.groupby(keys, sort=False, observed=True, dropna=False)[value].agg(_STATS[agg])
+
+
+@instrument.traced("pivot.subtotal_pivot")
+def subtotal_pivot(raw: pd.DataFrame, index: list[str], value: str, agg: str = "sum",
+                   column: str | None = None) -> PivotResult:
+    """
+    피벗 + 모든 단계 소계 + 총계.
+    - index: 행 인덱스(순서대로 상위 → 하위). 단계 k 소계는 index[:k]가 같은 행 묶음
+    - 소계 행: index[k-1] 칸에 '값 소계', 그 아래 칸은 빈칸
+    - 반환 frame은 그룹 상세 뒤에 해당 소계가 오도록 정렬
+    """
+    keys = list(index) + ([column] if column else [])
+    if not keys:
+        raise ValueError("행 인덱스나 열 피벗이 필요합니다.")
+    return from_stats(finest_stats(raw, keys, value, agg), index, value, agg, column)
+
+
+def from_stats(stats: pd.DataFrame, index: list[str], value: str, agg: str = "sum",
+               column: str | None = None) -> PivotResult:
+    """
+    세밀 단계 통계(finest_stats 또는 Arrow group_by 결과)에서 소계/총계 피벗 구성.
+    - stats: (index + column) 인덱스, _STATS[agg] 컬럼
+    """
+    index = list(index)
+    # 단계별 통계: L(상세) → 0(총계). 직전 단계에서 굴려 계산
+    levels = {len(index): stats}
+    cur = stats
+    for k in range(len(index) - 1, -1, -1):
+        by = index[:k] + ([column] if column else [])
+        roll = {c: _ROLL[c] for c in cur.columns}
+        cur = cur.groupby(level=by, sort=False, observed=True, dropna=False).agg(roll) if by else cur.agg(roll).to_frame().T
+        levels[k] = cur
+
+    # 총계
+    grand = _finish(levels[0], agg).rename(value)
+    total_w = grand.sort_index().to_frame().T if column else grand.to_frame(value)
+    total_w.columns = [str(c) for c in total_w.columns]
+    value_cols = [str(c) for c in total_w.columns]
+    total = {k: "" for k in index}
+    if index:
+        total[index[0]] = TOTAL
+    total.update({c: total_w.iloc[0][c].item() if len(total_w) else 0 for c in value_cols})
+
+    if not index:
+        frame = total_w.reset_index(drop=True).assign(_level=0, _sub=False)
+        return PivotResult(frame, total, value_cols)
+
+    # 키별 정렬 코드(값 오름차순). 소계 행의 하위 칸은 최대 코드 + 1 → 상세 뒤로
+    uniq = {k: pd.Index(stats.index.get_level_values(k).dropna().unique()).sort_values() for k in index}
+    parts, codes = [], []
+    for k in range(len(index), 0, -1):
+        w = _wide(_finish(levels[k], agg).rename(value), index[:k], column).reindex(columns=value_cols, fill_value=0)
+        w = w.reset_index()
+        code = np.empty((len(w), len(index)), dtype=np.int64)
+        for j, key in enumerate(index):
+            if j < k:
+                code[:, j] = uniq[key].get_indexer(w[key])
+            else:
+                code[:, j] = len(uniq[key])
+        if k < len(index):
+            w[index[k - 1]] = w[index[k - 1]].astype(str) + f" {SUB}"
+            for key in index[k:]:
+                w[key] = ""
+        w["_level"] = k
+        w["_sub"] = k < len(index)
+        parts.append(w[list(index) + value_cols + ["_level", "_sub"]])
+        codes.append(code)
+    frame = pd.concat(parts, ignore_index=True)
+    code = np.vstack(codes)
+    order = np.lexsort(code.T[::-1])
+    frame = frame.iloc[order].reset_index(drop=True)
+    return PivotResult(frame, total, value_cols)
+
+
+def _is_sub(s: pd.Series) -> pd.Series:
+    return s.astype(str).str.endswith(SUB)
+
+
+def mark_group_first(df: pd.DataFrame, group_key: str) -> pd.DataFrame:
+    """
+    _groupFirst: group_key 값이 바뀌는 첫 행(소계 행 제외, 소계 다음 행은 새 덩어리).
+    """
+    cur = df[group_key].astype(str).fillna("")
+    is_sub = _is_sub(cur)
+    first = ~is_sub & (cur != "") & ((cur != cur.shift()) | is_sub.shift(fill_value=True))
+    return df.assign(_groupFirst=first.to_numpy())
+
+
+def collapse_repeats(df: pd.DataFrame, cols: list[str]) -> pd.DataFrame:
+    """
+    병합 유사 보기: 바로 윗행과 같은 값이면 빈칸.
+    - 소계 칸과 소계 바로 다음 행은 항상 표시
+    - 왼쪽 칸이 바뀌었으면 오른쪽 칸도 표시(상위 그룹 경계)
+    """
+    out = df.copy()
+    same = pd.Series(True, index=df.index)
+    for c in cols:
+        if c not in df.columns:
+            continue
+        cur = df[c]
+        is_sub = _is_sub(cur)
+        same = same & (cur == cur.shift())
+        blank = same & ~is_sub & ~is_sub.shift(fill_value=True)
+        out[c] = cur.astype(object).where(~blank, "")
+    return out
@@ -0,0 +1,284 @@
+# core/price_store.py
+"""
+티커별 로컬 일봉 저장소.
+- 티커당 Parquet 1개(OHLCV) + JSON 메타(요청 시작일, 마지막 확인 시각, 소스)
+- 갱신은 마지막 저장 봉 이후만 조회, 더 과거가 필요할 때만 앞쪽 보강
+- 모든 기간 프리셋은 저장된 한 시계열을 잘라서 반환
+"""
+import datetime as dt
+import json
+import re
+import threading
+import time
+from typing import NamedTuple
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from core import DATA_DIR, instrument
+from core.provider import get_provider
+from core.sources import FIELDS, pykrx_ohlcv, yf_ohlcv
+
+PRICE_DIR = DATA_DIR / "prices"
+SCHEMA = 2                 # 저장 형식 바뀌면 올려서 전체 재수집(2: yfinance 배당 미조정 종가)
+MAX_START = dt.date(1990, 1, 1)
+
+# 기간 프리셋 → 개월 수. 5d는 주말 포함 여유 10일
+PERIOD_MONTHS = {"5d": 0, "1mo": 1, "3mo": 3, "6mo": 6, "1y": 12, "2y": 24, "5y": 60}
+
+
+def period_start(period: str, today: dt.date | None = None) -> dt.date:
+    """기간 프리셋 → 조회 시작일"""
+    today = today or dt.date.today()
+    if period == "max":
+        return MAX_START
+    if period == "5d":
+        return today - dt.timedelta(days=10)
+    return today - relativedelta(months=PERIOD_MONTHS.get(period, 3))
+
+
+def _safe(ticker: str) -> str:
+    """파일명용 티커. '^KS11', 'KRW=X' 같은 기호 치환"""
+    return re.sub(r"[^0-9A-Za-z._-]", "_", ticker)
+
+
+FETCHERS = {"pykrx": pykrx_ohlcv, "yfinance": yf_ohlcv}
+
+
+class Fetched(NamedTuple):
+    """frame: 일봉, source: 데이터를 준 소스(없으면 None), answered: 한 소스라도 응답했는지(빈 결과 포함)"""
+    frame: pd.DataFrame
+    source: str | None
+    answered: bool
+
+
+def fetch_ohlcv(ticker: str, start: dt.date, end: dt.date, prefer: str | None = None,
+                only: str | None = None) -> Fetched:
+    """
+    소스 순서대로 일봉 조회(공용 Provider 경유: 서킷/타임아웃/선호 소스).
+    - 순서: prefer → 티커별 기억된 소스 → KRX 형태면 pykrx, 아니면 yfinance만
+    - only가 있으면 그 소스만 시도
+    - 반환: Fetched. 모두 실패/빈 결과면 source=None, 빈 결과로라도 응답한 소스가 있으면 answered=True
+    """
+    prov = get_provider()
+    answered = False
+    for name in prov.order(ticker, prefer=prefer):
+        if only and name != only:
+            continue
+        try:
+            df = prov.call(name, FETCHERS[name], ticker, start, end)
+        except Exception as e:
+            # 소스 실패는 조용히 다음 소스로(상태는 Provider에 기록됨)
+            instrument.swallow(f"fetch_ohlcv.{name}", e)
+            continue
+        answered = True
+        if not df.empty:
+            prov.remember(ticker, name)
+            instrument.answered("fetch_ohlcv", name)
+            return Fetched(df, name, True)
+    return Fetched(pd.DataFrame(columns=FIELDS), None, answered)
+
+
+class PriceStore:
+    """
+    증분 갱신 일봉 저장소.
+    - ttl: 마지막 확인 후 이 시간(초) 안에는 네트워크 없이 저장본 반환
+    - 메모리에도 티커별 프레임을 들고 있어 디스크 재읽기 최소화
+    """
+
+    def __init__(self, root=PRICE_DIR, ttl: float = 180):
+        self.root = root
+        self.ttl = ttl
+        self._frames: dict[str, pd.DataFrame] = {}
+        self._meta: dict[str, dict] = {}
+        self._locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    # ---------- 파일 입출력 ----------
+    def _lock(self, ticker: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(ticker, threading.Lock())
+
+    def _paths(self, ticker: str):
+        base = self.root / _safe(ticker)
+        return base.with_suffix(".parquet"), base.with_suffix(".json")
+
+    def meta(self, ticker: str) -> dict:
+        m = self._meta.get(ticker)
+        if m is None:
+            _, mpath = self._paths(ticker)
+            try:
+                m = json.loads(mpath.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                m = {}
+            if m.get("schema") != SCHEMA:
+                m = {}
+            self._meta[ticker] = m
+        return m
+
+    def read(self, ticker: str) -> pd.DataFrame:
+        """저장된 전체 일봉. 없으면 빈 프레임"""
+        df = self._frames.get(ticker)
+        if df is None:
+            ppath, _ = self._paths(ticker)
+            if ppath.exists() and self.meta(ticker):
+                df = pd.read_parquet(ppath)
+            else:
+                df = pd.DataFrame(columns=FIELDS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+            self._frames[ticker] = df
+        return df
+
+    def write(self, ticker: str, df: pd.DataFrame, meta: dict):
+        """프레임/메타 원자적 저장(임시 파일 → rename)"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        ppath, mpath = self._paths(ticker)
+        tmp = ppath.with_suffix(".tmp")
+        df.to_parquet(tmp)
+        tmp.replace(ppath)
+        meta = {**meta, "schema": SCHEMA}
+        mpath.write_text(json.dumps(meta), encoding="utf-8")
+        self._frames[ticker] = df
+        self._meta[ticker] = meta
+
+    # ---------- 신선도 ----------
+    def is_fresh(self, ticker: str, start: dt.date) -> bool:
+        """start 이후 구간이 저장돼 있고 ttl 안에 확인했는지"""
+        m = self.meta(ticker)
+        return (bool(m) and m.get("start", "9999") <= start.isoformat()
+                and time.time() - m.get("checked", 0) < self.ttl)
+
+    def expire(self, tickers=None):
+        """티커(기본 전체)를 다음 조회 때 재확인하도록 표시(저장본은 유지)"""
+        for t in (self._meta if tickers is None else tickers):
+            m = self.meta(t)
+            if m:
+                m["checked"] = 0
+
+    # ---------- 갱신 ----------
+    def plan(self, ticker: str, start: dt.date, today: dt.date | None = None):
+        """
+        필요한 조회 구간 목록 [(시작, 끝)].
+        - 저장본 없음: start~오늘
+        - 앞쪽 부족: start~저장 시작 전날
+        - 뒤쪽: 마지막 봉(장중 미완성일 수 있어 포함)~오늘. ttl 안에 확인했으면 생략
+        """
+        today = today or dt.date.today()
+        m, df = self.meta(ticker), self.read(ticker)
+        if not m or df.empty:
+            return [(start, today)]
+        spans = []
+        have = dt.date.fromisoformat(m["start"])
+        if start < have:
+            spans.append((start, have - dt.timedelta(days=1)))
+        if time.time() - m.get("checked", 0) >= self.ttl:
+            spans.append((df.index[-1].date(), today))
+        return spans
+
+    def merge(self, ticker: str, start: dt.date, parts: list[pd.DataFrame], source: str | None,
+              replace: bool = False) -> pd.DataFrame:
+        """조회 결과를 저장본에 합치고 메타 갱신. 같은 날짜는 새 값 우선"""
+        base = None if replace else self.read(ticker)
+        frames = [f for f in [base, *parts] if f is not None and not f.empty]
+        df = pd.concat(frames) if frames else self.read(ticker)
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+        m = self.meta(ticker)
+        have = m.get("start") if m and not replace else None
+        self.write(ticker, df, {
+            "start": min(start.isoformat(), have) if have else start.isoformat(),
+            "checked": time.time(),
+            "source": source or m.get("source"),
+        })
+        return df
+
+    def update(self, ticker: str, start: dt.date, only: str | None = None) -> pd.DataFrame:
+        """
+        start 이후가 최신이 되도록 증분 갱신 후 전체 프레임 반환.
+        - 저장 소스와 다른 소스로만 받아지면 가격 기준이 달라지므로 전 구간 재수집
+        - 조회 실패 시 기존 저장본 유지(앞쪽 보강 실패면 요청 시작일도 유지)
+        - 앞쪽 구간에 소스가 빈 결과로 응답하면 그 구간도 확인한 것으로 기록(같은 빈 구간 재요청 방지)
+        - only: 특정 소스만 시도(일괄 로더의 단계별 조회용)
+        - 저장 소스의 서킷이 열려 있으면 다른 소스로 갈아타지 않고 저장본 제공
+        """
+        with self._lock(ticker):
+            if self.is_fresh(ticker, start):
+                instrument.cache("price_store.update", hits=1)
+                return self.read(ticker)
+            instrument.cache("price_store.update", misses=1)
+            m = self.meta(ticker)
+            prefer = m.get("source")
+            if prefer and not self.read(ticker).empty and not get_provider().health[prefer].available():
+                return self.read(ticker)
+            have = dt.date.fromisoformat(m["start"]) if m else None
+            parts, source, covered = [], None, start
+            for a, b in self.plan(ticker, start):
+                df, src, answered = fetch_ohlcv(ticker, a, b, prefer=prefer, only=only)
+                if src is None:
+                    if not answered and have is not None and b < have and not self.read(ticker).empty:
+                        covered = have
+                    continue
+                if prefer and src != prefer:
+                    full = min(start, have)
+                    df, src, _ = fetch_ohlcv(ticker, full, dt.date.today(), prefer=src, only=only)
+                    if src is not None:
+                        return self.merge(ticker, full, [df], src, replace=True)
+                    continue
+                parts.append(df)
+                source = src
+            if source is None and only is not None:
+                # 다른 소스가 남았으면 확인 시각을 남기지 않음
+                return self.read(ticker)
+            return self.merge(ticker, covered, parts, source)
+
+    def window(self, ticker: str, start: dt.date, source: str):
+        """
+        source 한 번 조회로 갱신할 때의 (조회 시작일, 전체 교체 여부).
+        - 저장본이 없거나 소스가 다르면 전 구간 교체
+        - 갱신 불필요하면 (None, False)
+        """
+        m, df = self.meta(ticker), self.read(ticker)
+        if not m or df.empty:
+            return start, True
+        have = dt.date.fromisoformat(m["start"])
+        if m.get("source") and m["source"] != source:
+            return min(start, have), True
+        spans = self.plan(ticker, start)
+        return (spans[0][0], False) if spans else (None, False)
+
+    def absorb(self, ticker: str, start: dt.date, df: pd.DataFrame | None, source: str,
+               replace: bool = False) -> pd.DataFrame:
+        """
+        외부에서 받아 온 프레임(window 시작일~오늘)을 저장본에 반영.
+        - df가 비면 저장본 유지, 확인 시각만 갱신
+        """
+        with self._lock(ticker):
+            if df is None or df.empty:
+                m = self.meta(ticker)
+                have = m.get("start") if m and not self.read(ticker).empty else None
+                covered = dt.date.fromisoformat(have) if have and have > start.isoformat() else start
+                return self.merge(ticker, covered, [], None)
+            return self.merge(ticker, start, [df], source, replace=replace)
+
+    def close(self, ticker: str, period: str) -> pd.Series:
+        """
+        기간 프리셋 종가 Series.
+        - 저장본 갱신 후 period 시작일 이후만 슬라이스
+        - 반환: float64 Series, 이름은 ticker
+        """
+        start = period_start(period)
+        df = self.update(ticker, start)
+        s = df.loc[df.index >= pd.Timestamp(start), "Close"].dropna().astype("float64")
+        s.name = ticker
+        return s
+
+
+_store: PriceStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> PriceStore:
+    """프로세스 공용 저장소"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceStore()
+        return _store
@@ -0,0 +1,242 @@
+# core/provider.py
+"""
+데이터 소스 공용 호출 계층.
+- 소스별 상태(호출/실패 수, 지연시간 EWMA, 최근 오류) 기록
+- 연속 실패 시 서킷 오픈 → 쿨다운 동안 해당 소스 건너뜀(실패 반복 시 쿨다운 2배)
+- 호출별 타임아웃, 티커별로 성공한 소스를 기억해 다음부터 그 소스 먼저
+- 소스마다 별도 스레드 풀: 멈춘 소스가 다른 소스 호출을 막지 않음
+- 지연은 작업이 실제로 시작된 때부터. 대기열에서 시간이 다 된 호출은 취소만 하고 실패로 세지 않음
+- 쿨다운이 끝나면 시험 호출 1건만 통과(반열림), 결과가 나올 때까지 나머지는 건너뜀
+- 상태/선호 소스는 디스크에 저장해 재시작 후에도 유지
+"""
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import pandas as pd
+
+from core import DATA_DIR, instrument
+
+SOURCES = ["pykrx", "yfinance"]
+TIMEOUTS = {"pykrx": 10.0, "yfinance": 20.0}  # 초. 호출 시 timeout 인자로 덮어쓰기 가능
+FAIL_THRESHOLD = 3      # 연속 실패 몇 번이면 서킷 오픈
+COOLDOWN = 60.0         # 첫 오픈 쿨다운(초)
+MAX_COOLDOWN = 600.0
+WORKERS = 16            # 소스별 스레드 풀 크기
+SAVE_EVERY = 30.0       # 상태 저장 최소 간격(초)
+
+_KRX = re.compile(r"^[0-9][0-9A-Z]{5}(\.(KS|KQ))?$")
+
+
+def looks_krx(ticker: str) -> bool:
+    """'069500', '069500.KS', '0080G0.KQ' 형태면 KRX 종목으로 간주"""
+    return bool(_KRX.match(ticker.upper()))
+
+
+class SourceUnavailable(RuntimeError):
+    """서킷이 열려 호출을 건너뜀"""
+
+
+class SourceHealth:
+    """소스 하나의 누적 상태와 서킷"""
+
+    def __init__(self, name: str, **state):
+        self.name = name
+        self.calls = state.get("calls", 0)
+        self.failures = state.get("failures", 0)
+        self.consecutive = state.get("consecutive", 0)
+        self.latency = state.get("latency", 0.0)      # 성공 호출 지연 EWMA(초)
+        self.last_error = state.get("last_error", "")
+        self.open_until = state.get("open_until", 0.0)
+        self.cooldown = state.get("cooldown", COOLDOWN)
+        self.probing = False                            # 반열림 시험 호출 진행 중(저장 안 함)
+
+    def available(self, now: float | None = None) -> bool:
+        return (now or time.time()) >= self.open_until
+
+    def admit(self, now: float) -> bool:
+        """
+        호출 허용 여부(잠금 안에서). 쿨다운이 끝난 뒤 첫 호출은 시험 호출로 표시하고 통과,
+        그 결과가 나올 때까지 다른 호출은 거부
+        """
+        if now < self.open_until:
+            return False
+        if self.open_until:
+            if self.probing:
+                return False
+            self.probing = True
+        return True
+
+    def success(self, elapsed: float):
+        self.probing = False
+        self.calls += 1
+        self.consecutive = 0
+        self.open_until = 0.0
+        self.cooldown = COOLDOWN
+        self.latency = elapsed if self.latency == 0 else 0.8 * self.latency + 0.2 * elapsed
+
+    def failure(self, err: str):
+        self.probing = False
+        self.calls += 1
+        self.failures += 1
+        self.consecutive += 1
+        self.last_error = err[:200]
+        now = time.time()
+        if self.consecutive >= FAIL_THRESHOLD and now >= self.open_until:
+            # 쿨다운 후 시험 호출도 실패하면 쿨다운 늘려 다시 오픈
+            if self.open_until:
+                self.cooldown = min(self.cooldown * 2, MAX_COOLDOWN)
+            self.open_until = now + self.cooldown
+
+    def to_dict(self) -> dict:
+        return {k: getattr(self, k) for k in
+                ("calls", "failures", "consecutive", "latency", "last_error", "open_until", "cooldown")}
+
+
+class Provider:
+    """
+    소스 호출 관리자.
+    - call(): 서킷 확인 → 타임아웃 걸고 실행 → 상태 기록
+    - order(): 티커별 시도 순서(기억된 소스 → 티커 형태 기본값), 열린 서킷은 뒤로
+    """
+
+    def __init__(self, path=DATA_DIR / "provider.json"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._pools = {s: ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix=f"provider-{s}")
+                       for s in SOURCES}
+        self._saved = 0.0
+        state = {}
+        try:
+            state = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            pass
+        self.health = {s: SourceHealth(s, **state.get("health", {}).get(s, {})) for s in SOURCES}
+        self.prefer: dict[str, str] = dict(state.get("prefer", {}))
+
+    # ---------- 호출 ----------
+    def call(self, source: str, fn, *args, timeout: float | None = None, **kwargs):
+        """
+        fn(*args, **kwargs)를 source 이름으로 실행.
+        - 서킷이 열려 있거나 시험 호출이 진행 중이면 SourceUnavailable
+        - 시작 후 timeout 초과/예외는 실패로 기록 후 그대로 전달
+        - 계측이 켜져 있으면 '소스.함수' 항목으로 지연/응답 크기 기록(대기열 시간 제외)
+        """
+        h = self.health[source]
+        with self._lock:
+            if not h.admit(time.time()):
+                raise SourceUnavailable(f"{source} 일시 중단({h.last_error})")
+        name = f"{source}.{getattr(fn, '__name__', 'call')}"
+        limit = timeout or TIMEOUTS.get(source, 15.0)
+        started = []
+
+        def run():
+            started.append(time.perf_counter())
+            return fn(*args, **kwargs)
+
+        fut = self._pools[source].submit(run)
+        try:
+            out = fut.result(timeout=limit)
+        except FutureTimeout:
+            if fut.cancel():
+                # 시작도 못 함 = 같은 소스의 앞선 호출이 풀을 차지. 소스 실패로 세지 않음
+                with self._lock:
+                    h.probing = False
+                raise TimeoutError(f"{source} busy")
+            # 시작 후 남은 시간만큼 더 기다림(대기열 시간은 제한에서 제외)
+            try:
+                out = fut.result(timeout=max(limit - (time.perf_counter() - started[0]), 0.0))
+            except FutureTimeout:
+                self._record(source, None, f"timeout {limit}s")
+                instrument.observe(name, time.perf_counter() - started[0], True, source=source)
+                raise TimeoutError(f"{source} timeout")
+            except Exception as e:
+                self._fail(source, name, started[0], e)
+                raise
+        except Exception as e:
+            self._fail(source, name, started[0] if started else time.perf_counter(), e)
+            raise
+        elapsed = time.perf_counter() - started[0]
+        self._record(source, elapsed, None)
+        instrument.observe(name, elapsed, out=out, source=source)
+        return out
+
+    def _fail(self, source: str, name: str, t0: float, e: Exception):
+        self._record(source, None, f"{type(e).__name__}: {e}")
+        instrument.observe(name, time.perf_counter() - t0, True, source=source)
+
+    def _record(self, source: str, elapsed: float | None, err: str | None):
+        with self._lock:
+            h = self.health[source]
+            if err is None:
+                h.success(elapsed)
+            else:
+                h.failure(err)
+            self._maybe_save()
+
+    # ---------- 소스 선택 ----------
+    def order(self, ticker: str, prefer: str | None = None) -> list[str]:
+        """
+        시도 순서.
+        - 기억된 소스(또는 prefer) 먼저
+        - KRX 형태가 아니면 pykrx는 아예 제외
+        - 서킷 열린 소스는 맨 뒤(call에서 즉시 건너뜀)
+        """
+        cands = SOURCES if looks_krx(ticker) else [s for s in SOURCES if s != "pykrx"]
+        first = prefer or self.prefer.get(ticker)
+        now = time.time()
+        return sorted(cands, key=lambda s: (not self.health[s].available(now), s != first))
+
+    def remember(self, ticker: str, source: str):
+        if self.prefer.get(ticker) != source:
+            with self._lock:
+                self.prefer[ticker] = source
+                self._maybe_save(force=True)
+
+    # ---------- 상태 ----------
+    def status(self) -> pd.DataFrame:
+        """진단용 소스 상태표"""
+        now = time.time()
+        rows = []
+        for s, h in self.health.items():
+            rows.append({
+                "소스": s,
+                "상태": "정상" if h.available(now) else f"중단({int(h.open_until - now)}초)",
+                "호출수": h.calls,
+                "실패수": h.failures,
+                "연속실패": h.consecutive,
+                "평균지연(ms)": round(h.latency * 1000, 1),
+                "최근오류": h.last_error,
+            })
+        return pd.DataFrame(rows)
+
+    def _maybe_save(self, force: bool = False):
+        """잠금 안에서 호출. 너무 잦은 쓰기는 생략"""
+        now = time.time()
+        if not force and now - self._saved < SAVE_EVERY:
+            return
+        self._saved = now
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(json.dumps({
+                "health": {s: h.to_dict() for s, h in self.health.items()},
+                "prefer": self.prefer,
+            }, ensure_ascii=False), encoding="utf-8")
+        except OSError:
+            pass
+
+
+_provider: Provider | None = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> Provider:
+    """프로세스 공용 Provider"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = Provider()
+        return _provider
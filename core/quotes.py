@@ -0,0 +1,162 @@
+# core/quotes.py
+"""
+현재가 조회 서비스.
+- 요청 티커를 중복 제거 후, 캐시에 없거나 오래된 것만 yf.download 한 번으로 일괄 조회
+- 짧은 TTL 캐시(기본 30초) → 데이터 편집기 수정마다 재조회하지 않음
+- 같은 티커를 다른 세션이 조회 중이면 그 결과를 기다림(다른 티커 조회는 막지 않음)
+- 빈 칸/"nan"/"None" 티커는 조회하지 않음
+- 조회 실패 시 저장소 마지막 종가로 대체
+"""
+import datetime as dt
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import instrument
+from core.price_store import get_store
+from core.provider import get_provider
+from core.sources import yf_ohlcv_many
+
+TTL = 30.0
+LOOKBACK_DAYS = 7  # 휴장 연휴에도 마지막 거래일이 들어오도록
+WAIT = 60.0        # 다른 세션 조회를 기다리는 최대 시간(초)
+BLANK = {"", "nan", "none", "<na>", "nat"}
+
+
+def clean_ticker(value) -> str:
+    """티커 값 → 앞뒤 공백 제거 문자열. 빈 칸/NaN/None(편집기 빈 행)은 빈 문자열"""
+    s = "" if value is None else str(value).strip()
+    return "" if s.lower() in BLANK else s
+
+
+class QuoteService:
+    def __init__(self, ttl: float = TTL):
+        self.ttl = ttl
+        self._cache: dict[str, tuple[float, float]] = {}  # 티커 → (가격, 조회 시각)
+        self._lock = threading.Lock()
+        self._inflight: dict[str, threading.Event] = {}   # 조회 중인 티커 → 완료 알림
+
+    def _stale(self, tickers: list[str], ttl: float) -> list[str]:
+        now = time.time()
+        with self._lock:
+            return [t for t in tickers if t not in self._cache or now - self._cache[t][1] > ttl]
+
+    def _claim(self, tickers: list[str], ttl: float):
+        """조회 권한 획득. (직접 조회할 티커, 다른 세션 조회 완료를 기다릴 Event)"""
+        now = time.time()
+        owned, waiting = [], []
+        with self._lock:
+            for t in tickers:
+                if t in self._cache and now - self._cache[t][1] <= ttl:
+                    continue  # 그사이 다른 세션이 채움
+                ev = self._inflight.get(t)
+                if ev is None:
+                    self._inflight[t] = threading.Event()
+                    owned.append(t)
+                else:
+                    waiting.append(ev)
+        return owned, waiting
+
+    def _release(self, tickers: list[str]):
+        with self._lock:
+            events = [self._inflight.pop(t, None) for t in tickers]
+        for ev in events:
+            if ev is not None:
+                ev.set()
+
+    def _fetch(self, tickers: list[str]) -> dict[str, float]:
+        """한 번의 일괄 요청. 일봉 마지막 행(장중이면 진행 중인 봉)의 종가"""
+        today = dt.date.today()
+        try:
+            frames = get_provider().call("yfinance", yf_ohlcv_many, tickers,
+                                         today - dt.timedelta(days=LOOKBACK_DAYS), today, timeout=30)
+        except Exception as e:
+            instrument.swallow("quotes", e)
+            frames = {}
+        out = {t: float(df["Close"].iloc[-1]) for t, df in frames.items() if not df.empty}
+        store = get_store()
+        for t in tickers:
+            if t not in out:
+                s = store.read(t)["Close"].dropna()
+                if not s.empty:
+                    out[t] = float(s.iloc[-1])
+        return out
+
+    def quotes(self, tickers, ttl: float | None = None) -> pd.Series:
+        """
+        티커 → 현재가 Series(입력 순서, 중복 제거). 가격을 못 구한 티커는 NaN.
+        - ttl: 이번 호출에 쓸 캐시 유효 시간(기본 self.ttl)
+        """
+        ttl = self.ttl if ttl is None else ttl
+        uniq = [t for t in dict.fromkeys(map(clean_ticker, tickers)) if t]
+        stale = self._stale(uniq, ttl)
+        instrument.cache("quotes", hits=len(uniq) - len(stale), misses=len(stale))
+        if stale:
+            # 다른 세션이 조회 중인 티커는 그 결과를 재사용, 나머지만 직접 조회
+            owned, waiting = self._claim(stale, ttl)
+            try:
+                if owned:
+                    got = self._fetch(owned)
+                    now = time.time()
+                    with self._lock:
+                        for t in owned:
+                            self._cache[t] = (got.get(t, np.nan), now)
+            finally:
+                self._release(owned)
+            for ev in waiting:
+                ev.wait(WAIT)
+        with self._lock:
+            return pd.Series({t: self._cache.get(t, (np.nan, 0.0))[0] for t in uniq}, dtype="float64")
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+def value_holdings(df: pd.DataFrame, prices: pd.Series | None, fx: float | pd.Series = 1.0,
+                   currency: pd.Series | str | None = None) -> pd.DataFrame:
+    """
+    보유표 일괄 평가(행 루프 없음).
+    - df: 티커/수량/평단가 컬럼. 없는 컬럼·빈칸은 0(티커는 "")
+    - prices: 티커 → 현재가(거래 통화). 없거나 NaN이면 평단가로 대체
+    - fx: 기준 통화 환산 배율(스칼라 또는 행별 Series)
+    - currency: 행별 거래 통화(표시용)
+    """
+    tk = pd.Series([clean_ticker(t) for t in df["티커"]] if "티커" in df.columns else "",
+                   index=df.index, dtype=object)
+    q = _number(df, "수량")
+    avg = _number(df, "평단가")
+    px = tk.map(prices) if prices is not None else pd.Series(np.nan, index=df.index)
+    px = px.astype("float64").fillna(avg.clip(lower=0.0))
+    rate = pd.Series(fx, index=df.index, dtype="float64") if np.isscalar(fx) else fx.astype("float64")
+    return pd.DataFrame({
+        "티커": tk,
+        "통화": currency if currency is not None else "",
+        "수량": q,
+        "가격": px,
+        "평단가": avg,
+        "환율": rate,
+        "평가액": q * px * rate,
+        "원가": q * avg * rate,
+    }).reset_index(drop=True)
+
+
+def _number(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df[col], errors="coerce").fillna(0.0).astype("float64")
+
+
+_service: QuoteService | None = None
+_service_lock = threading.Lock()
+
+
+def get_quotes() -> QuoteService:
+    """프로세스 공용 시세 서비스"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = QuoteService()
+        return _service
@@ -0,0 +1,217 @@
+# core/refresher.py
+"""
+프로세스 공용 백그라운드 시세 갱신.
+- 세션은 자기 워치리스트를 구독(subscribe)만 하고, 실제 조회는 워커 스레드 하나가 담당
+- 워커: 모든 세션 구독 티커의 합집합을 주기마다 일괄 갱신(load_many). 장중인 시장 티커만
+- 세션 화면은 메모리 저장본(저장소 프레임)을 잘라 읽음 → 재실행마다 네트워크 없음
+- 실패한 티커는 연속 실패 횟수만큼 간격을 늘려 재시도(주기 × 2^(n-1), 최대 BACKOFF_MAX)
+- 티커별 마지막 갱신 시각/경과를 status()로 제공
+"""
+import datetime as dt
+import threading
+import time
+import uuid
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from core import instrument
+from core.batch import BatchResult, load_many
+from core.price_store import PERIOD_MONTHS, get_store, period_start
+from core.provider import looks_krx
+from core.total_return import get_total_return
+
+INTERVAL = 30.0          # 장중 갱신 주기(초)
+SESSION_TTL = 600.0      # 이 시간 동안 구독 갱신이 없으면 세션 제외
+BACKOFF_MAX = 1800.0     # 실패 티커 재시도 간격 상한(초)
+# 시장별 (시간대, 개장, 마감). 공휴일은 고려하지 않음(휴장일엔 조회해도 새 봉 없음)
+HOURS = {
+    "KRX": (ZoneInfo("Asia/Seoul"), dt.time(9, 0), dt.time(15, 30)),
+    "US": (ZoneInfo("America/New_York"), dt.time(9, 30), dt.time(16, 0)),
+}
+# 기간 프리셋 길이 순서(합집합 갱신 시 가장 긴 기간 하나로)
+_ORDER = ["5d", *[p for p in PERIOD_MONTHS if p != "5d"], "max"]
+
+
+def market_of(ticker: str) -> str:
+    return "KRX" if looks_krx(ticker) else "US"
+
+
+def market_open(market: str, now: dt.datetime | None = None) -> bool:
+    """평일 정규장 시간 여부(마감 후 10분까지 포함해 종가 확정분 반영)"""
+    tz, start, end = HOURS[market]
+    t = (now or dt.datetime.now(dt.timezone.utc)).astimezone(tz)
+    close = (dt.datetime.combine(t.date(), end) + dt.timedelta(minutes=10)).time()
+    return t.weekday() < 5 and start <= t.time() <= close
+
+
+class Refresher:
+    def __init__(self, interval: float = INTERVAL, session_ttl: float = SESSION_TTL):
+        self.interval = interval
+        self.session_ttl = session_ttl
+        self._lock = threading.Lock()
+        self._sessions: dict[str, tuple[float, dict[str, str]]] = {}   # 세션 → (최근 구독 시각, 티커 → 기간)
+        self._updated: dict[str, float] = {}                             # 티커 → 마지막 갱신 시각
+        self._errors: dict[str, str] = {}
+        self._failed: dict[str, tuple[float, int]] = {}                  # 티커 → (마지막 실패 시각, 연속 실패 수)
+        self._wake = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.cycles = 0
+
+    # ---------- 구독 ----------
+    @staticmethod
+    def session_id() -> str:
+        return uuid.uuid4().hex
+
+    def subscribe(self, session: str, tickers, period: str):
+        with self._lock:
+            self._sessions[session] = (time.time(), {t: period for t in dict.fromkeys(tickers)})
+
+    def wanted(self) -> dict[str, str]:
+        """살아 있는 세션 구독 합집합: 티커 → 가장 긴 기간"""
+        now = time.time()
+        out: dict[str, str] = {}
+        with self._lock:
+            for s in [s for s, (ts, _) in self._sessions.items() if now - ts > self.session_ttl]:
+                del self._sessions[s]
+            for _, subs in self._sessions.values():
+                for t, p in subs.items():
+                    if t not in out or _ORDER.index(p) > _ORDER.index(out[t]):
+                        out[t] = p
+        return out
+
+    # ---------- 갱신 ----------
+    @instrument.traced("refresher.refresh")
+    def refresh(self, wanted: dict[str, str], force: bool = True):
+        """기간별로 묶어 일괄 갱신. force면 저장소 신선도(ttl) 무시"""
+        if not wanted:
+            return
+        store = get_store()
+        if force:
+            store.expire(list(wanted))
+        by_period: dict[str, list[str]] = {}
+        for t, p in wanted.items():
+            by_period.setdefault(p, []).append(t)
+        for p, tickers in by_period.items():
+            res = load_many(tickers, p)
+            now = time.time()
+            with self._lock:
+                for t in tickers:
+                    if t in res.series:
+                        self._updated[t] = now
+                        self._errors.pop(t, None)
+                        self._failed.pop(t, None)
+                    else:
+                        self._errors[t] = res.errors.get(t, "데이터 없음")
+                        self._failed[t] = (now, self._failed.get(t, (0.0, 0))[1] + 1)
+        # 분배금/분할 이벤트는 하루 1회(내부 TTL)
+        get_total_return().refresh_events(list(wanted))
+
+    def backoff(self, failures: int) -> float:
+        """연속 failures회 실패 후 재시도까지 대기(초)"""
+        return min(self.interval * 2 ** (failures - 1), BACKOFF_MAX)
+
+    def _waiting(self, ticker: str, now: float) -> bool:
+        """실패 후 재시도 간격 안인지. 호출 측이 _lock 보유"""
+        if ticker not in self._failed:
+            return False
+        at, n = self._failed[ticker]
+        return now - at < self.backoff(n)
+
+    @staticmethod
+    def _short(ticker: str, period: str) -> bool:
+        """저장본이 period 시작일까지 닿지 않는지(더 긴 기간으로 바꾼 경우)"""
+        return get_store().meta(ticker).get("start", "9999") > period_start(period).isoformat()
+
+    def _due(self, wanted: dict[str, str]) -> dict[str, str]:
+        """
+        이번 주기에 갱신할 티커: 처음 보는 것 + 저장 구간이 원하는 기간보다 짧은 것 + 장중 시장 것
+        - 실패한 티커는 재시도 간격이 지난 뒤에만(한 번도 성공 못 한 티커는 장외에도 간격마다 재시도)
+        """
+        now = time.time()
+        opened = {m: market_open(m) for m in HOURS}
+        out = {}
+        with self._lock:
+            for t, p in wanted.items():
+                if self._waiting(t, now):
+                    continue
+                if t not in self._updated or opened[market_of(t)] or self._short(t, p):
+                    out[t] = p
+        return out
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh(self._due(self.wanted()))
+            except Exception as e:
+                instrument.swallow("refresher", e)  # 소스 오류는 Provider가 기록. 다음 주기에 재시도
+            self.cycles += 1
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="refresher", daemon=True)
+                self._thread.start()
+
+    # ---------- 조회 ----------
+    def snapshot(self, session: str, tickers: list[str], period: str, total_return: bool = False) -> BatchResult:
+        """
+        세션용 종가 묶음(메모리 저장본). 처음 보는 티커와 저장 구간이 period보다 짧은 티커만 이번 호출에서 바로 조회.
+        - total_return: 저장된 총수익 지수 기반 수정 종가
+        """
+        uniq = list(dict.fromkeys(tickers))
+        self.subscribe(session, uniq, period)
+        self.start()
+        now = time.time()
+        with self._lock:
+            new = [t for t in uniq if (t not in self._updated and t not in self._errors)
+                   or (not self._waiting(t, now) and self._short(t, period))]
+        if new:
+            self.refresh({t: period for t in new}, force=False)
+        store, start = get_store(), pd.Timestamp(period_start(period))
+        tr = get_total_return() if total_return else None
+        series, errors = {}, {}
+        for t in uniq:
+            s = tr.adjusted(t, start.date()) if tr else store.read(t)["Close"].dropna()
+            s = s[s.index >= start].astype("float64")
+            if s.empty:
+                errors[t] = self._errors.get(t, "데이터 없음")
+                continue
+            series[t] = s.rename(t)
+        return BatchResult(series, errors)
+
+    def status(self, tickers=None) -> pd.DataFrame:
+        """티커별 마지막 갱신 시각, 경과(초), 시장, 장중 여부, 오류"""
+        now = time.time()
+        opened = {m: market_open(m) for m in HOURS}
+        with self._lock:
+            names = list(dict.fromkeys(tickers)) if tickers is not None else sorted(set(self._updated) | set(self._errors))
+            rows = [{
+                "티커": t,
+                "마지막 갱신": pd.Timestamp(self._updated[t], unit="s", tz="UTC").tz_convert("Asia/Seoul").strftime("%H:%M:%S")
+                if t in self._updated else "",
+                "경과(초)": round(now - self._updated[t]) if t in self._updated else None,
+                "시장": market_of(t),
+                "장중": opened[market_of(t)],
+                "오류": self._errors.get(t, ""),
+            } for t in names]
+        return pd.DataFrame(rows, columns=["티커", "마지막 갱신", "경과(초)", "시장", "장중", "오류"])
+
+    def sessions(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+_refresher: Refresher | None = None
+_refresher_lock = threading.Lock()
+
+
+def get_refresher() -> Refresher:
+    """프로세스 공용 갱신기(워커는 첫 snapshot 때 시작)"""
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = Refresher()
+        return _refresher
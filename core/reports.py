@@ -0,0 +1,375 @@
+# core/reports.py
+"""
+월간/연간 성과 리포트(거래 원장 기준).
+- 마감된 달만 보유별 + 전체 월 요약 행으로 저장(.data/reports/<기준 통화>/monthly.parquet), 새로 마감된 달만 추가
+- 다음 달 계산에 필요한 값(수량, 마지막 가격/평가액, 누적 지수/고점)은 state.json에 이월
+- 진행 중인 달은 매번 그 달 일별 데이터만으로 계산 → 이력 길이와 무관한 비용
+- 원장은 바이트 위치 이후 새 줄만 읽음. 이미 마감된 달의 거래가 들어오면 그 시점부터 다시 만듦
+- 월 행은 합칠 수 있는 값(유입 합, 유입×경과일 합, 일수익률 합/제곱합, 최저 낙폭)만 보관
+  → 연간 행은 월 행 12개로 계산(수정 디츠 가중치 포함)
+- 수익률: 수정 디츠(금액 가중, 유입 시점 가중) + 시간가중(일별 연결). 일별 유입은 그날 종가 기준
+- 분할: 원장 분할 행은 수량에 곱함. 종가가 분할 반영인 소스(야후)는 이후 원장 분할만큼 가격을 되돌려
+  분할 미반영 가격으로 맞춤(total_return과 같은 소스 구분)
+"""
+import datetime as dt
+import io
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+
+from core import DATA_DIR, instrument
+from core.fx import get_fx
+from core.ledger import BUY, FEE, SELL, SPLIT, Ledger, get_ledger
+from core.price_store import PriceStore, get_store
+from core.sim import accumulate
+from core.total_return import RAW_SPLIT_SOURCES
+
+REPORT_DIR = DATA_DIR / "reports"
+TOTAL = "전체"
+EPS = 1e-9
+TRADING_DAYS = 252
+MONTH_COLS = ["티커", "월", "시작평가", "기말평가", "순유입", "유입일수합", "달력일", "일수",
+              "수익률합", "수익률제곱합", "시간가중", "손익", "지수", "고점", "MDD"]
+VIEW_COLS = ["티커", "기간", "시작평가", "기말평가", "순유입", "손익", "수익률(MD)", "시간가중", "변동성(연)", "MDD"]
+FORMATS = ["CSV", "Parquet"]
+VERSION = 2   # 저장 형식/계산 규칙이 바뀌면 올림 → 처음부터 다시 만듦
+
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=str if c in ("티커", "월") else "float64") for c in MONTH_COLS})
+
+
+class ReportBook:
+    """기준 통화 하나의 월 요약 저장소"""
+
+    def __init__(self, base: str, root=REPORT_DIR, ledger: Ledger | None = None, store: PriceStore | None = None):
+        self.base = base
+        self.root = root / base
+        self.ledger = ledger or get_ledger()
+        self.store = store or get_store()
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---------- 저장 ----------
+    def _fresh_state(self) -> dict:
+        return {"version": VERSION, "offset": 0, "closed": None, "carry": {}, "total": {"value": 0.0, "idx": 1.0, "peak": 1.0},
+                "pending": []}
+
+    def _load(self):
+        try:
+            self.state = json.loads((self.root / "state.json").read_text(encoding="utf-8"))
+            if self.state.get("version") != VERSION:
+                raise ValueError("이전 형식")
+            path = self.root / "monthly.parquet"
+            self.rollup = pd.read_parquet(path) if path.exists() else _empty()
+        except (OSError, ValueError):
+            self.state, self.rollup = self._fresh_state(), _empty()
+
+    def _save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self.root / "monthly.tmp"
+        self.rollup.to_parquet(tmp, index=False)
+        tmp.replace(self.root / "monthly.parquet")
+        tmp = self.root / "state.tmp"
+        tmp.write_text(json.dumps(self.state, ensure_ascii=False), encoding="utf-8")
+        tmp.replace(self.root / "state.json")
+
+    # ---------- 원장 ----------
+    def _read_trades(self, offset: int) -> tuple[list[dict], int]:
+        path = self.ledger.trades_path
+        if not path.exists():
+            return [], 0
+        out = []
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                offset += len(line)
+                if line.strip():
+                    out.append(json.loads(line))
+        return out, offset
+
+    def _sync(self):
+        """원장 새 줄을 대기 거래에 추가. 마감된 달 거래가 있거나 원장이 줄었으면 처음부터"""
+        path = self.ledger.trades_path
+        size = path.stat().st_size if path.exists() else 0
+        if size < self.state["offset"]:
+            self.state, self.rollup = self._fresh_state(), _empty()
+        new, offset = self._read_trades(self.state["offset"])
+        closed = self.state["closed"]
+        if closed and any(tr["날짜"][:7] <= closed for tr in new):
+            self.state, self.rollup = self._fresh_state(), _empty()
+            new, offset = self._read_trades(0)
+        self.state["pending"] = sorted(self.state["pending"] + new, key=lambda tr: tr["날짜"])
+        self.state["offset"] = offset
+
+    # ---------- 한 달 계산 ----------
+    def _prices(self, tickers: list[str], grid: pd.DatetimeIndex, carry: dict, splits: list[dict],
+                today: dt.date) -> np.ndarray:
+        """
+        (티커, 일) 분할 미반영 종가(거래 통화). 그날 봉이 없으면 직전 종가, 이력 전이면 이월 가격
+        - 분할 반영 소스: 그날 이후(오늘까지) 원장 분할 비율 곱을 곱해 되돌림
+        """
+        out = np.empty((len(tickers), len(grid)))
+        for i, t in enumerate(tickers):
+            close = self.store.read(t)["Close"].dropna()
+            last = carry.get(t, {}).get("price", np.nan)
+            if close.empty:
+                out[i] = last
+                continue
+            pos = close.index.searchsorted(grid, side="right") - 1
+            px = close.to_numpy(dtype="float64")[np.clip(pos, 0, None)]
+            if self.store.meta(t).get("source") not in RAW_SPLIT_SOURCES:
+                px = px * _later_splits(splits, t, grid, today)
+            out[i] = np.where(pos >= 0, px, last)
+        return out
+
+    def _rates(self, tickers: list[str], grid: pd.DatetimeIndex) -> np.ndarray:
+        """(티커, 일) 기준 통화 환율. 같은 통화 1, 환율 없으면 NaN"""
+        fx = get_fx()
+        out = np.ones((len(tickers), len(grid)))
+        ccy = [fx.currency(t) for t in tickers]
+        for c in set(ccy) - {self.base}:
+            rate = fx.history(c, self.base, (grid[0] - pd.Timedelta(days=10)).date())
+            rows = [i for i, x in enumerate(ccy) if x == c]
+            if rate.empty:
+                out[rows] = np.nan
+                continue
+            pos = np.clip(rate.index.searchsorted(grid, side="right") - 1, 0, None)
+            out[rows] = rate.to_numpy()[pos]
+        return out
+
+    def _month(self, month: pd.Period, trades: list[dict], later: list[dict], carry: dict, total: dict,
+               today: dt.date):
+        """
+        한 달 요약 행 + 이월 값. 반환 (행 DataFrame, 새 carry, 새 total)
+        - later: 이 달 이후 거래(분할 반영 가격 되돌림용)
+        - 일별 수량 = 전일 수량 × 분할 비율 + 매수/매도 수량(누적 점화식 한 번)
+        - 일 수익률 r = (V_t - V_{t-1} - F_t) / (V_{t-1} + 유입_t)
+        """
+        start = month.start_time.normalize()
+        end = min(month.end_time.normalize(), pd.Timestamp(today))
+        grid = pd.bdate_range(start, end)
+        tickers = sorted({t for t, c in carry.items() if c["qty"] > EPS} | {tr["티커"] for tr in trades if tr["티커"]})
+        if grid.empty or (not tickers and not trades):
+            return _empty(), carry, total
+        T, D = len(tickers), len(grid)
+        col = {t: i for i, t in enumerate(tickers)}
+        P = self._prices(tickers, grid, carry, [tr for tr in trades + later if tr["구분"] == SPLIT], today)
+        R = self._rates(tickers, grid)
+        dq, split = np.zeros((T, D)), np.ones((T, D))
+        flow, fd = np.zeros((T + 1, D)), np.zeros(T + 1)   # 마지막 행 = 티커 없는 수수료(전체에만)
+        for tr in trades:
+            day = pd.Timestamp(tr["날짜"])
+            j = min(int(grid.searchsorted(day)), D - 1)
+            i = col.get(tr["티커"], T)
+            q, px, fee = tr["수량"], tr["가격"], tr["수수료"]
+            rate = R[i, j] if i < T else 1.0
+            side = tr["구분"]
+            if side == BUY:
+                dq[i, j] += q
+                f = q * px + fee
+            elif side == SELL:
+                dq[i, j] -= q
+                f = -(q * px - fee)
+            elif side == FEE:
+                f = fee or px          # 밖에서 낸 비용 = 유입(평가액 증가 없음)
+            else:
+                if side == SPLIT and i < T:
+                    split[i, j] *= q
+                continue
+            f *= rate
+            flow[i, j] += f
+            fd[i] += f * (day - start).days
+        q0 = np.array([carry.get(t, {}).get("qty", 0.0) for t in tickers])
+        Q = accumulate(q0, split, dq)[:, 1:]
+        V = np.nan_to_num(Q * P * R)
+
+        # 보유별 행 + 전체 행을 한 배열로
+        v0 = np.array([carry.get(t, {}).get("value", 0.0) for t in tickers] + [total["value"]])
+        V = np.vstack([V, V.sum(axis=0)])
+        F = np.vstack([flow[:T], flow.sum(axis=0)])
+        FD = np.append(fd[:T], fd.sum())
+        prev = np.concatenate([v0[:, None], V[:, :-1]], axis=1)
+        denom = prev + np.clip(F, 0, None)
+        live = denom > EPS
+        r = np.where(live, (V - prev - F) / np.where(live, denom, 1.0), 0.0)
+        idx0 = np.array([carry.get(t, {}).get("idx", 1.0) for t in tickers] + [total["idx"]])
+        peak0 = np.array([carry.get(t, {}).get("peak", 1.0) for t in tickers] + [total["peak"]])
+        idx = idx0[:, None] * np.cumprod(1.0 + r, axis=1)
+        peak = np.maximum.accumulate(np.maximum(idx, peak0[:, None]), axis=1)
+        rows = pd.DataFrame({
+            "티커": tickers + [TOTAL],
+            "월": str(month),
+            "시작평가": v0,
+            "기말평가": V[:, -1],
+            "순유입": F.sum(axis=1),
+            "유입일수합": FD,
+            "달력일": float(month.days_in_month),
+            "일수": live.sum(axis=1).astype("float64"),
+            "수익률합": r.sum(axis=1),
+            "수익률제곱합": (r * r).sum(axis=1),
+            "시간가중": idx[:, -1] / idx0 - 1.0,
+            "손익": V[:, -1] - v0 - F.sum(axis=1),
+            "지수": idx[:, -1],
+            "고점": peak[:, -1],
+            "MDD": np.minimum((idx / peak - 1.0).min(axis=1), 0.0),
+        })
+        keep = (np.abs(rows["시작평가"]) + np.abs(rows["기말평가"]) + np.abs(rows["순유입"])).to_numpy() > EPS
+        rows = rows[keep | (rows["티커"] == TOTAL).to_numpy()].reset_index(drop=True)
+        new_carry = {t: {**carry.get(t, {}), "qty": float(Q[i, -1]), "price": float(P[i, -1]) if np.isfinite(P[i, -1])
+                         else carry.get(t, {}).get("price", np.nan), "value": float(V[i, -1]),
+                         "idx": float(idx[i, -1]), "peak": float(peak[i, -1])} for i, t in enumerate(tickers)}
+        new_carry = {**carry, **new_carry}
+        new_total = {"value": float(V[-1, -1]), "idx": float(idx[-1, -1]), "peak": float(peak[-1, -1])}
+        return rows, new_carry, new_total
+
+    @staticmethod
+    def _split(pending: list[dict], month: pd.Period) -> tuple[list[dict], list[dict]]:
+        """날짜순 대기 거래 → (이 달 이하, 이후)"""
+        key = str(month)
+        k = next((i for i, tr in enumerate(pending) if tr["날짜"][:7] > key), len(pending))
+        return pending[:k], pending[k:]
+
+    # ---------- 갱신 ----------
+    def _ensure_prices(self, first: pd.Period):
+        tickers = {tr["티커"] for tr in self.state["pending"] if tr["티커"]} | \
+                  {t for t, c in self.state["carry"].items() if c["qty"] > EPS}
+        for t in tickers:
+            try:
+                self.store.update(t, first.start_time.date())
+            except Exception as e:
+                instrument.swallow("reports.prices", e)   # 저장본(없으면 이월 가격)
+
+    @instrument.traced("reports.update")
+    def update(self, today: dt.date | None = None) -> int:
+        """
+        새로 마감된 달을 요약 행으로 추가. 반환: 추가한 달 수
+        - 지난달까지가 마감. 이번 달은 monthly()에서 그때그때 계산
+        """
+        today = today or dt.date.today()
+        current = pd.Period(today, "M")
+        with self._lock:
+            self._sync()
+            st = self.state
+            if st["closed"]:
+                first = pd.Period(st["closed"], "M") + 1
+            elif st["pending"]:
+                first = pd.Period(st["pending"][0]["날짜"][:7], "M")
+            else:
+                return 0
+            if first >= current:
+                instrument.cache("reports.months", hits=1)   # 마감된 달 재사용, 새 마감 없음
+                return 0
+            self._ensure_prices(first)
+            parts, m = [], first
+            while m < current:
+                now, st["pending"] = self._split(st["pending"], m)
+                rows, st["carry"], st["total"] = self._month(m, now, st["pending"], st["carry"], st["total"], today)
+                parts.append(rows)
+                st["closed"] = str(m)
+                m += 1
+            parts = [p for p in parts if len(p)]
+            if parts:
+                self.rollup = pd.concat([self.rollup, *parts], ignore_index=True) if len(self.rollup) else \
+                    pd.concat(parts, ignore_index=True)
+            self._save()
+            n = int(current.ordinal - first.ordinal)
+            instrument.cache("reports.months", misses=n)
+            return n
+
+    def open_month(self, today: dt.date | None = None) -> pd.DataFrame:
+        """진행 중인 달 요약(저장 안 함)"""
+        today = today or dt.date.today()
+        month = pd.Period(today, "M")
+        with self._lock:
+            now, later = self._split(self.state["pending"], month)
+            rows, _, _ = self._month(month, now, later, self.state["carry"], self.state["total"], today)
+        return rows
+
+    def monthly(self, today: dt.date | None = None) -> pd.DataFrame:
+        """마감된 달 + 진행 중인 달 요약 행(월 순)"""
+        self.update(today)
+        cur = self.open_month(today)
+        with self._lock:
+            base = self.rollup
+        return pd.concat([base, cur], ignore_index=True) if len(cur) and len(base) else (base if len(base) else cur)
+
+
+def _later_splits(splits: list[dict], ticker: str, grid: pd.DatetimeIndex, today: dt.date) -> np.ndarray:
+    """일별 '그날 이후 ~ 오늘까지' 원장 분할 비율 곱. 분할일 종가는 이미 분할 후 가격이라 제외"""
+    own = sorted((tr["날짜"], tr["수량"]) for tr in splits if tr["티커"] == ticker and tr["날짜"] <= str(today))
+    if not own:
+        return np.ones(len(grid))
+    days = pd.DatetimeIndex([d for d, _ in own])
+    suffix = np.append(np.cumprod([q for _, q in own][::-1])[::-1], 1.0)
+    return suffix[days.searchsorted(grid, side="right")]
+
+
+# ---------- 집계/표시 ----------
+def annual(monthly: pd.DataFrame) -> pd.DataFrame:
+    """월 요약 → 연 요약(같은 열). 수정 디츠 유입 가중은 월 시작 오프셋으로 연 기준 환산"""
+    if monthly.empty:
+        return monthly.copy()
+    m = monthly.copy()
+    start = pd.PeriodIndex(m["월"], freq="M").start_time
+    year = start.year
+    ydays = np.where(pd.DatetimeIndex(start).is_leap_year, 366.0, 365.0)
+    off = (start - pd.to_datetime(year.astype(str) + "-01-01")).days.to_numpy(dtype="float64")
+    # 연 기준 Σ 유입×경과일 = 월 유입×월 시작 오프셋 + 월 안 경과일 합
+    m["유입일수합"] = m["순유입"] * off + m["유입일수합"]
+    m["달력일"] = ydays
+    m["_연"] = year.astype(str)
+    m["_log"] = np.log1p(m["시간가중"])
+    g = m.groupby(["티커", "_연"], sort=False).agg(
+        시작평가=("시작평가", "first"), 기말평가=("기말평가", "last"), 순유입=("순유입", "sum"),
+        유입일수합=("유입일수합", "sum"), 달력일=("달력일", "first"), 일수=("일수", "sum"),
+        수익률합=("수익률합", "sum"), 수익률제곱합=("수익률제곱합", "sum"), _log=("_log", "sum"),
+        손익=("손익", "sum"), 지수=("지수", "last"), 고점=("고점", "last"), MDD=("MDD", "min"))
+    g["시간가중"] = np.expm1(g.pop("_log"))
+    g = g.reset_index().rename(columns={"_연": "월"})
+    order = np.lexsort([g["티커"].to_numpy(), (g["티커"] == TOTAL).to_numpy(), g["월"].to_numpy()])
+    return g.iloc[order].reset_index(drop=True)[MONTH_COLS]
+
+
+def view(rollup: pd.DataFrame) -> pd.DataFrame:
+    """요약 행 → 표시용(수정 디츠 수익률, 연환산 변동성)"""
+    r = rollup
+    weighted = (r["순유입"] * r["달력일"] - r["유입일수합"]) / r["달력일"]
+    denom = r["시작평가"] + weighted
+    n = r["일수"]
+    var = (r["수익률제곱합"] - r["수익률합"] ** 2 / n.where(n > 0)) / (n - 1).where(n > 1)
+    return pd.DataFrame({
+        "티커": r["티커"],
+        "기간": r["월"],
+        "시작평가": r["시작평가"],
+        "기말평가": r["기말평가"],
+        "순유입": r["순유입"],
+        "손익": r["손익"],
+        "수익률(MD)": (r["손익"] / denom.where(denom.abs() > EPS)),
+        "시간가중": r["시간가중"],
+        "변동성(연)": np.sqrt(var.clip(lower=0) * TRADING_DAYS),
+        "MDD": r["MDD"],
+    })[VIEW_COLS]
+
+
+def export(df: pd.DataFrame, fmt: str) -> bytes:
+    """표 → 내려받기 바이트(CSV는 엑셀 호환 UTF-8 BOM)"""
+    if fmt == "Parquet":
+        buf = io.BytesIO()
+        df.to_parquet(buf, index=False)
+        return buf.getvalue()
+    return df.to_csv(index=False).encode("utf-8-sig")
+
+
+_books: dict[str, ReportBook] = {}
+_books_lock = threading.Lock()
+
+
+def get_reports(base: str) -> ReportBook:
+    """기준 통화별 프로세스 공용 리포트 저장소"""
+    with _books_lock:
+        if base not in _books:
+            _books[base] = ReportBook(base)
+        return _books[base]
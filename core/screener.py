@@ -0,0 +1,324 @@
+# core/screener.py
+"""
+여러 거래일에 걸친 시장 스크리너.
+- 거래일별 시장 전체 스냅샷을 Parquet으로 보관: .data/market/market=KOSPI/date=20240102.parquet
+- 조회 구간에서 보관본에 없는 거래일만 받아 추가(과거 확정일만 보관)
+- 빈 응답 거래일은 표시 파일(date=YYYYMMDD.empty, 내용은 시도 횟수)을 남김
+  · KRX 제한/오류도 빈 응답으로 오므로 EMPTY_RETRY 뒤 다시 시도, EMPTY_TRIES회 연속 비면 그때부터 건너뜀
+  · clear_empty()로 표시 삭제
+- 시장별 보관본은 메모리에 한 번 읽어 두고 새 파일만 덧붙임(최근 쓴 CACHE_SIZE개 시장만 보관)
+- 조건 계산은 (날짜 × 종목) 행렬 위 벡터 연산
+"""
+import datetime as dt
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+
+from core import DATA_DIR, instrument
+from core.market import SCOPES, compact, fetch_snapshot, top_n
+from core.provider import get_provider
+from core.symbols import get_directory
+
+MARKET_DIR = DATA_DIR / "market"
+CLOSE_HOUR = 16         # 이 시각 이후면 오늘 스냅샷도 확정으로 보관
+MAX_WORKERS = 4
+CACHE_SIZE = 3          # 메모리에 둘 시장 보관본 수
+CALENDAR_SIZE = 32      # 기억할 거래일 목록(구간) 수
+EMPTY_RETRY = 24 * 3600  # 빈 응답 거래일 재시도 간격(초)
+EMPTY_TRIES = 3          # 이 횟수만큼 연속으로 비면 더는 받지 않음
+FIELDS = ["시가", "고가", "저가", "종가", "거래량", "거래대금", "등락률"]
+# 보관 형식 고정(날짜마다 다운캐스트 결과가 달라도 한 데이터셋으로 읽히도록)
+DTYPES = {"시가": "float32", "고가": "float32", "저가": "float32", "종가": "float32",
+          "거래량": "float64", "거래대금": "float64", "등락률": "float32"}
+
+
+class Panel(NamedTuple):
+    """fields: 컬럼명 → (날짜, 종목) 행렬. codes/markets는 열 순서"""
+    dates: pd.DatetimeIndex
+    codes: np.ndarray
+    markets: np.ndarray
+    fields: dict
+
+
+def _ymd(d: dt.date) -> str:
+    return d.strftime("%Y%m%d")
+
+
+def _business_days(start: str, end: str) -> list[str]:
+    from pykrx import stock
+    return [pd.Timestamp(d).strftime("%Y%m%d") for d in stock.get_previous_business_days(fromdate=start, todate=end)]
+
+
+class MarketArchive:
+    def __init__(self, root=MARKET_DIR):
+        self.root = root
+        self._frames: OrderedDict = OrderedDict()    # 시장 → 보관본 전체(긴 형식). LRU
+        self._loaded: dict[str, set] = {}
+        self._calendar: OrderedDict = OrderedDict()  # (시작, 끝) → 확정 거래일. LRU
+        self._locks: dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, market: str) -> threading.Lock:
+        with self._guard:
+            return self._locks.setdefault(market, threading.Lock())
+
+    def path(self, market: str, day: str):
+        return self.root / f"market={market}" / f"date={day}.parquet"
+
+    def days(self, market: str) -> list[str]:
+        """보관된 거래일(YYYYMMDD) 오름차순"""
+        d = self.root / f"market={market}"
+        if not d.exists():
+            return []
+        return sorted(p.stem.split("=", 1)[1] for p in d.glob("date=*.parquet"))
+
+    def empty_days(self, market: str) -> dict[str, int]:
+        """빈 응답으로 표시된 거래일 → 시도 횟수"""
+        d = self.root / f"market={market}"
+        if not d.exists():
+            return {}
+        out = {}
+        for p in d.glob("date=*.empty"):
+            try:
+                out[p.stem.split("=", 1)[1]] = int(p.read_text(encoding="utf-8") or 1)
+            except (OSError, ValueError):
+                out[p.stem.split("=", 1)[1]] = 1
+        return out
+
+    def _skipped(self, market: str) -> set[str]:
+        """이번 수집에서 건너뛸 빈 응답 거래일: 시도 횟수를 채웠거나 마지막 시도 후 EMPTY_RETRY 안"""
+        now = time.time()
+        out = set()
+        for day, tries in self.empty_days(market).items():
+            try:
+                recent = now - self.path(market, day).with_suffix(".empty").stat().st_mtime < EMPTY_RETRY
+            except OSError:
+                continue
+            if tries >= EMPTY_TRIES or recent:
+                out.add(day)
+        return out
+
+    def clear_empty(self, markets=None) -> int:
+        """빈 응답 표시 삭제(기본 전체 시장). 반환: 지운 개수"""
+        n = 0
+        for m in markets or [p.name.split("=", 1)[1] for p in self.root.glob("market=*")]:
+            for p in (self.root / f"market={m}").glob("date=*.empty"):
+                p.unlink(missing_ok=True)
+                n += 1
+        return n
+
+    # ---------- 수집 ----------
+    def _settled(self, start: dt.date, end: dt.date) -> list[str]:
+        """구간 내 확정 거래일. 장 마감 전 오늘은 제외"""
+        now = dt.datetime.now()
+        if end >= now.date() and now.hour < CLOSE_HOUR:
+            end = now.date() - dt.timedelta(days=1)
+        if end < start:
+            return []
+        key = (start, end)
+        with self._guard:
+            hit = self._calendar.get(key)
+            if hit is not None:
+                self._calendar.move_to_end(key)
+                return hit
+        days = get_provider().call("pykrx", _business_days, _ymd(start), _ymd(end), timeout=30)
+        with self._guard:
+            self._calendar[key] = days
+            while len(self._calendar) > CALENDAR_SIZE:
+                self._calendar.popitem(last=False)
+        return days
+
+    def _store_day(self, market: str, day: str) -> int:
+        """거래일 하나 수집. 반환: 빈 응답이면 누적 시도 횟수, 저장했으면 0"""
+        raw = get_provider().call("pykrx", fetch_snapshot, day, market, timeout=60)
+        marker = self.path(market, day).with_suffix(".empty")
+        if raw is None or raw.empty:
+            # 확정일의 빈 응답은 대개 일시 오류 → 시도 횟수만 남기고 EMPTY_RETRY 뒤 재시도
+            tries = self.empty_days(market).get(day, 0) + 1
+            marker.parent.mkdir(parents=True, exist_ok=True)
+            marker.write_text(str(tries), encoding="utf-8")
+            return tries
+        df = compact(raw, market).reindex(columns=["종목코드"] + FIELDS).astype(DTYPES)
+        df.insert(0, "날짜", pd.Timestamp(day))
+        path = self.path(market, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        df.to_parquet(tmp, index=False)
+        tmp.replace(path)
+        marker.unlink(missing_ok=True)
+        return 0
+
+    def ensure(self, markets: list[str], start: dt.date, end: dt.date,
+               max_workers: int = MAX_WORKERS, progress=None) -> dict[str, str]:
+        """
+        구간의 빠진 거래일만 수집. 반환: '시장/날짜' → 오류 메시지
+        - progress(완료 수, 전체 수) 콜백(선택)
+        """
+        errors: dict[str, str] = {}
+        try:
+            settled = self._settled(start, end)
+        except Exception as e:
+            return {"거래일 목록": str(e)}
+        todo = [(m, d) for m in markets
+                for d in sorted(set(settled) - set(self.days(m)) - self._skipped(m))]
+        if not todo:
+            return errors
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(todo))) as ex:
+            futures = {ex.submit(self._store_day, m, d): (m, d) for m, d in todo}
+            for i, f in enumerate(futures, 1):
+                m, d = futures[f]
+                try:
+                    tries = f.result()
+                    if tries:
+                        errors[f"{m}/{d}"] = f"빈 응답({tries}/{EMPTY_TRIES}회)"
+                except Exception as e:
+                    errors[f"{m}/{d}"] = str(e)
+                if progress:
+                    progress(i, len(todo))
+        return errors
+
+    # ---------- 조회 ----------
+    def frame(self, market: str) -> pd.DataFrame:
+        """시장 보관본 전체(날짜, 종목코드, 수치). 새로 생긴 날짜 파일만 추가로 읽음"""
+        with self._lock(market):
+            with self._guard:
+                old = self._frames.get(market)
+                if old is None:
+                    self._loaded.pop(market, None)  # 밀려난 시장은 처음부터 다시 읽음
+                else:
+                    self._frames.move_to_end(market)
+            loaded = self._loaded.setdefault(market, set())
+            new = [d for d in self.days(market) if d not in loaded]
+            if new:
+                # 여러 파일을 Arrow 데이터셋으로 한 번에(멀티스레드) 읽기
+                part = ds.dataset([str(self.path(market, d)) for d in new], format="parquet").to_table().to_pandas()
+                old = pd.concat([old, part], ignore_index=True) if old is not None else part
+                loaded.update(new)
+                with self._guard:
+                    self._frames[market] = old
+                    while len(self._frames) > CACHE_SIZE:
+                        self._frames.popitem(last=False)
+            return old if old is not None else pd.DataFrame(columns=["날짜", "종목코드"] + FIELDS)
+
+    def panel(self, markets: list[str], start: dt.date, end: dt.date, fields=("종가", "거래량", "거래대금")) -> Panel:
+        """구간의 (날짜 × 종목) 행렬. 시장을 열 방향으로 이어 붙임"""
+        lo, hi = pd.Timestamp(start), pd.Timestamp(end)
+        parts = []
+        for m in markets:
+            df = self.frame(m)
+            parts.append((m, df[(df["날짜"] >= lo) & (df["날짜"] <= hi)]))
+        dates = pd.DatetimeIndex(np.unique(np.concatenate([df["날짜"].to_numpy() for _, df in parts]))) \
+            if parts else pd.DatetimeIndex([])
+        # 시장별로 종목 번호를 매기고 열 방향으로 이어 붙임
+        cols, codes, mks = [], [], []
+        offset = 0
+        for m, df in parts:
+            ci, uniq = pd.factorize(df["종목코드"], sort=True)
+            cols.append((df, dates.get_indexer(df["날짜"]), ci + offset))
+            codes.append(np.asarray(uniq, dtype=object))
+            mks.append(np.full(len(uniq), m, dtype=object))
+            offset += len(uniq)
+        out = {}
+        for f in fields:
+            mat = np.full((len(dates), offset), np.nan)
+            for df, di, ci in cols:
+                if f in df.columns:
+                    mat[di, ci] = df[f].to_numpy(dtype="float64")
+            out[f] = mat
+        empty = np.array([], dtype=object)
+        return Panel(dates, np.concatenate(codes) if codes else empty, np.concatenate(mks) if mks else empty, out)
+
+
+# ---------- 조건 ----------
+def _nanmean_tail(mat: np.ndarray, n: int) -> np.ndarray:
+    tail = mat[-n:]
+    cnt = (~np.isnan(tail)).sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(cnt > 0, np.nansum(tail, axis=0) / cnt, np.nan)
+
+
+def avg_value(p: Panel, days: int) -> np.ndarray:
+    """최근 days 거래일 평균 거래대금"""
+    return _nanmean_tail(p.fields["거래대금"], days)
+
+
+def change(p: Panel, days: int) -> np.ndarray:
+    """days 거래일 등락률(%): 마지막 종가 / days일 전 종가 - 1"""
+    close = p.fields["종가"]
+    if close.shape[0] <= days:
+        return np.full(close.shape[1], np.nan)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (close[-1] / close[-1 - days] - 1.0) * 100
+
+
+def volume_spike(p: Panel, base: int = 60) -> np.ndarray:
+    """마지막 거래일 거래량 ÷ 직전 base 거래일 평균 거래량"""
+    vol = p.fields["거래량"]
+    if vol.shape[0] < 2:
+        return np.full(vol.shape[1], np.nan)
+    mean = _nanmean_tail(vol[:-1], base)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(mean > 0, vol[-1] / mean, np.nan)
+
+
+CONDITIONS = {
+    "N일 평균 거래대금": avg_value,
+    "N일 등락률(%)": change,
+    "거래량 급증(최근 ÷ N일 평균)": volume_spike,
+}
+
+
+@instrument.traced("screener.screen")
+def screen(condition: str, scope: str, days: int, n: int = 50, end: dt.date | None = None,
+           archive: "MarketArchive | None" = None, progress=None):
+    """
+    조건 상위 n 종목. 필요한 거래일만 보관본에 추가한 뒤 계산.
+    - 반환: (결과표, 수집 오류 dict)
+    """
+    archive = archive or get_archive()
+    end = end or dt.date.today()
+    # 달력일 여유: 거래일 days+1개(등락률 기준일 포함) ≈ 1.6배 + 2주
+    start = end - dt.timedelta(days=int((days + 1) * 1.6) + 14)
+    markets = SCOPES[scope]
+    errors = archive.ensure(markets, start, end, progress=progress)
+    p = archive.panel(markets, start, end)
+    if not len(p.dates):
+        return pd.DataFrame(), errors
+    value = CONDITIONS[condition](p, days)
+    last = {f: m[-1] for f, m in p.fields.items()}
+    names = np.empty(len(p.codes), dtype=object)
+    directory = get_directory()
+    for mk in markets:
+        sel = p.markets == mk
+        names[sel] = pd.Series(p.codes[sel]).map(directory.names(mk)).to_numpy()
+    df = pd.DataFrame({
+        "종목코드": p.codes,
+        "종목명": names,
+        "시장": pd.Categorical(p.markets),
+        condition: value,
+        "종가": last["종가"],
+        "거래량": last["거래량"],
+        "거래대금": last["거래대금"],
+    })
+    out = top_n(df, condition, n)
+    out.attrs["기간"] = (p.dates[0].date(), p.dates[-1].date(), len(p.dates))
+    return out, errors
+
+
+_archive: MarketArchive | None = None
+_archive_lock = threading.Lock()
+
+
+def get_archive() -> MarketArchive:
+    """프로세스 공용 보관소"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = MarketArchive()
+        return _archive
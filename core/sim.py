@@ -0,0 +1,100 @@
+# core/sim.py
+"""
+적립식 포트폴리오 결정론 추정 엔진.
+- 자산 × 월 NumPy 배열로 계산, 월 루프 없음
+- 수익률은 (자산,) 고정값 또는 (..., 자산, 월) 경로. 앞쪽 차원은 시나리오 묶음
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from core import instrument
+
+MODE_CONTRIB = "적립금만 비중 맞추기"
+MODE_FULL = "매월 정밀 리밸런스"
+MODES = [MODE_CONTRIB, MODE_FULL]
+
+
+class Projection(NamedTuple):
+    """nav: (..., 월+1) 총자산, alloc: (..., 자산, 월+1) 자산별 금액. 0열은 시작 시점"""
+    nav: np.ndarray
+    alloc: np.ndarray
+
+
+def _closed(x0: np.ndarray, growth: np.ndarray, flows: np.ndarray) -> np.ndarray:
+    """g ≠ 0 구간의 닫힌 식. 반환 (..., M) = x_1..x_M"""
+    P = np.cumprod(growth, axis=-1)
+    return P * (x0[..., None] + np.cumsum(flows / P, axis=-1))
+
+
+def accumulate(x0, growth, flows) -> np.ndarray:
+    """
+    x_t = x_{t-1} * g_t + f_t (t=1..M)를 누적곱으로 한 번에 계산.
+    - x_t = P_t * (x_0 + Σ_{s≤t} f_s / P_s), P_t = Π_{s≤t} g_s
+    - g_t = 0(-100%)인 달은 x_t = f_t로 다시 시작: 그 달에서 끊어 구간마다 닫힌 식(0인 달 수만큼만 루프)
+    - growth/flows는 (..., M)로 브로드캐스트. 반환 (..., M+1)
+    """
+    x0 = np.asarray(x0, dtype="float64")
+    growth = np.asarray(growth, dtype="float64")
+    flows = np.asarray(flows, dtype="float64")
+    shape = np.broadcast_shapes(x0.shape + (1,), growth.shape, flows.shape)
+    g, f = np.broadcast_to(growth, shape), np.broadcast_to(flows, shape)
+    x = np.broadcast_to(x0[..., None], shape[:-1] + (1,))[..., 0]
+    if np.all(growth):
+        return np.concatenate([x[..., None], _closed(x, g, f)], axis=-1)
+    cuts = np.flatnonzero((g == 0).reshape(-1, shape[-1]).any(axis=0))
+    out = np.empty(shape[:-1] + (shape[-1] + 1,))
+    out[..., 0] = x
+    start = 0
+    for c in [*cuts, shape[-1]]:
+        if c > start:
+            out[..., start + 1:c + 1] = _closed(x, g[..., start:c], f[..., start:c])
+            x = out[..., c]
+        if c < shape[-1]:
+            x = x * g[..., c] + f[..., c]
+            out[..., c + 1] = x
+            start = c + 1
+    return out
+
+
+def contributions(monthly, months: int, first_extra=0.0) -> np.ndarray:
+    """월별 투입액 (..., M). 첫 달에 first_extra(보유 외 현금 등) 추가"""
+    monthly = np.asarray(monthly, dtype="float64")
+    c = np.repeat(monthly[..., None], months, axis=-1)
+    c[..., 0] += first_extra
+    return c
+
+
+@instrument.traced("sim.project")
+def project(init_alloc, returns, weights, monthly_contrib, months: int,
+            mode: str = MODE_CONTRIB, other: float = 0.0) -> Projection:
+    """
+    월 적립 + 수익 반영 추정.
+    - init_alloc: (자산,) 시작 금액. other: 자산에 매핑 안 된 시작 금액(첫 달 투입)
+    - returns: (자산,) 월수익률 또는 (..., 자산, 월) 수익률 경로
+    - weights: (자산,) 목표 비중(합 1) 또는 (..., 자산) 비중 묶음(수익률 경로 차원과 브로드캐스트)
+    - mode: MODE_CONTRIB(적립금만 비중대로) / MODE_FULL(매월 총액 재분배)
+    - 매월 순서: 수익 반영 → 적립금 투입(또는 재분배) → 기록
+    """
+    a0 = np.asarray(init_alloc, dtype="float64")
+    w = np.asarray(weights, dtype="float64")
+    r = np.asarray(returns, dtype="float64")
+    if r.ndim == 1:
+        r = np.repeat(r[:, None], months, axis=1)
+    g = 1.0 + r                                        # (..., A, M)
+    c = contributions(monthly_contrib, months, other)  # (..., M)
+    nav0 = a0.sum() + other
+
+    if mode == MODE_FULL:
+        # 첫 달: 보유분 수익 + 투입 후 재분배. 이후 포트폴리오 성장률 = Σ w·g
+        t1 = (a0[:, None] * g[..., :, :1]).sum(axis=-2)[..., 0] + c[..., 0]
+        gp = (w[..., :, None] * g[..., :, 1:]).sum(axis=-2)
+        total = accumulate(t1, gp, c[..., 1:])         # (..., M)
+        alloc = w[..., :, None] * total[..., None, :]
+        alloc = np.concatenate([np.broadcast_to(a0[:, None], alloc.shape[:-1] + (1,)), alloc], axis=-1)
+        nav = np.concatenate([np.broadcast_to(nav0, total.shape[:-1] + (1,)), total], axis=-1)
+    else:
+        alloc = accumulate(a0, g, w[..., :, None] * c[..., None, :])
+        nav = alloc.sum(axis=-2)
+        nav[..., 0] = nav0
+    return Projection(nav, alloc)
@@ -0,0 +1,94 @@
+# core/sources.py
+"""
+원천 시세 조회 함수.
+- pykrx / yfinance 응답을 같은 모양으로 정규화
+- 반환: DatetimeIndex(일봉) + Open/High/Low/Close/Volume float64 컬럼
+- 종가는 배당 미반영 가격(yfinance는 분할만 반영). 총수익은 core.total_return에서 계산
+"""
+import datetime as dt
+
+import pandas as pd
+
+FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+_PYKRX_COLS = {"시가": "Open", "고가": "High", "저가": "Low", "종가": "Close", "거래량": "Volume"}
+
+
+def _ymd(d: dt.date) -> str:
+    return d.strftime("%Y%m%d")
+
+
+def _normalize(df: pd.DataFrame) -> pd.DataFrame:
+    """컬럼 순서/형식 통일, 종가 없는 행 제거"""
+    out = df.reindex(columns=FIELDS).apply(pd.to_numeric, errors="coerce").astype("float64")
+    out.index = pd.to_datetime(out.index).tz_localize(None).normalize()
+    out.index.name = "Date"
+    return out.dropna(subset=["Close"]).sort_index()
+
+
+def krx_code(ticker: str) -> str:
+    """'069500.KS' → '069500'"""
+    return ticker.split(".")[0]
+
+
+def pykrx_ohlcv(ticker: str, start: dt.date, end: dt.date) -> pd.DataFrame:
+    """pykrx ETF 일봉. 데이터 없으면 빈 프레임"""
+    from pykrx import stock
+    df = stock.get_etf_ohlcv_by_date(_ymd(start), _ymd(end), krx_code(ticker))
+    if df is None or df.empty or "종가" not in df.columns:
+        return pd.DataFrame(columns=FIELDS)
+    return _normalize(df.rename(columns=_PYKRX_COLS))
+
+
+def _split_yf(df: pd.DataFrame, ticker: str) -> pd.DataFrame:
+    """yf.download 결과에서 한 티커 분리. 단일/멀티 컬럼 모두 처리"""
+    if isinstance(df.columns, pd.MultiIndex):
+        for level in range(df.columns.nlevels):
+            if ticker in df.columns.get_level_values(level):
+                df = df.xs(ticker, axis=1, level=level)
+                break
+        else:
+            return pd.DataFrame(columns=FIELDS)
+    if df.empty or "Close" not in df:
+        return pd.DataFrame(columns=FIELDS)
+    return _normalize(df)
+
+
+def yf_ohlcv(ticker: str, start: dt.date, end: dt.date) -> pd.DataFrame:
+    """yfinance 일봉(배당 미조정 종가). end 포함되도록 하루 더해 요청"""
+    import yfinance as yf
+    df = yf.download(ticker, start=start.isoformat(), end=(end + dt.timedelta(days=1)).isoformat(),
+                     interval="1d", progress=False, auto_adjust=False, threads=False)
+    return _split_yf(df, ticker)
+
+
+def yf_ohlcv_many(tickers: list[str], start: dt.date, end: dt.date) -> dict[str, pd.DataFrame]:
+    """여러 티커를 yf.download 한 번으로 조회. 티커별 정규화 프레임 dict(빈 결과 제외)"""
+    import yfinance as yf
+    if not tickers:
+        return {}
+    df = yf.download(list(tickers), start=start.isoformat(), end=(end + dt.timedelta(days=1)).isoformat(),
+                     interval="1d", progress=False, auto_adjust=False, threads=True, group_by="ticker")
+    out = {}
+    for t in tickers:
+        part = _split_yf(df, t)
+        if not part.empty:
+            out[t] = part
+    return out
+
+
+ACTIONS = ["Dividends", "Splits"]
+
+
+def yf_actions(ticker: str) -> pd.DataFrame:
+    """
+    yfinance 분배금/분할 이력(전체). 주당 분배금은 분할 반영 기준.
+    - 반환: DatetimeIndex(권리락일) + Dividends/Splits float64. 없으면 빈 프레임
+    """
+    import yfinance as yf
+    df = yf.Ticker(ticker).actions
+    if df is None or df.empty:
+        return pd.DataFrame(columns=ACTIONS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+    out = df.rename(columns={"Stock Splits": "Splits"}).reindex(columns=ACTIONS).fillna(0.0).astype("float64")
+    out.index = pd.to_datetime(out.index).tz_localize(None).normalize()
+    out.index.name = "Date"
+    return out[(out != 0).any(axis=1)].sort_index()
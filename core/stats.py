@@ -0,0 +1,95 @@
+# core/stats.py
+"""
+가격 이력 기반 수익률 통계.
+- 일봉 종가 행렬(날짜 × 티커) → 월말 수익률 → 연 기대수익률/변동성/상관
+"""
+import numpy as np
+import pandas as pd
+
+
+def monthly_returns(closes: pd.DataFrame) -> pd.DataFrame:
+    """월말 종가 기준 단순 수익률. 첫 달(기준 없음)은 제외"""
+    return closes.resample("ME").last().pct_change(fill_method=None).iloc[1:]
+
+
+def annual_params(closes: pd.DataFrame):
+    """
+    (연 기대수익률, 연 변동성, 상관행렬) 추정.
+    - 기대수익률: 월평균 단순수익률을 연 복리 환산 (1+m)^12-1
+    - 변동성: 월 표준편차 × √12
+    - 결측은 쌍별 제외, 상관 NaN(데이터 부족)은 0, 대각은 1
+    """
+    r = monthly_returns(closes)
+    mu = (1.0 + r.mean()) ** 12 - 1.0
+    vol = r.std() * np.sqrt(12.0)
+    corr = r.corr().fillna(0.0).to_numpy()
+    np.fill_diagonal(corr, 1.0)
+    return mu.to_numpy(), vol.to_numpy(), corr
+
+
+# ---------- 평균-분산 추정(일수익률) ----------
+def daily_returns(closes: pd.DataFrame) -> pd.DataFrame:
+    """
+    일 단순수익률. 상장 전/데이터 없는 구간은 NaN 유지.
+    - 시장별 휴장일 차이는 직전 종가로 채운 뒤 계산(해당일 수익률 0)
+    """
+    filled = closes.sort_index().ffill().where(closes.sort_index().bfill().notna())
+    return filled.pct_change(fill_method=None).iloc[1:]
+
+
+def pairwise_cov(r: np.ndarray):
+    """
+    결측 쌍별 제외 공분산을 행렬곱 몇 번으로 일괄 계산.
+    - r: (일수, 자산), NaN = 관측 없음
+    - n_ij = 두 자산 모두 관측된 날 수, 평균도 그 날들 기준
+    - 반환: (공분산, n_ij)
+    """
+    m = (~np.isnan(r)).astype("float64")
+    x = np.nan_to_num(r)
+    n = m.T @ m
+    sx = x.T @ m                                # sx[i, j] = Σ x_i (j 관측일)
+    sxy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (sxy - sx * sx.T / n) / (n - 1)
+    return np.where(n > 1, cov, 0.0), n
+
+
+def _nanmean(r: np.ndarray) -> np.ndarray:
+    """열 평균(관측 없는 열은 0)"""
+    cnt = (~np.isnan(r)).sum(axis=0)
+    return np.nansum(r, axis=0) / np.maximum(cnt, 1)
+
+
+def ledoit_wolf(r: np.ndarray, cov: np.ndarray):
+    """
+    Ledoit-Wolf(2004) 축소: (1-δ)·S + δ·(tr S / N)·I.
+    - 결측은 자산 평균으로 대체(중심화 후 0)해 δ 추정
+    - 반환: (축소 공분산, δ)
+    """
+    t, a = r.shape
+    x = np.nan_to_num(r - _nanmean(r))
+    mu = np.trace(cov) / a
+    target = mu * np.eye(a)
+    d2 = ((cov - target) ** 2).sum()
+    # Σ_t ||x_t x_tᵀ - S||² = Σ (x_tᵀx_t)² - 2 Σ x_tᵀ S x_t + T ||S||²
+    sq = (x * x).sum(axis=1)
+    b2 = ((sq ** 2).sum() - 2 * np.einsum("ti,ij,tj->", x, cov, x) + t * (cov ** 2).sum()) / t**2
+    delta = float(np.clip(b2 / d2, 0.0, 1.0)) if d2 > 0 else 1.0
+    return (1 - delta) * cov + delta * target, delta
+
+
+def mean_cov(closes: pd.DataFrame, periods: int = 252, shrink: bool = True):
+    """
+    (연 기대수익률, 연 공분산, 축소 강도, 쌍별 관측일 수) 추정.
+    - 기대수익률: 일평균 단순수익률 × periods
+    - 공분산: 쌍별 공분산 → Ledoit-Wolf 축소 → 음의 고유값 보정
+    """
+    r = daily_returns(closes).to_numpy(dtype="float64")
+    cov, n = pairwise_cov(r)
+    delta = 0.0
+    if shrink and r.shape[1] > 1:
+        cov, delta = ledoit_wolf(r, cov)
+    w, v = np.linalg.eigh((cov + cov.T) / 2)
+    if w.min() < 1e-12:
+        cov = (v * np.maximum(w, 1e-12)) @ v.T
+    return _nanmean(r) * periods, cov * periods, delta, n
@@ -0,0 +1,152 @@
+# core/sweep.py
+"""
+비중 × 월 적립 × 기간 × 리밸런싱 조합 스윕.
+- 엔진: 결정론 추정(core.sim) 또는 과거 백테스트(core.backtest)
+- 비중 묶음을 청크로 나눠 프로세스 풀에서 계산
+- 조합별 결과를 프로세스 내 캐시에 보관 → 범위를 좁혀 다시 돌리면 없는 조합만 계산
+"""
+import hashlib
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core import instrument
+from core.backtest import backtest
+from core.parallel import pmap
+from core.sim import project
+
+ENGINES = ["결정론", "백테스트"]
+CHUNK = 256          # 작업 하나가 맡는 비중 벡터 수
+CACHE_SIZE = 200_000
+
+_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def weight_grid(ranges: list[tuple[float, float, float]], total: float = 100.0) -> np.ndarray:
+    """
+    자산별 (최소, 최대, 간격)% 범위 → 합이 total인 비중 조합 (K, 자산) %.
+    - 마지막 자산은 나머지로 결정하고 범위 안일 때만 채택
+    """
+    if not ranges:
+        return np.empty((0, 0))
+    axes = [np.arange(lo, hi + step / 2, step) if step > 0 else np.array([lo]) for lo, hi, step in ranges[:-1]]
+    lo_last, hi_last, _ = ranges[-1]
+    head = np.array(list(itertools.product(*axes)), dtype="float64").reshape(-1, len(axes))
+    last = total - head.sum(axis=1)
+    ok = (last >= lo_last - 1e-9) & (last <= hi_last + 1e-9)
+    return np.column_stack([head[ok], last[ok]])
+
+
+def fingerprint(*arrays) -> str:
+    """엔진 입력(시작 금액, 수익률, 가격 행렬 등) 해시. 캐시 키 일부"""
+    h = hashlib.blake2b(digest_size=16)
+    for a in arrays:
+        if isinstance(a, pd.DataFrame):
+            h.update(a.index.asi8.tobytes())
+            a = a.to_numpy()
+        h.update(np.ascontiguousarray(np.asarray(a, dtype="float64")).tobytes())
+    return h.hexdigest()
+
+
+# ---------- 작업 단위(워커 프로세스) ----------
+def _det_task(task) -> list:
+    """결정론: 비중 청크 × 적립 후보 × 기간. 적립금에 선형이므로 0/1 두 번만 계산"""
+    W, init_alloc, mu_m, other, contribs, years, mode = task
+    months = int(max(years) * 12)
+    base = project(init_alloc, mu_m, W / 100.0, 0.0, months, mode=mode, other=other).nav
+    unit = project(np.zeros_like(init_alloc), mu_m, W / 100.0, 1.0, months, mode=mode).nav
+    nav0 = init_alloc.sum() + other
+    out = []
+    for c in contribs:
+        for y in years:
+            m = int(y * 12)
+            final = base[:, m] + c * unit[:, m]
+            invested = nav0 + c * m
+            out.append((c, y, final, np.full(len(W), invested), final / invested - 1.0))
+    return out
+
+
+def _bt_task(task) -> list:
+    """백테스트: 기간마다 최근 y년 가격 구간으로 비중 청크 일괄 계산"""
+    W, prices, initial, contribs, years, mode = task
+    out = []
+    for y in years:
+        start = prices.index[-1] - pd.DateOffset(years=int(y))
+        window = prices[prices.index >= start]
+        for c in contribs:
+            m = backtest(window, W, c, initial=initial, mode=mode).metrics
+            out.append((c, y, m["기말평가액"].to_numpy(), m["총납입"].to_numpy(), m["CAGR"].to_numpy(),
+                        m["변동성"].to_numpy(), m["MDD"].to_numpy()))
+    return out
+
+
+def _columns(engine: str) -> list[str]:
+    if engine == "백테스트":
+        return ["기말평가액", "총납입", "CAGR", "변동성", "MDD"]
+    return ["기말평가액", "총납입", "수익률"]
+
+
+@instrument.traced("sweep.run_sweep")
+def run_sweep(tickers: list[str], weights_pct: np.ndarray, contribs: list[float], years: list[int],
+              modes: list[str], engine: str = "결정론", init_alloc=None, mu_monthly=None,
+              other: float = 0.0, prices: pd.DataFrame | None = None, initial: float = 0.0,
+              workers: int | None = None) -> pd.DataFrame:
+    """
+    모든 조합 평가 후 결과표 반환.
+    - weights_pct: (K, 자산) 비중 %
+    - 결정론: init_alloc(자산별 시작 금액), mu_monthly(자산별 월수익률), other 필요
+    - 백테스트: prices(날짜 × 자산 종가), initial(시작 금액) 필요. 기간은 최근 N년 구간
+    - 반환: 자산별 비중, 월 적립, 기간, 리밸런싱 + 엔진별 지표 컬럼
+    """
+    W = np.round(np.atleast_2d(np.asarray(weights_pct, dtype="float64")), 6)
+    cols = _columns(engine)
+    if engine == "백테스트":
+        fp = fingerprint(prices, [initial])
+    else:
+        fp = fingerprint(init_alloc, mu_monthly, [other])
+
+    def key(w, c, y, mode):
+        return (engine, fp, tuple(w), float(c), float(y), mode)
+
+    # 캐시에 없는 (비중, 리밸런싱)만 골라 모든 적립/기간 후보로 계산
+    with _cache_lock:
+        todo = {mode: [i for i in range(len(W))
+                       if any(key(W[i], c, y, mode) not in _cache for c in contribs for y in years)]
+                for mode in modes}
+    tasks, meta = [], []
+    for mode, rows in todo.items():
+        for s in range(0, len(rows), CHUNK):
+            idx = rows[s:s + CHUNK]
+            if engine == "백테스트":
+                tasks.append((W[idx], prices, initial, contribs, years, mode))
+            else:
+                tasks.append((W[idx], np.asarray(init_alloc, dtype="float64"),
+                              np.asarray(mu_monthly, dtype="float64"), other, contribs, years, mode))
+            meta.append((mode, idx))
+    results = pmap(_bt_task if engine == "백테스트" else _det_task, tasks, workers) if tasks else []
+
+    with _cache_lock:
+        for (mode, idx), res in zip(meta, results):
+            for c, y, *vals in res:
+                for j, i in enumerate(idx):
+                    _cache[key(W[i], c, y, mode)] = tuple(float(v[j]) for v in vals)
+        rows = []
+        for mode in modes:
+            for c in contribs:
+                for y in years:
+                    for i in range(len(W)):
+                        k = key(W[i], c, y, mode)
+                        _cache.move_to_end(k)
+                        rows.append((*W[i], c, y, mode, *_cache[k]))
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return pd.DataFrame(rows, columns=[f"{t}(%)" for t in tickers] + ["월 적립", "기간(년)", "리밸런싱"] + cols)
+
+
+def cache_size() -> int:
+    return len(_cache)
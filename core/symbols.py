@@ -0,0 +1,245 @@
+# core/symbols.py
+"""
+KRX 종목 디렉터리.
+- 하루 1회 ETF/KOSPI/KOSDAQ 전체 코드·이름 표를 만들어 디스크에 저장
+- 메모리에는 코드/이름/초성 n-gram 색인 유지 → 부분일치 검색
+- 검색, 한글명 조회, 순위 페이지 이름 매핑이 같은 디렉터리를 공유
+"""
+import datetime as dt
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from core import DATA_DIR, instrument
+from core.provider import get_provider
+
+SYMBOL_DIR = DATA_DIR / "symbols"
+MARKETS = ["ETF", "KOSPI", "KOSDAQ"]
+COLUMNS = ["코드", "종목명", "시장"]
+
+# 한글 음절 → 초성. 음절 코드 = 0xAC00 + (초성*21 + 중성)*28 + 종성
+_CHOSUNG = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_NGRAM = 3  # 색인 n-gram 최대 길이
+
+
+def to_chosung(text: str) -> str:
+    """한글 음절은 초성으로, 나머지 문자는 그대로"""
+    out = []
+    for ch in text:
+        o = ord(ch)
+        if 0xAC00 <= o <= 0xD7A3:
+            out.append(_CHOSUNG[(o - 0xAC00) // 588])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def yahoo_ticker(code: str, market: str) -> str:
+    """KRX 코드 → 야후 호환 티커. KOSDAQ만 .KQ"""
+    return f"{code}.KQ" if market == "KOSDAQ" else f"{code}.KS"
+
+
+def _grams(text: str):
+    """길이 1..3 n-gram 집합"""
+    out = set()
+    for n in range(1, _NGRAM + 1):
+        for i in range(len(text) - n + 1):
+            out.add(text[i:i + n])
+    return out
+
+
+def _freeze(index: dict[str, list[int]]) -> dict[str, np.ndarray]:
+    return {k: np.asarray(v, dtype=np.int32) for k, v in index.items()}
+
+
+class SymbolDirectory:
+    """
+    코드/이름 표 + n-gram 역색인.
+    - 색인 대상: 코드, 소문자 이름, 이름의 초성 문자열
+    - 3자 이하 질의는 색인 자체가 정답, 4자 이상은 trigram 교집합 후 검증
+    """
+
+    def __init__(self, table: pd.DataFrame, day: str = ""):
+        self.day = day
+        self.table = table[COLUMNS].reset_index(drop=True)
+        self._codes = self.table["코드"].astype(str).tolist()
+        self._names = self.table["종목명"].astype(str).tolist()
+        self._markets = self.table["시장"].astype(str).to_numpy()
+        self._lower = [n.lower() for n in self._names]
+        self._chosung = [to_chosung(n) for n in self._lower]
+        self._row = {c: i for i, c in enumerate(self._codes)}
+        # 같은 코드가 여러 시장에 있으면 ETF 우선
+        for i in range(len(self._codes) - 1, -1, -1):
+            if self._markets[i] == "ETF":
+                self._row[self._codes[i]] = i
+
+        self._length = np.fromiter((len(n) for n in self._names), dtype=np.int32, count=len(self._names))
+
+        # n-gram 역색인(부분일치)과 필드별 접두 색인(정렬 가중치)
+        postings: dict[str, list[int]] = {}
+        prefixes: list[dict[str, list[int]]] = [{}, {}, {}]
+        for i in range(len(self._codes)):
+            fields = (self._codes[i].lower(), self._lower[i], self._chosung[i])
+            for g in _grams(fields[0]) | _grams(fields[1]) | _grams(fields[2]):
+                postings.setdefault(g, []).append(i)
+            for f, text in enumerate(fields):
+                for n in range(1, len(text) + 1):
+                    prefixes[f].setdefault(text[:n], []).append(i)
+        self._postings = _freeze(postings)
+        self._prefixes = [_freeze(p) for p in prefixes]
+        self._name_maps: dict[str | None, pd.Series] = {}
+
+    def __len__(self):
+        return len(self._codes)
+
+    # ---------- 조회 ----------
+    def name(self, code: str, default: str | None = None) -> str | None:
+        """코드(또는 .KS/.KQ 티커) → 종목명"""
+        i = self._row.get(code.split(".")[0])
+        return self._names[i] if i is not None else default
+
+    def names(self, market: str | None = None) -> pd.Series:
+        """코드 → 종목명 Series. Series.map에 바로 사용"""
+        s = self._name_maps.get(market)
+        if s is None:
+            t = self.table if market is None else self.table[self.table["시장"] == market]
+            t = t.drop_duplicates("코드")
+            s = self._name_maps[market] = pd.Series(t["종목명"].to_numpy(), index=t["코드"].to_numpy())
+        return s
+
+    # ---------- 검색 ----------
+    def _candidates(self, q: str) -> tuple[np.ndarray, bool]:
+        """(후보 행, 검증 필요 여부). 길이 3 이하 질의는 색인 결과가 곧 정답"""
+        empty = np.empty(0, dtype=np.int32)
+        if len(q) <= _NGRAM:
+            return self._postings.get(q, empty), False
+        grams = sorted({q[i:i + _NGRAM] for i in range(len(q) - _NGRAM + 1)},
+                       key=lambda g: len(self._postings.get(g, ())))
+        ids = self._postings.get(grams[0])
+        if ids is None:
+            return empty, False
+        for g in grams[1:]:
+            other = self._postings.get(g)
+            if other is None:
+                return empty, False
+            ids = np.intersect1d(ids, other, assume_unique=True)
+            if ids.size == 0:
+                break
+        return ids, True
+
+    def _match(self, i: int, q: str) -> bool:
+        return q in self._codes[i].lower() or q in self._lower[i] or q in self._chosung[i]
+
+    @instrument.traced("symbols.search")
+    def search(self, query: str, market: str | None = None, limit: int = 50) -> pd.DataFrame:
+        """
+        코드/이름/초성 부분일치 검색.
+        - 순서: 코드 일치 → 코드 접두 → 이름 접두 → 초성 접두 → 나머지(짧은 이름 우선)
+        - 반환: Ticker(.KS/.KQ), Name, Market
+        """
+        q = query.strip().lower()
+        ids, verify = self._candidates(q) if q else (np.empty(0, dtype=np.int32), False)
+        if market is not None and ids.size:
+            ids = ids[self._markets[ids] == market]
+        if ids.size:
+            # 접두 색인을 약한 순으로 덮어써서 가장 강한 일치가 남도록
+            rank = np.full(ids.size, 4, dtype=np.int8)
+            for r in (2, 1, 0):
+                hit = self._prefixes[r].get(q)
+                if hit is not None:
+                    rank[np.isin(ids, hit, assume_unique=True)] = r + 1
+            exact = self._row.get(q)
+            if exact is not None:
+                rank[ids == exact] = 0
+            ids = ids[np.lexsort((ids, self._length[ids], rank))]
+            # trigram은 연속성을 보장하지 않음 → 정렬 순서대로 검증하다 limit에서 중단
+            if verify:
+                out = []
+                for i in ids:
+                    if self._match(i, q):
+                        out.append(i)
+                        if len(out) >= limit:
+                            break
+                ids = out
+            else:
+                ids = ids[:limit]
+        return pd.DataFrame({
+            "Ticker": [yahoo_ticker(self._codes[i], self._markets[i]) for i in ids],
+            "Name": [self._names[i] for i in ids],
+            "Market": [self._markets[i] for i in ids],
+        })
+
+
+# ---------- 빌드/저장 ----------
+def _fetch_table() -> pd.DataFrame:
+    """pykrx로 전체 시장 코드/이름 표 조회. 이름 조회는 pykrx 내부 목록 캐시 사용"""
+    from pykrx import stock
+    frames = []
+    codes = stock.get_etf_ticker_list()
+    frames.append(pd.DataFrame({"코드": codes,
+                                "종목명": [stock.get_etf_ticker_name(c) for c in codes],
+                                "시장": "ETF"}))
+    for mk in ("KOSPI", "KOSDAQ"):
+        codes = stock.get_market_ticker_list(market=mk)
+        frames.append(pd.DataFrame({"코드": codes,
+                                    "종목명": [stock.get_market_ticker_name(c) for c in codes],
+                                    "시장": mk}))
+    return pd.concat(frames, ignore_index=True)[COLUMNS]
+
+
+def _path(day: str):
+    return SYMBOL_DIR / f"symbols_{day}.parquet"
+
+
+def load_or_build(day: str) -> SymbolDirectory:
+    """
+    day(YYYYMMDD) 디렉터리 반환.
+    - 디스크에 같은 날 파일이 있으면 그대로 사용
+    - 없으면 pykrx로 빌드 후 저장, 이전 날짜 파일은 정리
+    - 빌드 실패 시 가장 최근 파일, 그것도 없으면 빈 디렉터리
+    """
+    path = _path(day)
+    if path.exists():
+        return SymbolDirectory(pd.read_parquet(path), day)
+    try:
+        table = get_provider().call("pykrx", _fetch_table, timeout=180)
+        if table.empty:
+            raise ValueError("empty symbol table")
+    except Exception as e:
+        instrument.swallow("symbols.load_or_build", e)
+        olds = sorted(SYMBOL_DIR.glob("symbols_*.parquet"))
+        if olds:
+            return SymbolDirectory(pd.read_parquet(olds[-1]), olds[-1].stem.split("_")[-1])
+        return SymbolDirectory(pd.DataFrame(columns=COLUMNS), "")
+    SYMBOL_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    table.to_parquet(tmp, index=False)
+    tmp.replace(path)
+    for old in SYMBOL_DIR.glob("symbols_*.parquet"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    return SymbolDirectory(table, day)
+
+
+_lock = threading.Lock()
+_current: SymbolDirectory | None = None
+_checked: tuple[str, float] = ("", 0.0)  # (빌드 시도 날짜, 시각)
+RETRY_SEC = 600  # 빌드 실패로 이전 파일을 쓰는 동안 재시도 간격
+
+
+def get_directory() -> SymbolDirectory:
+    """프로세스 공용 디렉터리. 날짜가 바뀌면 재빌드"""
+    global _current, _checked
+    day = dt.date.today().strftime("%Y%m%d")
+    cur = _current
+    if cur is not None and (cur.day == day or
+                            (_checked[0] == day and time.monotonic() - _checked[1] < RETRY_SEC)):
+        return cur
+    with _lock:
+        if _current is None or (_current.day != day and
+                                (_checked[0] != day or time.monotonic() - _checked[1] >= RETRY_SEC)):
+            _current = load_or_build(day)
+            _checked = (day, time.monotonic())
+        return _current
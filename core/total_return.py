@@ -0,0 +1,254 @@
+# core/total_return.py
+"""
+분배금/분할 반영 총수익 지수.
+- 티커별 권리 이벤트(분배금, 분할)를 .data/events에 보관(하루 1회 재확인)
+- 총수익 지수는 저장소 종가 + 이벤트로 계산해 .data/total_return에 종가와 함께 저장
+  · 저장 종가와 처음 달라진 봉(보통 새 봉, 장중 봉 갱신)부터만 이어서 계산
+  · 이벤트가 바뀌면 전 구간 재계산
+- 일간 총수익 배수: (P_t × 분할비 + D_t) / P_{t-1}. 분할비는 분할 미반영 소스(pykrx)만 적용
+"""
+import datetime as dt
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from core import DATA_DIR, instrument
+from core.price_store import PriceStore, _safe, get_store
+from core.provider import get_provider
+from core.sources import ACTIONS, yf_actions
+
+EVENT_DIR = DATA_DIR / "events"
+TR_DIR = DATA_DIR / "total_return"
+EVENT_TTL = 24 * 3600
+RAW_SPLIT_SOURCES = {"pykrx"}   # 종가가 분할 미반영인 소스
+MAX_WORKERS = 8
+CALENDAR_COLS = ["날짜", "티커", "구분", "주당분배금", "수량", "금액"]
+
+
+def _empty_events() -> pd.DataFrame:
+    return pd.DataFrame(columns=ACTIONS, index=pd.DatetimeIndex([], name="Date"), dtype="float64")
+
+
+def _event_key(ev: pd.DataFrame) -> str:
+    """이벤트 변경 감지용 요약"""
+    if ev.empty:
+        return ""
+    return f"{len(ev)}:{ev.index[-1].date()}:{ev.to_numpy().sum():.10g}"
+
+
+def gross_returns(close: np.ndarray, dates: pd.DatetimeIndex, ev: pd.DataFrame,
+                  raw_split: bool = False) -> np.ndarray:
+    """
+    봉별 총수익 배수(첫 봉은 1).
+    - 휴장일 권리락은 다음 거래일에 반영, 첫 봉 이전/마지막 봉 이후 이벤트는 무시
+    - raw_split: 종가가 분할 미반영이면 분할일 수익률에 비율을 곱하고,
+      분할 반영 기준인 주당 분배금을 이후 분할 누적만큼 되돌림
+    """
+    n = len(close)
+    div = np.zeros(n)
+    split = np.ones(n)
+    if n and not ev.empty:
+        pos = dates.searchsorted(ev.index)
+        ok = (pos > 0) & (pos < n)
+        d = ev["Dividends"].to_numpy()
+        sp = np.where(ev["Splits"].to_numpy() > 0, ev["Splits"].to_numpy(), 1.0)
+        if raw_split:
+            later = np.append(np.cumprod(sp[::-1])[::-1][1:], 1.0)  # 이후 분할 누적
+            d = d / later
+            np.multiply.at(split, pos[ok], sp[ok])
+        np.add.at(div, pos[ok], d[ok])
+    g = np.ones(n)
+    g[1:] = (close[1:] * split[1:] + div[1:]) / close[:-1]
+    return g
+
+
+class TotalReturn:
+    """
+    이벤트 저장 + 총수익 지수 증분 계산.
+    - 메모리에도 티커별 이벤트/지수를 들고 있어 디스크 재읽기 최소화
+    """
+
+    def __init__(self, store: PriceStore | None = None, event_root=EVENT_DIR, root=TR_DIR,
+                 ttl: float = EVENT_TTL):
+        self.store = store or get_store()
+        self.event_root = event_root
+        self.root = root
+        self.ttl = ttl
+        self._events: dict[str, pd.DataFrame] = {}
+        self._checked: dict[str, float] = {}
+        self._index: dict[str, tuple[pd.DataFrame, dict]] = {}
+        self._lock = threading.Lock()
+
+    # ---------- 이벤트 ----------
+    def _event_paths(self, ticker: str):
+        base = self.event_root / _safe(ticker)
+        return base.with_suffix(".parquet"), base.with_suffix(".json")
+
+    def events(self, ticker: str) -> pd.DataFrame:
+        """저장된 이벤트(네트워크 없음). 없으면 빈 프레임"""
+        ev = self._events.get(ticker)
+        if ev is None:
+            ppath, mpath = self._event_paths(ticker)
+            try:
+                ev = pd.read_parquet(ppath)
+                self._checked[ticker] = json.loads(mpath.read_text(encoding="utf-8")).get("checked", 0)
+            except (OSError, ValueError):
+                ev = _empty_events()
+            self._events[ticker] = ev
+        return ev
+
+    def _stale_events(self, ticker: str, now: float) -> bool:
+        self.events(ticker)
+        return now - self._checked.get(ticker, 0) >= self.ttl
+
+    def refresh_events(self, tickers, max_workers: int = MAX_WORKERS) -> dict[str, str]:
+        """
+        오래된 티커만 이벤트 재조회(스레드 풀). 실패 시 저장본 유지.
+        - 반환: 티커별 실패 사유
+        """
+        now = dt.datetime.now().timestamp()
+        uniq = list(dict.fromkeys(tickers))
+        stale = [t for t in uniq if self._stale_events(t, now)]
+        instrument.cache("total_return.events", hits=len(uniq) - len(stale), misses=len(stale))
+        if not stale:
+            return {}
+        prov = get_provider()
+        errors: dict[str, str] = {}
+
+        def fetch(t):
+            try:
+                return t, prov.call("yfinance", yf_actions, t)
+            except Exception as e:
+                errors[t] = f"이벤트: {e}"
+                return t, None
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(stale))) as ex:
+            results = list(ex.map(fetch, stale))
+        self.event_root.mkdir(parents=True, exist_ok=True)
+        for t, ev in results:
+            if ev is None:
+                continue
+            ppath, mpath = self._event_paths(t)
+            tmp = ppath.with_suffix(".tmp")
+            ev.to_parquet(tmp)
+            tmp.replace(ppath)
+            mpath.write_text(json.dumps({"checked": now}), encoding="utf-8")
+            self._events[t], self._checked[t] = ev, now
+        return errors
+
+    # ---------- 총수익 지수 ----------
+    def _paths(self, ticker: str):
+        base = self.root / _safe(ticker)
+        return base.with_suffix(".parquet"), base.with_suffix(".json")
+
+    def _load(self, ticker: str):
+        hit = self._index.get(ticker)
+        if hit is None:
+            ppath, mpath = self._paths(ticker)
+            try:
+                hit = (pd.read_parquet(ppath), json.loads(mpath.read_text(encoding="utf-8")))
+            except (OSError, ValueError):
+                hit = (None, {})
+            self._index[ticker] = hit
+        return hit
+
+    def index(self, ticker: str) -> pd.Series:
+        """
+        총수익 지수(저장 첫 봉 = 1). 저장 종가와 같은 앞부분은 재사용.
+        """
+        close = self.store.read(ticker)["Close"].dropna().astype("float64")
+        if close.empty:
+            return pd.Series(dtype="float64", name=ticker)
+        ev = self.events(ticker)
+        src = self.store.meta(ticker).get("source")
+        meta = {"events": _event_key(ev), "source": src}
+        with self._lock:
+            old, m = self._load(ticker)
+            # 처음 달라진 봉 p: 그 앞은 기존 지수 그대로
+            p = 0
+            if old is not None and len(old) and m == meta and old.index[0] == close.index[0]:
+                k = min(len(old), len(close))
+                diff = ((old.index[:k] != close.index[:k]) | (old["Close"].to_numpy()[:k] != close.to_numpy()[:k]))
+                p = int(np.argmax(diff)) if diff.any() else k
+                if p == len(close) == len(old):
+                    instrument.cache("total_return.index", hits=1)
+                    return old["TR"].rename(ticker)
+            instrument.cache("total_return.index", misses=1)
+            c = close.to_numpy()
+            tr = np.empty(len(c))
+            if p > 0:
+                tr[:p] = old["TR"].to_numpy()[:p]
+                g = gross_returns(c[p - 1:], close.index[p - 1:], ev, src in RAW_SPLIT_SOURCES)[1:]
+                tr[p:] = tr[p - 1] * np.cumprod(g)
+            else:
+                tr = np.cumprod(gross_returns(c, close.index, ev, src in RAW_SPLIT_SOURCES))
+            frame = pd.DataFrame({"Close": c, "TR": tr}, index=close.index)
+            self.root.mkdir(parents=True, exist_ok=True)
+            ppath, mpath = self._paths(ticker)
+            tmp = ppath.with_suffix(".tmp")
+            frame.to_parquet(tmp)
+            tmp.replace(ppath)
+            mpath.write_text(json.dumps(meta), encoding="utf-8")
+            self._index[ticker] = (frame, meta)
+        return frame["TR"].rename(ticker)
+
+    def adjusted(self, ticker: str, start: dt.date | None = None) -> pd.Series:
+        """
+        수정 종가(분배금 재투자). 마지막 값 = 마지막 종가가 되도록 지수 배율 조정.
+        - start 이후만 슬라이스
+        """
+        tr = self.index(ticker)
+        if tr.empty:
+            return tr
+        frame = self._index[ticker][0]
+        s = tr * (frame["Close"].iloc[-1] / tr.iloc[-1])
+        if start is not None:
+            s = s[s.index >= pd.Timestamp(start)]
+        return s.astype("float64")
+
+    # ---------- 분배금 달력 ----------
+    def dividend_calendar(self, holdings: pd.DataFrame, months: int = 12,
+                          today: dt.date | None = None) -> pd.DataFrame:
+        """
+        보유 수량(티커/수량) 기준 분배금 현금흐름.
+        - 지급: 최근 months개월 권리락 분배금 × 현재 수량(보유 기간 무시 근사)
+        - 예상: 1년 전 같은 시기 분배금을 1년 뒤로 옮긴 것(앞으로 months개월)
+        """
+        today = pd.Timestamp(today or dt.date.today())
+        qty = holdings.assign(티커=holdings["티커"].astype(str).str.strip()) \
+            .groupby("티커")["수량"].sum().astype("float64")
+        qty = qty[qty > 0]
+        frames = []
+        for t in qty.index:
+            ev = self.events(t)
+            d = ev.loc[ev["Dividends"] > 0, "Dividends"]
+            if not d.empty:
+                frames.append(pd.DataFrame({"날짜": d.index, "티커": t, "주당분배금": d.to_numpy()}))
+        if not frames:
+            return pd.DataFrame(columns=CALENDAR_COLS)
+        ev = pd.concat(frames, ignore_index=True)
+        lo, hi = today - relativedelta(months=months), today + relativedelta(months=months)
+        paid = ev[(ev["날짜"] > lo) & (ev["날짜"] <= today)].assign(구분="지급")
+        nxt = ev.assign(날짜=ev["날짜"] + pd.DateOffset(years=1))
+        nxt = nxt[(nxt["날짜"] > today) & (nxt["날짜"] <= hi)].assign(구분="예상")
+        out = pd.concat([paid, nxt], ignore_index=True)
+        out["수량"] = out["티커"].map(qty).to_numpy()
+        out["금액"] = out["주당분배금"] * out["수량"]
+        return out[CALENDAR_COLS].sort_values(["날짜", "티커"]).reset_index(drop=True)
+
+
+_tr: TotalReturn | None = None
+_tr_lock = threading.Lock()
+
+
+def get_total_return() -> TotalReturn:
+    """프로세스 공용 총수익 계산기"""
+    global _tr
+    with _tr_lock:
+        if _tr is None:
+            _tr = TotalReturn()
+        return _tr
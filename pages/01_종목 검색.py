@@ -1,63 +1,24 @@
 # pages/01_🏆_종목검색.py
-import datetime as dt
-import pandas as pd
 import streamlit as st
-from pykrx import stock
+from core import market
+from core.screener import CONDITIONS, get_archive, screen
 
 st.set_page_config(layout="wide", page_title="종목 순위")
 st.title("🏆 종목 검색")
 
 # ---------- 옵션 ----------
-scope = st.selectbox("범위", ["KOSPI", "KOSDAQ", "KOSPI+KOSDAQ", "ETF"], index=0)
+scope = st.selectbox("범위", list(market.SCOPES), index=0)
 metric = st.selectbox("지표", ["거래대금", "거래량", "등락률"], index=0)
 topn = st.slider("개수", 5, 100, 20, step=5)
 reload_btn = st.button("새로고침")
 
-# ---------- 유틸 ----------
-def _bizday(when=None) -> str:
-    """오늘이 휴장일이면 가장 가까운 영업일로 보정"""
-    d = (when or dt.date.today()).strftime("%Y%m%d")
-    return stock.get_nearest_business_day_in_a_week(d)
-
-@st.cache_data(ttl=300, show_spinner=False)
-def load_equity_ohlcv(date:str, market:str) -> pd.DataFrame:
-    """주식 OHLCV + 종목명"""
-    df = stock.get_market_ohlcv_by_ticker(date, market=market)
-    df = df.rename_axis("종목코드").reset_index()
-    df["종목명"] = df["종목코드"].map(stock.get_market_ticker_name)
-    df["시장"] = market
-    return df
-
-@st.cache_data(ttl=300, show_spinner=False)
-def load_etf_ohlcv(date:str) -> pd.DataFrame:
-    """ETF OHLCV + 종목명"""
-    df = stock.get_etf_ohlcv_by_ticker(date)
-    df = df.rename_axis("종목코드").reset_index()
-    df["종목명"] = df["종목코드"].map(stock.get_etf_ticker_name)
-    df["시장"] = "ETF"
-    # pykrx ETF에는 등락률 컬럼이 없을 수 있음 → 종가/시가로 근사
-    if "등락률" not in df.columns and {"시가","종가"}.issubset(df.columns):
-        df["등락률"] = (df["종가"] / df["시가"] - 1.0) * 100
-    return df
-
-def load_scope(date:str, scope:str) -> pd.DataFrame:
-    if scope == "KOSPI":
-        return load_equity_ohlcv(date, "KOSPI")
-    if scope == "KOSDAQ":
-        return load_equity_ohlcv(date, "KOSDAQ")
-    if scope == "KOSPI+KOSDAQ":
-        return pd.concat([
-            load_equity_ohlcv(date, "KOSPI"),
-            load_equity_ohlcv(date, "KOSDAQ"),
-        ], ignore_index=True)
-    return load_etf_ohlcv(date)
-
 # ---------- 로드 ----------
+# 시장당 요청 1회(5분 캐시), 종목명은 일별 디렉터리에서 일괄 매핑
 try:
     if reload_btn:
-        st.cache_data.clear()
-    d = _bizday()
-    df = load_scope(d, scope)
+        market.clear()
+    d = market.bizday()
+    df = market.snapshot(d, scope)
 except Exception as e:
     st.error(f"데이터 로드 실패: {e}")
     st.stop()
@@ -68,11 +29,8 @@ if metric not in valid_cols:
     st.warning(f"선택한 지표 '{metric}'는 {scope}에 없음. 사용 가능: {', '.join(valid_cols)}")
     metric = valid_cols[0]
 
-# NaN 제거 후 정렬
-base = df.dropna(subset=[metric]).copy()
-ascending = True if metric == "등락률" and base[metric].max() <= 0 else False
-# 등락률은 보통 상위 상승률을 보므로 내림차순. 전종목 음수면 상승 없음 → 내림차순 유지해도 무방.
-ranked = base.sort_values(metric, ascending=False).head(topn)
+# NaN 제외 상위 N개만 부분 선택. 등락률도 상위 상승률을 보므로 내림차순
+ranked = market.top_n(df, metric, topn)
 
 # ---------- 출력 ----------
 cols_show = ["종목코드","종목명","시장","거래대금","거래량","등락률","시가","고가","저가","종가"]
@@ -84,4 +42,42 @@ st.dataframe(
     hide_index=True,
 )
 
+# ---------- 기간 스크리너 ----------
+st.subheader("기간 스크리너")
+st.caption("거래일별 전체 시세를 로컬에 보관하고, 빠진 날짜만 받아 여러 날에 걸친 조건으로 순위 계산")
+sc1, sc2, sc3, sc4 = st.columns(4)
+with sc1:
+    cond = st.selectbox("조건", list(CONDITIONS), index=0)
+with sc2:
+    n_days = st.number_input("N(거래일)", 1, 250, 20)
+with sc3:
+    sc_scope = st.selectbox("범위", list(market.SCOPES), index=2, key="screener_scope")
+with sc4:
+    sc_top = st.number_input("상위", 5, 500, 50, step=5)
+
+if st.button("스크리닝"):
+    bar = st.progress(0.0, text="보관본 확인 중...")
+    screened, sc_errors = screen(cond, sc_scope, int(n_days), int(sc_top),
+                                 progress=lambda i, n: bar.progress(i / n, text=f"빠진 거래일 수집 {i}/{n}"))
+    bar.empty()
+    if sc_errors:
+        st.warning(f"수집 실패 {len(sc_errors)}건: " + ", ".join(list(sc_errors)[:5]))
+    if screened.empty:
+        st.info("보관된 거래일이 없습니다.")
+    else:
+        first, last, count = screened.attrs["기간"]
+        st.caption(f"{first} ~ {last} · 거래일 {count}개 · {sc_scope} · {cond}(N={n_days})")
+        st.dataframe(screened, use_container_width=True, hide_index=True)
+with st.expander("보관 현황"):
+    arch = get_archive()
+    st.dataframe(
+        [{"시장": m, "보관 거래일": len(ds), "처음": ds[0] if ds else "-", "마지막": ds[-1] if ds else "-",
+          "빈 응답 표시": len(arch.empty_days(m))}
+         for m in ("KOSPI", "KOSDAQ", "ETF") for ds in [arch.days(m)]],
+        use_container_width=True, hide_index=True,
+    )
+    # 빈 응답 표시는 하루 뒤 자동 재시도. 바로 다시 받으려면 지움
+    if st.button("빈 응답 표시 지우기"):
+        st.success(f"{arch.clear_empty()}건 삭제. 다음 스크리닝 때 다시 수집합니다.")
+
 st.caption("원천: KRX · pykrx. 일중 수치는 변동 가능. 검색량 지표는 외부 트렌드 데이터 연동이 필요함.")
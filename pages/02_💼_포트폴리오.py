@@ -1,10 +1,29 @@
 # pages/02_💼_포트폴리오.py
+import re
 import numpy as np
 import pandas as pd
-import yfinance as yf
 import streamlit as st
 from dateutil.relativedelta import relativedelta
+import altair as alt
 from datetime import date
+from core.sim import MODES, project
+from core.montecarlo import simulate
+from core.stats import annual_params
+from core.batch import load_many
+from core.backtest import backtest, price_matrix
+from core.sweep import ENGINES, run_sweep, weight_grid
+from core.quotes import get_quotes, value_holdings
+from core.ledger import SIDES, LedgerError, get_ledger
+from core.total_return import get_total_return
+from core.fx import BASES, SYMBOLS, get_fx
+from core.lookthrough import get_lookthrough
+from core.accounts import KINDS, by_account, consolidate, current_weights, get_accounts, rebalance_plan
+from core import instrument
+from core.goals import (SOLVE_CONTRIB, SOLVE_MONTHS, SOLVES, contribution_for_probability, contribution_needed,
+                        get_goalbook, months_needed, path_finals, return_needed, success_probability)
+from core.reports import FORMATS as REPORT_FORMATS, TOTAL, annual, get_reports
+from core.reports import export as export_report, view as report_view
+from core.optimize import estimate, frontier, max_sharpe, min_variance, risk_contrib, risk_parity
 
 st.set_page_config(layout="wide")
 st.title("💼 포트폴리오")
@@ -17,28 +36,64 @@ lc, rc = st.columns([1,1])
 with lc:
     st.subheader("현재 보유")
     st.caption("직접 입력하거나 가격 자동가져오기 체크")
-    auto_price = st.checkbox("가격 자동가져오기(yfinance)", value=True)
-    holdings_df = st.data_editor(
-        pd.DataFrame(
-            [
-                {"티커":"VOO","수량":10.0,"평단가":400.0},
-                {"티커":"TLT","수량":50.0,"평단가":90.0},
-                {"티커":"IAU","수량":100.0,"평단가":40.0},
-            ]
-        ),
-        num_rows="dynamic",
-        use_container_width=True,
-        key="holdings_editor"
-    )
+    pc1, pc2 = st.columns([2,1])
+    with pc1:
+        auto_price = st.checkbox("가격 자동가져오기(yfinance)", value=True)
+    with pc2:
+        quote_ttl = st.number_input("시세 캐시(초)", 5, 600, 30, step=5, disabled=not auto_price)
+    # 거래 원장 선택 시 미청산 lot 기준 수량/평단가 사용, 계좌 선택 시 저장된 전 계좌 보유
+    hold_src = st.radio("보유 출처", ["직접 입력", "거래 원장", "계좌"], horizontal=True)
+    if hold_src == "거래 원장":
+        holdings_df = get_ledger().holdings()[["티커","수량","평단가"]]
+        st.dataframe(holdings_df, use_container_width=True, hide_index=True)
+    elif hold_src == "계좌":
+        accts = get_accounts()
+        with st.expander("계좌 관리", expanded=not accts.names()):
+            with st.form("account_form", clear_on_submit=True):
+                a1, a2, a3 = st.columns([2,1,1])
+                new_name = a1.text_input("새 계좌 이름", placeholder="예: 연금저축 A증권")
+                new_kind = a2.selectbox("종류", KINDS)
+                if a3.form_submit_button("계좌 추가"):
+                    try:
+                        accts.add_account(new_name, new_kind)
+                    except ValueError as e:
+                        st.error(str(e))
+            if accts.names():
+                edit_acct = st.selectbox("편집할 계좌", accts.names())
+                edited = st.data_editor(accts.holdings([edit_acct])[["티커","수량","평단가"]],
+                                        num_rows="dynamic", use_container_width=True, key=f"acct_{edit_acct}")
+                b1, b2 = st.columns(2)
+                if b1.button("보유 저장"):
+                    accts.set_holdings(edit_acct, edited)
+                    st.rerun()
+                if b2.button("계좌 삭제"):
+                    accts.remove_account(edit_acct)
+                    st.rerun()
+        picked = st.multiselect("포함 계좌", accts.names(), default=accts.names())
+        holdings_df = accts.holdings(picked)
+        st.dataframe(accts.accounts(), use_container_width=True, hide_index=True)
+    else:
+        holdings_df = st.data_editor(
+            pd.DataFrame(
+                [
+                    {"티커":"VOO","수량":10.0,"평단가":400.0},
+                    {"티커":"TLT","수량":50.0,"평단가":90.0},
+                    {"티커":"IAU","수량":100.0,"평단가":40.0},
+                ]
+            ),
+            num_rows="dynamic",
+            use_container_width=True,
+            key="holdings_editor"
+        )
 
 with rc:
     st.subheader("목표 비중")
     target_df = st.data_editor(
         pd.DataFrame(
             [
-                {"자산":"미국주식(VOO)","티커":"VOO","비중(%)":50.0,"기대수익률(연,%)":7.0},
-                {"자산":"장기채(TLT)","티커":"TLT","비중(%)":30.0,"기대수익률(연,%)":3.0},
-                {"자산":"금(IAU)","티커":"IAU","비중(%)":20.0,"기대수익률(연,%)":2.0},
+                {"자산":"미국주식(VOO)","티커":"VOO","비중(%)":50.0,"기대수익률(연,%)":7.0,"변동성(연,%)":16.0},
+                {"자산":"장기채(TLT)","티커":"TLT","비중(%)":30.0,"기대수익률(연,%)":3.0,"변동성(연,%)":14.0},
+                {"자산":"금(IAU)","티커":"IAU","비중(%)":20.0,"기대수익률(연,%)":2.0,"변동성(연,%)":15.0},
             ]
         ),
         num_rows="dynamic",
@@ -46,58 +101,192 @@ with rc:
         key="target_editor"
     )
 
+# 기준 통화: 보유 평가, 백테스트, 시뮬레이션 금액 모두 이 통화로
+base_ccy = st.selectbox("기준 통화", BASES, index=0)
+sym = SYMBOLS[base_ccy]
+
 # 현금흐름·기간
 st.subheader("적립/기간 가정")
 cc1, cc2, cc3, cc4 = st.columns([1,1,1,1])
 with cc1:
-    start_nav = st.number_input("초기 현금(₩, 보유 외 현금)", 0, 10_000_000_000, 0, step=100_000)
+    start_nav = st.number_input(f"초기 현금({sym}, 보유 외 현금)", 0, 10_000_000_000, 0, step=100_000)
 with cc2:
-    monthly_contrib = st.number_input("월 적립(₩)", 0, 10_000_000_000, 500_000, step=100_000)
+    monthly_contrib = st.number_input(f"월 적립({sym})", 0, 10_000_000_000, 500_000, step=100_000)
 with cc3:
     years = st.number_input("기간(년)", 1, 50, 5)
 with cc4:
-    rebalance = st.selectbox("리밸런싱", ["적립금만 비중 맞추기","매월 정밀 리밸런스"], index=0)
-
-base_ccy = "KRW"
-fx_krw_per_usd = st.number_input("환율 가정 KRW/USD", 500, 5000, 1400)
+    rebalance = st.selectbox("리밸런싱", MODES, index=0)
 
-# 가격 가져오기
-def last_price(ticker: str):
-    try:
-        if auto_price:
-            tk = yf.Ticker(ticker)
-            fi = getattr(tk, "fast_info", None)
-            p = fi.get("last_price", None) if fi else None
-            if p is None:
-                h = yf.download(ticker, period="1d", interval="1m", progress=False)
-                if not h.empty:
-                    p = float(h["Close"].dropna().iloc[-1])
-            return float(p) if p is not None else None
-        else:
-            return None
-    except Exception:
-        return None
-
-# 보유 평가
+# 보유 평가: 보유 티커 시세와 필요한 환율을 각각 한 번에 조회(짧은 TTL 캐시) 후 일괄 계산
+@instrument.traced("portfolio.evaluate_holdings")
 def evaluate_holdings(df: pd.DataFrame):
-    vals = []
-    for _, r in df.iterrows():
-        t = str(r["티커"]).strip()
-        q = float(r.get("수량",0) or 0)
-        avg = float(r.get("평단가",0) or 0)
-        px = last_price(t)
-        if px is None:
-            px = avg if avg>0 else 0.0
-        # 달러 자산 가정: KRW 환산 필요. 간단히 모두 USD로 가정.
-        mv_krw = q * px * fx_krw_per_usd
-        vals.append({"티커":t,"수량":q,"가격(USD)":px,"평단가(USD)":avg,"평가액(KRW)":mv_krw})
-    out = pd.DataFrame(vals)
-    return out, out["평가액(KRW)"].sum()
-
-hold_eval, total_mv = evaluate_holdings(holdings_df)
+    fx = get_fx()
+    ccy = fx.currencies(df["티커"].fillna(""))
+    rates = fx.spot(ccy.unique(), base_ccy, ttl=quote_ttl)
+    prices = get_quotes().quotes(df["티커"], ttl=quote_ttl) if auto_price else None
+    out = value_holdings(df, prices, ccy.map(rates), ccy)
+    if "계좌" in df.columns:
+        out.insert(0, "계좌", df["계좌"].to_numpy())
+    return out, out["평가액"].sum(), rates
+
+hold_eval, total_mv, fx_rates = evaluate_holdings(holdings_df)
 st.subheader("현재 평가")
-st.dataframe(hold_eval, use_container_width=True, hide_index=True)
-st.metric("현재 총 평가액(KRW)", f"{int(total_mv):,}")
+if "계좌" in hold_eval.columns:
+    # 전 계좌 평가 1회 → 티커별/계좌별 요약은 groupby 한 번씩
+    v1, v2, v3 = st.tabs(["통합(티커별)", "계좌별", "전체"])
+    v1.dataframe(consolidate(hold_eval).style.format({"수량": "{:,.4g}", "가격": "{:,.2f}", "평단가": "{:,.2f}",
+                                                      "평가액": "{:,.0f}", "원가": "{:,.0f}", "비중": "{:.1%}"}),
+                 use_container_width=True, hide_index=True)
+    v2.dataframe(by_account(hold_eval).style.format({"평가액": "{:,.0f}", "원가": "{:,.0f}", "손익": "{:+,.0f}",
+                                                     "비중": "{:.1%}"}),
+                 use_container_width=True, hide_index=True)
+    v3.dataframe(hold_eval, use_container_width=True, hide_index=True)
+else:
+    st.dataframe(hold_eval, use_container_width=True, hide_index=True)
+st.metric(f"현재 총 평가액({base_ccy})", f"{total_mv:,.0f}")
+if fx_rates.isna().any():
+    st.warning("환율 없음(평가 제외): " + ", ".join(fx_rates.index[fx_rates.isna()]))
+if len(fx_rates) > 1:
+    st.caption("적용 환율: " + " · ".join(f"1 {c} = {r:,.4g} {base_ccy}" for c, r in fx_rates.items() if c != base_ccy))
+
+# ---------- 자산 구성(투시) ----------
+# KRX ETF는 구성 종목(PDF)까지 펼쳐 종목/섹터/자산군 비중 계산. 희소 행렬 곱 1회
+if st.toggle("자산군/섹터 비중(ETF 투시)", value=False):
+    with st.spinner("ETF 구성 확인 중..."):
+        expo = get_lookthrough().exposure(hold_eval.set_index("티커")["평가액"])
+    if expo.security.empty:
+        st.info("평가액이 있는 보유가 없습니다.")
+    else:
+        def _donut(s: pd.Series, label: str):
+            df = s.rename("금액").rename_axis(label).reset_index()
+            df["비중"] = df["금액"] / df["금액"].sum()
+            return alt.Chart(df).mark_arc(innerRadius=50).encode(
+                theta="금액:Q", color=alt.Color(f"{label}:N", sort="-theta"),
+                tooltip=[label, alt.Tooltip("금액:Q", format=",.0f"), alt.Tooltip("비중:Q", format=".1%")],
+            ).properties(height=280)
+        e1, e2 = st.columns(2)
+        e1.altair_chart(_donut(expo.asset, "자산군"), use_container_width=True)
+        e2.altair_chart(_donut(expo.sector.head(15), "섹터"), use_container_width=True)
+        st.dataframe(expo.security.head(100).style.format({"금액": "{:,.0f}", "비중": "{:.2%}"}),
+                     use_container_width=True, hide_index=True)
+        st.caption(f"구성 종목 {len(expo.security):,}개 · 금액 {base_ccy} · 섹터 상위 15개 표시"
+                   + (f" · 투시 안 함: {', '.join(expo.direct)}" if expo.direct else ""))
+
+# ---------- 거래 내역 ----------
+# 추가 전용 원장. 거래 1건 추가 시 해당 티커의 닿는 lot만 갱신(전체 재계산 없음)
+st.subheader("거래 내역")
+ledger = get_ledger()
+with st.expander("거래 입력", expanded=False):
+    with st.form("trade_form", clear_on_submit=True):
+        f1, f2, f3, f4, f5, f6 = st.columns([1.2,1,1,1,1,1])
+        tr_date = f1.date_input("날짜", value=date.today())
+        tr_ticker = f2.text_input("티커")
+        tr_side = f3.selectbox("구분", SIDES, help="분할: 수량 칸에 비율(2:1 분할이면 2)")
+        tr_qty = f4.number_input("수량", 0.0, step=1.0)
+        tr_price = f5.number_input("가격", 0.0, step=0.01)
+        tr_fee = f6.number_input("수수료", 0.0, step=0.01)
+        if st.form_submit_button("추가"):
+            try:
+                ledger.add({"날짜": tr_date, "티커": tr_ticker, "구분": tr_side,
+                            "수량": tr_qty, "가격": tr_price, "수수료": tr_fee})
+                st.success("기록했습니다.")
+            except LedgerError as e:
+                st.error(str(e))
+    # CSV 일괄 추가: 날짜,티커,구분,수량,가격,수수료[,메모]. 날짜순(같은 날은 파일 순서)으로 처리,
+    # 티커별 마지막 거래일보다 이른 행이 있으면 전체 거부
+    up = st.file_uploader("CSV 일괄 추가", type=["csv"], key="ledger_csv")
+    if up is not None and st.button("CSV 기록"):
+        try:
+            n = ledger.add(*pd.read_csv(up, dtype={"티커": str}).to_dict("records"))
+            ledger.snapshot()
+            st.success(f"{n:,}건 기록")
+        except (LedgerError, KeyError, ValueError) as e:
+            st.error(f"기록 안 함: {e}")
+
+if ledger.count:
+    pnl_px = get_quotes().quotes(ledger.holdings()["티커"], ttl=quote_ttl) if auto_price else None
+    pnl = ledger.pnl(pnl_px)
+    m1, m2, m3 = st.columns(3)
+    m1.metric("거래 수", f"{ledger.count:,}")
+    m2.metric("실현손익(거래 통화)", f"{pnl['실현손익'].sum():,.2f}")
+    if "미실현손익" in pnl:
+        m3.metric("미실현손익(거래 통화)", f"{pnl['미실현손익'].sum():,.2f}")
+    st.dataframe(pnl.style.format(precision=2, thousands=","), use_container_width=True, hide_index=True)
+    with st.expander("매도별 실현 내역 / 최근 거래"):
+        st.dataframe(ledger.realized_log(tail=500), use_container_width=True, hide_index=True)
+        st.dataframe(ledger.trades(tail=200), use_container_width=True, hide_index=True)
+else:
+    st.caption("기록된 거래가 없습니다.")
+
+# ---------- 성과 리포트 ----------
+# 마감된 달은 저장된 월 요약을 그대로 사용, 새로 마감된 달만 추가. 진행 중인 달만 매번 계산
+st.subheader("성과 리포트")
+if ledger.count and st.toggle("월간/연간 성과(거래 원장 기준)", value=False):
+    rep_monthly = get_reports(base_ccy).monthly()
+    rep_annual = annual(rep_monthly)
+    who = st.selectbox("대상", [TOTAL] + sorted(set(rep_monthly["티커"]) - {TOTAL}), key="rep_who")
+    mv = report_view(rep_monthly[rep_monthly["티커"] == who])
+    av = report_view(rep_annual[rep_annual["티커"] == who])
+    last = mv.iloc[-1] if len(mv) else None
+    if last is not None:
+        p1, p2, p3, p4 = st.columns(4)
+        p1.metric(f"{last['기간']} 수익률(금액 가중)", f"{last['수익률(MD)']:.2%}")
+        p2.metric("시간가중", f"{last['시간가중']:.2%}")
+        p3.metric("연환산 변동성", f"{last['변동성(연)']:.1%}")
+        p4.metric("월중 최대 낙폭", f"{last['MDD']:.1%}")
+    chart_df = mv.tail(36).melt(id_vars="기간", value_vars=["수익률(MD)", "시간가중"], var_name="구분", value_name="수익률")
+    st.altair_chart(
+        alt.Chart(chart_df).mark_bar().encode(
+            x=alt.X("기간:O", title=""), xOffset="구분:N", y=alt.Y("수익률:Q", title="", axis=alt.Axis(format="%")),
+            color=alt.Color("구분:N", title=""), tooltip=["기간", "구분", alt.Tooltip("수익률:Q", format=".2%")],
+        ).properties(height=240),
+        use_container_width=True,
+    )
+    pct = {c: "{:.2%}" for c in ["수익률(MD)", "시간가중", "변동성(연)", "MDD"]}
+    money = {c: "{:,.0f}" for c in ["시작평가", "기말평가", "순유입", "손익"]}
+    tab_y, tab_m, tab_all = st.tabs(["연간", "월간", "전체 티커(월간)"])
+    with tab_y:
+        st.dataframe(av.style.format({**pct, **money}, na_rep="-"), use_container_width=True, hide_index=True)
+    with tab_m:
+        st.dataframe(mv.iloc[::-1].style.format({**pct, **money}, na_rep="-"), use_container_width=True, hide_index=True)
+    with tab_all:
+        st.dataframe(report_view(rep_monthly).iloc[::-1].style.format({**pct, **money}, na_rep="-"),
+                     use_container_width=True, hide_index=True)
+    e1, e2, e3 = st.columns([1, 1, 2])
+    rep_fmt = e1.radio("형식", REPORT_FORMATS, horizontal=True, key="rep_fmt")
+    ext = "csv" if rep_fmt == "CSV" else "parquet"
+    e2.download_button("월간 내려받기", export_report(report_view(rep_monthly), rep_fmt),
+                       file_name=f"monthly_{base_ccy}.{ext}")
+    e3.download_button("연간 내려받기", export_report(report_view(rep_annual), rep_fmt),
+                       file_name=f"annual_{base_ccy}.{ext}")
+    st.caption(f"금액 {base_ccy} · 수익률(MD)=수정 디츠(유입 시점 가중) · 시간가중=일별 연결 · "
+               "유입은 매수 금액+수수료, 유출은 매도 금액. 이번 달은 오늘까지")
+
+# ---------- 분배금 ----------
+st.subheader("분배금")
+if st.toggle("분배금 달력", value=False):
+    trs = get_total_return()
+    hold_q = holdings_df.dropna(subset=["티커"])
+    ev_err = trs.refresh_events(hold_q["티커"].astype(str).str.strip())
+    if ev_err:
+        st.warning("이벤트 조회 실패(저장본 사용): " + ", ".join(ev_err))
+    cal = trs.dividend_calendar(hold_q)
+    if cal.empty:
+        st.info("최근 1년 분배금 이력이 없습니다.")
+    else:
+        d1, d2 = st.columns(2)
+        d1.metric("최근 12개월 지급(거래 통화)", f"{cal.loc[cal['구분']=='지급','금액'].sum():,.2f}")
+        d2.metric("향후 12개월 예상(거래 통화)", f"{cal.loc[cal['구분']=='예상','금액'].sum():,.2f}")
+        monthly = cal.assign(월=cal["날짜"].dt.strftime("%Y-%m")).groupby(["월","구분"], as_index=False)["금액"].sum()
+        st.altair_chart(
+            alt.Chart(monthly).mark_bar().encode(
+                x=alt.X("월:O", title=""), y=alt.Y("금액:Q", title=""), color=alt.Color("구분:N", title=""),
+                tooltip=["월", "구분", alt.Tooltip("금액:Q", format=",.2f")],
+            ).properties(height=240),
+            use_container_width=True,
+        )
+        st.dataframe(cal, use_container_width=True, hide_index=True)
+        st.caption("지급은 현재 수량 기준 근사. 예상은 작년 같은 시기 분배금 반복 가정.")
 
 # 목표 비중 표준화
 tgt = target_df.copy()
@@ -108,82 +297,359 @@ if weight_sum <= 0:
 tgt["비중"] = tgt["비중"] / weight_sum
 tgt["월수익률"] = ((1.0 + tgt["기대수익률(연,%)"].astype(float)/100.0) ** (1/12.0)) - 1.0
 
-# 현재 비중 계산
-cur_weights = {}
-if total_mv > 0:
-    for _, r in hold_eval.iterrows():
-        cur_weights[r["티커"]] = cur_weights.get(r["티커"],0.0) + r["평가액(KRW)"]/total_mv
-
-# 리밸런싱 제안(금액 기준)
-plan_rows = []
-for _, r in tgt.iterrows():
-    tkr = r["티커"]
-    tw = float(r["비중"])
-    cw = float(cur_weights.get(tkr,0.0))
-    delta_w = tw - cw
-    # 제안 금액 = 목표-현재 * 총평가
-    plan_amt = int(delta_w * total_mv)
-    plan_rows.append({"티커":tkr,"현재비중":round(cw*100,2),"목표비중":round(tw*100,2),"제안금액(KRW)":plan_amt})
+# 현재 비중(전 계좌 합산 티커별)
+cur_weights = current_weights(hold_eval)
+
+# 리밸런싱 제안(금액 기준): (목표-현재) × 총평가, 목표 표 행 단위 배열 계산
 st.subheader("리밸런싱 제안")
-st.dataframe(pd.DataFrame(plan_rows), use_container_width=True, hide_index=True)
+st.dataframe(rebalance_plan(tgt["티커"], tgt["비중"], cur_weights, total_mv, base_ccy),
+             use_container_width=True, hide_index=True)
 
-# 단순 미래 추정: 월 적립 + 기대수익률, 월별
+# 단순 미래 추정: 월 적립 + 기대수익률, 월별(자산 × 월 배열 엔진)
 months = int(years * 12)
 timeline = pd.date_range(date.today(), periods=months+1, freq="MS")
-nav = []
-alloc_amt = {r["티커"]: 0.0 for _, r in tgt.iterrows()}  # KRW 기준
 
-# 초기: 보유 평가액 + 현금
+# 같은 티커가 여러 줄이면 비중 합산
+tgt_g = tgt.groupby("티커", sort=False).agg(비중=("비중","sum"), 월수익률=("월수익률","last"))
+tickers = tgt_g.index.tolist()
+
+# 초기 분해: 현재 보유 중 동일 티커는 해당 금액만큼 시작, 매핑 안 된 금액은 현금으로 간주
 nav0 = total_mv + start_nav
-nav.append(nav0)
-
-def rebalance_step(alloc_amt: dict, target_weights: dict, total_amt: float):
-    # 총액을 목표 비중으로 재분배
-    for k in target_weights:
-        alloc_amt[k] = total_amt * target_weights[k]
-    return alloc_amt
-
-tgt_w = {r["티커"]: float(r["비중"]) for _, r in tgt.iterrows()}
-tgt_mu_m = {r["티커"]: float(r["월수익률"]) for _, r in tgt.iterrows()}
-
-# 초기 분해: 현재 보유는 티커 매핑되지 않은 금액은 현금으로 간주
-for k in list(alloc_amt.keys()):
-    # 현재 보유 중 동일 티커는 해당 금액만큼 시작
-    amt = float(hold_eval.loc[hold_eval["티커"]==k, "평가액(KRW)"].sum())
-    alloc_amt[k] = amt
-
-other_amt = nav0 - sum(alloc_amt.values())
-if other_amt < 0:
-    other_amt = 0.0
-
-for i in range(1, months+1):
-    # 1) 수익 반영
-    for k in alloc_amt:
-        alloc_amt[k] *= (1.0 + tgt_mu_m[k])
-    # 2) 적립금 투입
-    invest_pool = monthly_contrib + other_amt
-    other_amt = 0.0
-    if rebalance == "매월 정밀 리밸런스":
-        # 총액 재산정 후 목표비중으로 재분배
-        total_now = sum(alloc_amt.values()) + invest_pool
-        alloc_amt = rebalance_step(alloc_amt, tgt_w, total_now)
-    else:
-        # 적립금만 목표 비중으로 배분
-        for k in alloc_amt:
-            alloc_amt[k] += invest_pool * tgt_w[k]
-    # 3) NAV 기록
-    nav.append(sum(alloc_amt.values()))
+init_alloc = hold_eval.groupby("티커")["평가액"].sum().reindex(tickers, fill_value=0.0).to_numpy()
+other_amt = max(nav0 - init_alloc.sum(), 0.0)
 
-nav_series = pd.Series(nav, index=timeline)
+proj = project(init_alloc, tgt_g["월수익률"].to_numpy(), tgt_g["비중"].to_numpy(),
+               monthly_contrib, months, mode=rebalance, other=other_amt)
+nav_series = pd.Series(proj.nav, index=timeline)
+alloc_df = pd.DataFrame(proj.alloc.T, index=timeline, columns=tickers)
 st.subheader("미래 추정 NAV")
-st.line_chart(nav_series.rename("KRW"), height=280)
+st.line_chart(nav_series.rename(base_ccy), height=280)
+with st.expander("자산별 금액 추이"):
+    st.area_chart(alloc_df, height=280)
 
 # 요약
 total_contrib = monthly_contrib * months + start_nav
 gain = nav_series.iloc[-1] - (total_mv + total_contrib)
 c1, c2, c3 = st.columns(3)
-c1.metric("기말 추정 자산(KRW)", f"{int(nav_series.iloc[-1]):,}")
-c2.metric("총 납입액(KRW)", f"{int(total_contrib):,}")
-c3.metric("추정 평가이익(KRW)", f"{int(gain):,}")
+c1.metric(f"기말 추정 자산({base_ccy})", f"{int(nav_series.iloc[-1]):,}")
+c2.metric(f"총 납입액({base_ccy})", f"{int(total_contrib):,}")
+c3.metric(f"추정 평가이익({base_ccy})", f"{int(gain):,}")
+
+# ---------- 재무 목표 ----------
+# 목표 기말 자산 → 월 적립/기간/기대수익률 역산(다른 입력은 위 가정 그대로)
+st.subheader("🎯 재무 목표")
+goal_w = tgt_g["비중"].to_numpy()
+goal_mu = (tgt.groupby("티커", sort=False)["기대수익률(연,%)"].last().astype(float) / 100.0).reindex(tickers).to_numpy()
+g1, g2, g3 = st.columns([1, 2, 1])
+with g1:
+    goal_amt = st.number_input(f"목표 금액({sym})", 0, 10**13, 100_000_000, step=10_000_000)
+with g2:
+    solve_for = st.radio("구할 값", SOLVES, horizontal=True)
+with g3:
+    goal_prob = st.slider("성공 확률(%)", 0, 95, 0, 5, disabled=solve_for != SOLVE_CONTRIB,
+                          help="0이면 기대수익률 고정 추정. 그 이상이면 입력 변동성으로 만든 경로 중 이 비율이 목표를 넘는 적립금")
+
+if solve_for == SOLVE_CONTRIB and goal_prob:
+    # 경로별 기말 자산 = A + 적립금·B → 경로별 필요 적립금의 분위수(경로는 캐시, 목표/확률 변경은 즉시)
+    vol_col = tgt["변동성(연,%)"] if "변동성(연,%)" in tgt.columns else pd.Series(15.0, index=tgt.index)
+    goal_vol = (vol_col.astype(float).fillna(15.0) / 100.0).groupby(tgt["티커"], sort=False).last().reindex(tickers).to_numpy()
+    finals = path_finals(init_alloc, goal_mu, goal_vol, np.eye(len(tickers)), goal_w, months, rebalance,
+                         float(other_amt), paths=10_000, seed=42)
+    res = contribution_for_probability(goal_amt, goal_prob / 100, finals)
+    now_p = success_probability(goal_amt, monthly_contrib, finals)
+    r1, r2 = st.columns(2)
+    r1.metric(f"필요 월 적립({base_ccy})", f"{res.value:,.0f}" if res.feasible else "도달 불가",
+              f"{res.value - monthly_contrib:+,.0f}" if res.feasible else None, delta_color="inverse")
+    r2.metric("현재 월 적립의 성공 확률", f"{now_p*100:.1f}%")
+    st.caption(f"경로 10,000개 · 자산 간 상관 0 · {years}년 · 시드 42")
+else:
+    if solve_for == SOLVE_CONTRIB:
+        res = contribution_needed(goal_amt, init_alloc, tgt_g["월수익률"].to_numpy(), goal_w, months, rebalance, other_amt)
+        label = f"{res.value:,.0f}" if res.feasible else "도달 불가"
+        delta = f"{res.value - monthly_contrib:+,.0f}" if res.feasible else None
+        st.metric(f"필요 월 적립({base_ccy}, {years}년)", label, delta, delta_color="inverse")
+    elif solve_for == SOLVE_MONTHS:
+        res = months_needed(goal_amt, init_alloc, tgt_g["월수익률"].to_numpy(), goal_w, monthly_contrib, rebalance, other_amt)
+        label = f"{int(res.value) // 12}년 {int(res.value) % 12}개월" if res.feasible else "50년 내 도달 불가"
+        delta = f"{int(res.value) - months:+d}개월" if res.feasible else None
+        st.metric("목표 도달 기간", label, delta, delta_color="inverse")
+    else:
+        res = return_needed(goal_amt, init_alloc, goal_mu, goal_w, monthly_contrib, months, rebalance, other_amt)
+        cur = float(goal_w @ goal_mu)
+        label = f"{(cur + res.value)*100:.2f}%" if res.feasible else "도달 불가(연 +100%p 초과)"
+        delta = f"{res.value*100:+.2f}%p" if res.feasible else None
+        st.metric("필요 연수익률(비중 가중)", label, delta, delta_color="inverse")
+    st.caption(f"풀이: {res.method} · 기말 추정 {res.final:,.0f} {base_ccy}")
+
+# 저장 목표: 목표일까지 달성률/기간 경과율, 남은 기간 필요 적립금. 평가액은 통화별 하루 한 행
+book = get_goalbook()
+book.record(nav0, base_ccy)
+with st.expander("저장 목표 · 달성률"):
+    with st.form("goal_form", clear_on_submit=False):
+        f1, f2, f3 = st.columns([2, 1, 1])
+        goal_name = f1.text_input("이름", "목표")
+        goal_date = f2.date_input("목표일", value=(pd.Timestamp(date.today()) + pd.DateOffset(years=int(years))).date())
+        if f3.form_submit_button("현재 목표 금액으로 저장") and goal_name.strip():
+            book.save(goal_name.strip(), goal_amt, goal_date, nav0, base_ccy)
+            book.record(nav0, base_ccy, force=True)
+    prog = book.progress(nav0, base_ccy)
+    others = book.goals()["통화"].ne(base_ccy).sum()
+    if others:
+        st.caption(f"다른 기준 통화 목표 {others}개는 그 통화를 선택하면 표시됩니다.")
+    if prog.empty:
+        st.caption(f"{base_ccy} 기준 저장 목표 없음")
+    else:
+        prog[f"필요 월 적립({base_ccy})"] = [
+            contribution_needed(t, init_alloc, tgt_g["월수익률"].to_numpy(), goal_w, max(int(m), 1), rebalance, other_amt).value
+            for t, m in zip(prog["목표금액"], prog["남은 개월"])
+        ]
+        st.dataframe(prog.style.format({"목표금액": "{:,.0f}", "현재": "{:,.0f}", "달성률": "{:.1%}",
+                                        "기간 경과율": "{:.1%}", f"필요 월 적립({base_ccy})": "{:,.0f}"}),
+                     use_container_width=True, hide_index=True)
+        hist = book.history(base_ccy)
+        if len(hist) > 1:
+            line = alt.Chart(hist).mark_line(point=True).encode(
+                x=alt.X("날짜:T", title=""), y=alt.Y("평가액:Q", title=base_ccy),
+                tooltip=[alt.Tooltip("날짜:T"), alt.Tooltip("평가액:Q", format=",.0f")])
+            rules = alt.Chart(prog).mark_rule(strokeDash=[4, 4]).encode(y="목표금액:Q", color="이름:N", tooltip=["이름"])
+            st.altair_chart((line + rules).properties(height=260), use_container_width=True)
+        d1, d2 = st.columns([3, 1])
+        drop = d1.selectbox("삭제할 목표", prog["이름"], label_visibility="collapsed")
+        if d2.button("목표 삭제"):
+            book.remove(drop)
+            st.rerun()
+
+# ---------- 몬테카를로 ----------
+@st.cache_data(show_spinner="시뮬레이션 중...")
+@instrument.traced("portfolio.run_monte_carlo")
+def run_monte_carlo(init_alloc: tuple, mu: tuple, vol: tuple, corr: tuple, weights: tuple,
+                    monthly: float, months: int, paths: int, mode: str, other: float,
+                    invested: float, seed: int):
+    """입력이 같으면 재계산 없이 캐시 반환(시드 고정이라 결과 동일)"""
+    return simulate(np.array(init_alloc), np.array(mu), np.array(vol), np.array(corr), np.array(weights),
+                    monthly, months, paths=paths, mode=mode, other=other, invested=invested, seed=seed)
+
+st.subheader("몬테카를로 시뮬레이션")
+if st.toggle("확률 시뮬레이션 실행", value=False):
+    m1, m2, m3, m4 = st.columns(4)
+    with m1:
+        n_paths = st.selectbox("경로 수", [10_000, 100_000, 300_000, 1_000_000], index=1,
+                               format_func=lambda x: f"{x:,}")
+    with m2:
+        param_src = st.selectbox("수익률/변동성/상관", ["입력값", "과거 추정(5y)"], index=0)
+    with m3:
+        rho = st.slider("자산 간 상관(입력값)", -0.9, 0.9, 0.0, 0.05, disabled=param_src != "입력값")
+    with m4:
+        seed = st.number_input("시드", 0, 2**31 - 1, 42)
+
+    if param_src == "입력값":
+        vol_col = tgt["변동성(연,%)"] if "변동성(연,%)" in tgt.columns else pd.Series(15.0, index=tgt.index)
+        tgt_v = tgt.assign(연변동성=vol_col.astype(float).fillna(15.0) / 100.0, 연수익률=tgt["기대수익률(연,%)"].astype(float) / 100.0)
+        tgt_v = tgt_v.groupby("티커", sort=False)[["연수익률","연변동성"]].last().reindex(tickers)
+        mc_mu, mc_vol = tgt_v["연수익률"].to_numpy(), tgt_v["연변동성"].to_numpy()
+        mc_corr = np.full((len(tickers), len(tickers)), rho)
+        np.fill_diagonal(mc_corr, 1.0)
+    else:
+        hist = load_many(tickers, "5y", total_return=True)
+        if hist.errors:
+            st.warning("이력 없음: " + ", ".join(hist.errors))
+        closes = get_fx().convert(pd.DataFrame(hist.series).reindex(columns=tickers), base_ccy)
+        mc_mu, mc_vol, mc_corr = annual_params(closes)
+        mc_mu, mc_vol = np.nan_to_num(mc_mu), np.nan_to_num(mc_vol)
+        st.dataframe(pd.DataFrame({"티커":tickers, "연수익률(%)":(mc_mu*100).round(2), "연변동성(%)":(mc_vol*100).round(2)}),
+                     use_container_width=True, hide_index=True)
+
+    invested = nav0 + monthly_contrib * months
+    res = run_monte_carlo(tuple(init_alloc), tuple(mc_mu), tuple(mc_vol), tuple(map(tuple, mc_corr)),
+                          tuple(tgt_g["비중"]), float(monthly_contrib), months, int(n_paths),
+                          rebalance, float(other_amt), float(invested), int(seed))
+
+    # 팬 차트: 5~95, 25~75 구간 + 중앙값 + 결정론 경로
+    band = pd.DataFrame(res.bands.T, index=timeline, columns=[f"p{p}" for p in res.percentiles])
+    band["결정론"] = nav_series
+    band = band.rename_axis("Date").reset_index()
+    base = alt.Chart(band).encode(x=alt.X("Date:T", title=""))
+    fan = (
+        base.mark_area(opacity=0.15).encode(y=alt.Y("p5:Q", title=base_ccy), y2="p95:Q")
+        + base.mark_area(opacity=0.3).encode(y="p25:Q", y2="p75:Q")
+        + base.mark_line().encode(y="p50:Q", tooltip=[alt.Tooltip("Date:T"), alt.Tooltip("p50:Q", format=",.0f")])
+        + base.mark_line(strokeDash=[4, 4], color="gray").encode(y="결정론:Q")
+    ).properties(height=320)
+    st.altair_chart(fan, use_container_width=True)
+
+    final = dict(zip(res.percentiles, res.bands[:, -1]))
+    k1, k2, k3 = st.columns(3)
+    k1.metric(f"기말 중앙값({base_ccy})", f"{int(final[50]):,}")
+    k2.metric(f"기말 5%~95%({base_ccy})", f"{int(final[5]):,} ~ {int(final[95]):,}")
+    k3.metric("원금(현재 평가+납입) 미만 확률", f"{res.prob_below*100:.1f}%")
+    st.caption(f"경로 {res.paths:,}개 · 월 로그정규 · 분위 상대오차 0.5% 이내 · 시드 {seed}")
+
+# ---------- 과거 백테스트 ----------
+st.subheader("과거 백테스트")
+if st.toggle("목표 비중 백테스트", value=False):
+    bt_period = st.selectbox("기간", ["1y","2y","5y","max"], index=2)
+    hist = load_many(tickers, bt_period, total_return=True)
+    if hist.errors:
+        st.warning("이력 없음: " + ", ".join(f"{t}({e})" for t, e in hist.errors.items()))
+    # 기준 통화 환산(통화별 열 묶음 × 날짜 맞춘 환율)
+    prices = get_fx().convert(price_matrix(hist.series, tickers), base_ccy).dropna() if not hist.errors else pd.DataFrame()
+    if len(prices) < 2:
+        st.info("모든 목표 티커의 공통 이력이 필요합니다.")
+    else:
+        # 목표 비중 + 비교용(동일가중, 단일 자산 100%)을 한 번에 계산
+        labels = ["목표 비중", "동일가중"] + [f"{t} 100%" for t in tickers]
+        W = np.vstack([tgt_g["비중"].to_numpy(), np.full(len(tickers), 1.0 / len(tickers)), np.eye(len(tickers))])
+        bt = backtest(prices, W, monthly_contrib, initial=nav0, mode=rebalance)
+        nav_df = pd.DataFrame(bt.nav[:2].T, index=bt.dates, columns=labels[:2])
+        nav_df["누적 납입"] = np.cumsum(bt.flows)
+        st.line_chart(nav_df, height=280)
+        tbl = bt.metrics.assign(구성=labels).set_index("구성")
+        st.dataframe(
+            tbl.style.format({"CAGR":"{:.2%}","변동성":"{:.2%}","MDD":"{:.2%}","회전율(연)":"{:.2f}",
+                              "기말평가액":"{:,.0f}","총납입":"{:,.0f}"}),
+            use_container_width=True,
+        )
+        st.caption(f"{bt.dates[0].date()} ~ {bt.dates[-1].date()} · 종가 기준 · 통화 환산/비용 미반영")
+
+# ---------- 비중 최적화 ----------
+@st.cache_data(show_spinner="최적화 중...")
+@instrument.traced("portfolio.run_optimizer")
+def run_optimizer(mu: tuple, cov: tuple, lo: float, hi: float, rf: float):
+    """추정치/제약이 같으면 재계산 없이 캐시 반환"""
+    mu, cov = np.array(mu), np.array(cov)
+    front = frontier(mu, cov, lo, hi, points=40)
+    picks = {
+        "최소분산": min_variance(cov, lo, hi),
+        "최대샤프": front.weights[max_sharpe(front, rf)],
+        "위험균등": risk_parity(cov, lo, hi),
+    }
+    return front, picks
+
+st.subheader("비중 최적화")
+if st.toggle("평균-분산 최적화", value=False):
+    o1, o2, o3, o4 = st.columns(4)
+    with o1:
+        opt_src = st.selectbox("대상 티커", ["목표 비중", "현재 보유", "직접 입력"], index=0)
+    with o2:
+        opt_period = st.selectbox("추정 기간", ["1y", "2y", "5y", "max"], index=2)
+    with o3:
+        opt_bounds = st.slider("자산별 비중 범위(%)", 0, 100, (0, 100), 5)
+    with o4:
+        opt_rf = st.number_input("무위험 수익률(연,%)", 0.0, 20.0, 3.0, 0.25) / 100.0
+    if opt_src == "직접 입력":
+        raw = st.text_input("티커(쉼표 구분)", ", ".join(tickers))
+        opt_tickers = [t.strip() for t in raw.split(",") if t.strip()]
+    elif opt_src == "현재 보유":
+        opt_tickers = hold_eval["티커"].astype(str).str.strip().unique().tolist()
+    else:
+        opt_tickers = tickers
+
+    est = estimate(opt_tickers, opt_period)
+    if est.errors:
+        st.warning("이력 없음(제외): " + ", ".join(est.errors))
+    lo, hi = opt_bounds[0] / 100.0, opt_bounds[1] / 100.0
+    if len(est.tickers) < 2:
+        st.info("이력이 있는 티커가 2개 이상 필요합니다.")
+    elif lo * len(est.tickers) > 1 or hi * len(est.tickers) < 1:
+        st.error("비중 범위로 합 100%를 만들 수 없습니다.")
+    else:
+        front, picks = run_optimizer(tuple(est.mu), tuple(map(tuple, est.cov)), lo, hi, float(opt_rf))
+        vol_i = np.sqrt(np.diag(est.cov))
+        pts = pd.concat([
+            pd.DataFrame({"변동성": front.vol, "수익률": front.ret, "구분": "효율적 투자선"}),
+            pd.DataFrame({"변동성": vol_i, "수익률": est.mu, "구분": "개별 자산", "티커": est.tickers}),
+            pd.DataFrame([{"변동성": np.sqrt(w @ est.cov @ w), "수익률": w @ est.mu, "구분": k}
+                          for k, w in picks.items()]),
+        ], ignore_index=True)
+        line = alt.Chart(pts[pts["구분"] == "효율적 투자선"]).mark_line().encode(
+            x=alt.X("변동성:Q", axis=alt.Axis(format="%")), y=alt.Y("수익률:Q", axis=alt.Axis(format="%")))
+        dots = alt.Chart(pts[pts["구분"] != "효율적 투자선"]).mark_point(filled=True, size=70).encode(
+            x="변동성:Q", y="수익률:Q", color="구분:N", shape="구분:N",
+            tooltip=["구분", "티커", alt.Tooltip("변동성:Q", format=".2%"), alt.Tooltip("수익률:Q", format=".2%")])
+        st.altair_chart((line + dots).properties(height=340), use_container_width=True)
+
+        opt_tbl = pd.DataFrame({k: w for k, w in picks.items()}, index=est.tickers)
+        summary = pd.DataFrame({k: {"기대수익률": w @ est.mu, "변동성": np.sqrt(w @ est.cov @ w)}
+                                for k, w in picks.items()})
+        summary.loc["샤프"] = (summary.loc["기대수익률"] - opt_rf) / summary.loc["변동성"]
+        st.dataframe((opt_tbl * 100).round(2).rename_axis("비중(%)"), use_container_width=True)
+        st.dataframe(summary.style.format("{:.2%}", subset=pd.IndexSlice[["기대수익률", "변동성"], :])
+                     .format("{:.2f}", subset=pd.IndexSlice[["샤프"], :]), use_container_width=True)
+        with st.expander("위험 기여도(%)"):
+            st.dataframe(pd.DataFrame({k: risk_contrib(w, est.cov) * 100 for k, w in picks.items()},
+                                      index=est.tickers).round(2), use_container_width=True)
+        st.caption(f"일수익률 {opt_period} · 결측 쌍별 제외 공분산 · Ledoit-Wolf 축소 δ={est.delta:.2f} · "
+                   "기대수익률은 과거 평균(추정 오차 큼)")
+
+# ---------- 파라미터 스윕 ----------
+st.subheader("파라미터 스윕")
+if st.toggle("비중/적립/기간 조합 비교", value=False):
+    st.caption("자산별 비중 범위(%)를 정하면 합 100%인 조합만 평가. 마지막 자산은 나머지로 결정")
+    range_df = st.data_editor(
+        pd.DataFrame({"티커": tickers, "최소(%)": 0.0, "최대(%)": 100.0, "간격(%)": 10.0}),
+        disabled=["티커"], use_container_width=True, hide_index=True, key="sweep_ranges",
+    )
+    s1, s2, s3, s4 = st.columns(4)
+    with s1:
+        sw_contribs = st.text_input(f"월 적립 후보({sym}, 공백/; 구분)", f"{int(monthly_contrib):,} ; {int(monthly_contrib) * 2:,}",
+                                    help="쉼표는 천 단위 구분으로 봅니다. 예: 500,000 ; 1,000,000")
+    with s2:
+        sw_years = st.multiselect("기간(년)", [1, 3, 5, 10, 20, 30], default=[5, 10])
+    with s3:
+        sw_modes = st.multiselect("리밸런싱", MODES, default=[rebalance])
+    with s4:
+        sw_engine = st.selectbox("엔진", ENGINES, index=0)
+
+    try:
+        contrib_list = [float(x.replace(",", "")) for x in re.split(r"[\s;/]+", sw_contribs) if x.strip()]
+    except ValueError:
+        contrib_list = []
+        st.error("월 적립 후보는 숫자를 공백이나 ;로 구분해 입력하세요(쉼표는 천 단위).")
+    grid = weight_grid(list(range_df[["최소(%)", "최대(%)", "간격(%)"]].astype(float).itertuples(index=False, name=None)))
+    n_combo = len(grid) * len(contrib_list) * len(sw_years) * len(sw_modes)
+    st.caption(f"비중 조합 {len(grid):,}개 · 전체 {n_combo:,}개")
+
+    if st.button("스윕 실행", disabled=n_combo == 0):
+        with st.spinner("조합 계산 중..."):
+            if sw_engine == "백테스트":
+                hist = load_many(tickers, "max", total_return=True)
+                prices = get_fx().convert(price_matrix(hist.series, tickers), base_ccy).dropna() if not hist.errors else pd.DataFrame()
+                if len(prices) < 2:
+                    st.info("모든 목표 티커의 공통 이력이 필요합니다.")
+                    st.stop()
+                result = run_sweep(tickers, grid, contrib_list, sorted(sw_years), sw_modes, engine=sw_engine,
+                                   prices=prices, initial=nav0)
+            else:
+                result = run_sweep(tickers, grid, contrib_list, sorted(sw_years), sw_modes, engine=sw_engine,
+                                   init_alloc=init_alloc, mu_monthly=tgt_g["월수익률"].to_numpy(), other=other_amt)
+        st.session_state["sweep_result"] = result
+
+    result = st.session_state.get("sweep_result")
+    if result is not None and not result.empty:
+        metrics = [c for c in result.columns[len(tickers) + 3:] if c != "총납입"]
+        dims = list(result.columns[:len(tickers) + 3])
+        h1, h2, h3 = st.columns(3)
+        with h1:
+            hx = st.selectbox("X축", dims, index=0)
+        with h2:
+            # X축과 같은 필드는 고를 수 없게(같은 컬럼 두 번 groupby 불가)
+            hy = st.selectbox("Y축", [d for d in dims if d != hx], index=0)
+        with h3:
+            hc = st.selectbox("색", metrics, index=0)
+        # 나머지 차원은 최댓값으로 집약
+        heat = result.groupby([hx, hy], as_index=False)[hc].max()
+        chart = alt.Chart(heat).mark_rect().encode(
+            x=alt.X(f"{hx}:O"), y=alt.Y(f"{hy}:O", sort="descending"),
+            color=alt.Color(f"{hc}:Q", scale=alt.Scale(scheme="viridis")),
+            tooltip=[hx, hy, alt.Tooltip(f"{hc}:Q", format=",.4f")],
+        ).properties(height=320)
+        st.altair_chart(chart, use_container_width=True)
+        pct = {c: "{:.2%}" for c in ("CAGR", "변동성", "MDD", "수익률") if c in result.columns}
+        st.dataframe(
+            result.sort_values(metrics[0], ascending=False).head(500).style.format(
+                {"기말평가액": "{:,.0f}", "총납입": "{:,.0f}", "월 적립": "{:,.0f}", **pct}),
+            use_container_width=True, hide_index=True,
+        )
+        st.caption(f"조합 {len(result):,}개 중 상위 500개 · 열 머리글로 정렬")
 
-st.caption("단순 결정론 모델. 세금/수수료/실시간 체결 고려 없음. 환율은 고정 가정.")
+st.caption("단순 결정론 모델. 세금/수수료/실시간 체결 고려 없음. 평가/백테스트는 기준 통화 환산(일별 환율). 과거 통계는 분배금 재투자 기준.")